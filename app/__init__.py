@@ -1,11 +1,13 @@
 from flask import Flask
 from .storage import init_db
+from .logs import configure_logging
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
 def create_app():
+    configure_logging()
     app = Flask(__name__)
     
     # Initialize Database
@@ -16,4 +18,14 @@ def create_app():
     from .routes import main_bp
     app.register_blueprint(main_bp)
 
+    # Request timing and opt-in profiling (X-Profile header, REQUEST_PROFILING=1)
+    from .metrics import init_app as init_metrics
+    init_metrics(app)
+
+    # Engines are built lazily; warm them in the background so the first
+    # /analyze doesn't pay for the CSV load and spaCy model.
+    if os.environ.get("ENGINE_WARMUP", "1") != "0":
+        from .engines import registry
+        registry.warm_up(background=True)
+
     return app
@@ -0,0 +1,180 @@
+"""
+Bulk analysis and import of past food diaries.
+
+Records are parsed with one batched spaCy pass, resolved and totalled with
+NutritionEngine.analyze_days, and written with a single transaction per
+chunk. Suggestions are skipped, or deferred to the background job pool.
+
+    python -m app.batch diary.ndjson [--suggestions none|deferred] [--chunk-size 1000] [--user ID]
+
+One JSON object per line; meals may be top-level or nested under "meals":
+
+    {"date": "2024-03-01", "breakfast": "2 idli", "lunch": "rice and dal", "dinner": "2 roti"}
+
+Use "-" to read from stdin.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from .metrics import stage, ANALYZED_DAYS, UNMATCHED_ITEMS
+
+MEALS = ("breakfast", "lunch", "snacks", "dinner")
+SUGGESTION_MODES = ("none", "deferred")
+
+
+def parse_record(record):
+    """(date_str, meals) from one input record. Raises ValueError if it is malformed."""
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+    date_str = record.get("date")
+    try:
+        datetime.strptime(date_str or "", "%Y-%m-%d")
+    except (TypeError, ValueError):
+        raise ValueError("date must be YYYY-MM-DD")
+    source = record.get("meals", record)
+    if not isinstance(source, dict):
+        raise ValueError("meals must be a JSON object")
+    return date_str, {meal: str(source.get(meal) or "") for meal in MEALS}
+
+
+def read_ndjson(lines):
+    """Yield (line_number, record, error) for each non-blank NDJSON line."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield number, parse_record(json.loads(line)), None
+        except ValueError as e:
+            yield number, None, str(e)
+
+
+def analyze_records(records, nlp_engine=None, nutrition_engine=None):
+    """
+    Analyze many (date_str, meals) records in one pass. Returns one dict per
+    record with date, meals, totals, risk_level, risk_reason, unmatched and
+    the dataset_version the totals came from.
+    """
+    from .engines import get_nlp_engine, get_nutrition_engine
+
+    records = list(records)
+    nlp_engine = nlp_engine or get_nlp_engine()
+    nutrition_engine = nutrition_engine or get_nutrition_engine()
+
+    # One doc per meal so meal boundaries are kept, all records in one nlp.pipe run
+    with stage("nlp_parse"):
+        per_meal = nlp_engine.parse_meals_batch([meals[meal] for _, meals in records for meal in MEALS])
+    days = [
+        [item for items in per_meal[i * len(MEALS):(i + 1) * len(MEALS)] for item in items]
+        for i in range(len(records))
+    ]
+
+    # Pinned for the whole call so every record is totalled against the same data, even across a reload
+    dataset = nutrition_engine.dataset
+    results = []
+    for (date_str, meals), (totals, unmatched) in zip(records, nutrition_engine.analyze_days(days, dataset)):
+        risk_level, risk_reason = nutrition_engine.calculate_risk(totals)
+        results.append({
+            "date": date_str,
+            "meals": meals,
+            "totals": totals,
+            "risk_level": risk_level,
+            "risk_reason": risk_reason,
+            "unmatched": unmatched,
+            "dataset_version": dataset.version,
+        })
+        UNMATCHED_ITEMS.inc(len(unmatched))
+    ANALYZED_DAYS.inc(len(results))
+    return results
+
+
+def import_records(records, suggestions="none", chunk_size=None, nlp_engine=None, nutrition_engine=None,
+                   user_id=None):
+    """
+    Analyze and store (date_str, meals) records for user_id (default: the
+    default user), chunk by chunk. With suggestions="deferred" a background
+    job is queued per stored date. Returns (results, summary).
+    """
+    from .storage import log_daily_entries, DEFAULT_USER
+    from .jobs import suggestion_jobs
+
+    if suggestions not in SUGGESTION_MODES:
+        raise ValueError(f"suggestions must be one of {', '.join(SUGGESTION_MODES)}")
+    chunk_size = chunk_size or int(os.environ.get("BATCH_CHUNK_SIZE", 1000))
+    user_id = user_id or DEFAULT_USER
+
+    start = time.perf_counter()
+    results = []
+    written = 0
+    records = list(records)
+    for offset in range(0, len(records), chunk_size):
+        chunk = analyze_records(records[offset:offset + chunk_size], nlp_engine, nutrition_engine)
+        with stage("db_write"):
+            written += log_daily_entries(
+                ((r["date"], r["meals"], r["totals"], r["risk_level"], r["risk_reason"]) for r in chunk), user_id
+            )
+        results.extend(chunk)
+
+    if suggestions == "deferred":
+        # Later records for a date replaced earlier ones, so only the last gets a job
+        latest = {r["date"]: r for r in results}
+        for r in latest.values():
+            r["suggestion_job"] = suggestion_jobs.submit(r["date"], r["totals"], r["risk_level"], user_id)
+
+    seconds = time.perf_counter() - start
+    summary = {
+        "records": len(records),
+        "written": written,
+        "dates": len({r["date"] for r in results}),
+        "unmatched_items": sum(len(r["unmatched"]) for r in results),
+        "dataset_versions": sorted({r["dataset_version"] for r in results if r["dataset_version"]}),
+        "seconds": round(seconds, 3),
+        "days_per_s": round(len(records) / seconds, 1) if seconds > 0 else None,
+    }
+    return results, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a food diary (NDJSON) into the history database.")
+    parser.add_argument("path", help="NDJSON file, or - for stdin")
+    parser.add_argument("--suggestions", choices=SUGGESTION_MODES, default="none",
+                        help="deferred queues suggestion jobs and waits for them before exiting")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--results", action="store_true", help="Print one NDJSON result line per record")
+    parser.add_argument("--user", help="User the diary belongs to (default: the single default user)")
+    args = parser.parse_args()
+
+    from .storage import init_db
+    from .jobs import suggestion_jobs
+
+    init_db()
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    with stream:
+        records, errors = [], []
+        for number, record, error in read_ndjson(stream):
+            if error:
+                errors.append({"line": number, "error": error})
+            else:
+                records.append(record)
+
+    results, summary = import_records(records, args.suggestions, args.chunk_size, user_id=args.user)
+    summary["errors"] = errors
+
+    for r in results:
+        job_id = r.get("suggestion_job")
+        if job_id:
+            job = suggestion_jobs.wait(job_id)
+            r["suggestions"] = job.suggestions if job else None
+        if args.results:
+            print(json.dumps(r))
+
+    print(json.dumps(summary), file=sys.stderr if args.results else sys.stdout)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Returned by get() when a key is absent (a cached None is a valid negative entry)
+MISSING = object()
+
+
+def default_cache_path(filename):
+    return os.path.join(BASE_DIR, filename)
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """
+    Persistent key/value store with TTL and least-recently-used eviction.
+    Values are stored as JSON, so only JSON-serializable values can be cached.
+
+    The file is shared by every worker process, so reads stay reads: a hit
+    only refreshes accessed_at once it is older than touch_fraction of the
+    TTL. The row count is tracked in-process and re-read only when eviction
+    runs, which frees evict_fraction of maxsize at a time. Waits for another
+    writer are capped at busy_timeout seconds; callers treat the resulting
+    sqlite3.OperationalError as a miss.
+    """
+
+    def __init__(self, path, table="cache", maxsize=50000, ttl=7 * 24 * 3600, busy_timeout=0.25,
+                 touch_fraction=0.1, evict_fraction=0.1):
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.busy_timeout = busy_timeout
+        self.touch_interval = ttl * touch_fraction
+        self.evict_batch = max(1, int(maxsize * evict_fraction))
+        self.evictions = 0
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._connection()
+
+    def _connection(self):
+        # Reopened per process: a SQLite connection must not be used on both sides of a fork
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            # WAL: readers in other workers don't wait on a writer
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            ''')
+            conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table}(accessed_at)')
+            conn.commit()
+            self._rows = conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key) -> Any:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                f'SELECT value, expires_at, accessed_at FROM {self.table} WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return MISSING
+            value, expires_at, accessed_at = row
+            if expires_at < now:
+                # Left for eviction to delete; a read shouldn't take the write lock
+                return MISSING
+            if now - accessed_at > self.touch_interval:
+                try:
+                    conn.execute(f'UPDATE {self.table} SET accessed_at = ? WHERE key = ?', (now, key))
+                    conn.commit()
+                except sqlite3.OperationalError:
+                    # Another worker holds the write lock; the hit is still good
+                    conn.rollback()
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        data = json.dumps(value)
+        with self._lock:
+            conn = self._connection()
+            try:
+                inserted = conn.execute(
+                    f'INSERT OR IGNORE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, data, expires_at, now)
+                ).rowcount
+                if not inserted:
+                    conn.execute(
+                        f'UPDATE {self.table} SET value = ?, expires_at = ?, accessed_at = ? WHERE key = ?',
+                        (data, expires_at, now, key)
+                    )
+                rows = self._rows + inserted
+                if rows > self.maxsize:
+                    rows = self._evict(conn, now)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            self._rows = rows
+
+    def _evict(self, conn, now):
+        # Other workers insert too, so the tracked count is only a trigger; recount once per batch
+        conn.execute(f'DELETE FROM {self.table} WHERE expires_at < ?', (now,))
+        rows = conn.execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+        excess = rows - self.maxsize
+        if excess > 0:
+            # Down to maxsize - evict_batch, so the next eviction is evict_batch inserts away
+            deleted = conn.execute(f'''
+                DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?
+                )
+            ''', (excess + self.evict_batch,)).rowcount
+            self.evictions += deleted
+            rows -= deleted
+        return rows
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(f'DELETE FROM {self.table}')
+            conn.commit()
+            self._rows = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute(f'SELECT COUNT(*) FROM {self.table}').fetchone()[0]
+
+
+class TieredCache:
+    """
+    In-process LRU in front of a persistent SQLiteCache.
+
+    None is cached as a negative entry (e.g. an API miss or failure) with its
+    own, usually shorter, TTL so we don't keep retrying known misses.
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteCache = None, negative_ttl=600):
+        self.memory = memory
+        self.disk = disk
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "negative_hits": 0, "misses": 0, "writes": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key) -> Tuple[bool, Any]:
+        """Returns (found, value). found is True for cached negatives too."""
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self._count("negative_hits" if value is None else "memory_hits")
+            return True, value
+
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                print(f"Cache Error: {e}")
+                value = MISSING
+            if value is not MISSING:
+                # Promote so the next lookup stays in-process
+                self.memory.set(key, value, ttl=self.negative_ttl if value is None else None)
+                self._count("negative_hits" if value is None else "disk_hits")
+                return True, value
+
+        self._count("misses")
+        return False, None
+
+    def set(self, key, value):
+        ttl = self.negative_ttl if value is None else None
+        self.memory.set(key, value, ttl=ttl)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, ttl=ttl)
+            except sqlite3.Error as e:
+                print(f"Cache Error: {e}")
+        self._count("writes")
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        hits = stats["memory_hits"] + stats["disk_hits"] + stats["negative_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        stats["memory_size"] = len(self.memory)
+        stats["memory_evictions"] = self.memory.evictions
+        if self.disk is not None:
+            stats["disk_evictions"] = self.disk.evictions
+        return stats
+
+
+class MemoCache:
+    """
+    Bounded LRU memo for deterministic lookups, with hit/miss counters.
+
+    Entries don't expire by time. They are tied to a version (e.g. the
+    dataset hash): set_version() with a new value drops everything, and a
+    set() made under an older version is ignored, so a result computed
+    against the previous dataset can't land after the switch.
+    """
+
+    def __init__(self, maxsize=4096, version=None):
+        self.version = version
+        self._lru = LRUCache(maxsize=maxsize, ttl=float("inf"))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key) -> Any:
+        value = self._lru.get(key)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._lru.set(key, value)
+
+    def set_version(self, version):
+        with self._lock:
+            if version == self.version:
+                return
+            self.version = version
+            self.invalidations += 1
+            self._lru.clear()
+
+    def clear(self):
+        self._lru.clear()
+
+    def __len__(self):
+        return len(self._lru)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._lru),
+            "maxsize": self._lru.maxsize,
+            "evictions": self._lru.evictions,
+            "invalidations": self.invalidations,
+            "version": self.version,
+        }
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import pandas as pd
+
+# PATCH: Fix known bad data (Zero sugar/nutrients for common items)
+# Values are approx per 100g based on USDA
+PATCH_DATA = {
+    "apple": {"calories": 52, "carbs": 14, "sugar": 10, "fiber": 2.4, "protein": 0.3, "fat": 0.2},
+    "banana": {"calories": 89, "carbs": 23, "sugar": 12, "fiber": 2.6, "protein": 1.1, "fat": 0.3},
+    "orange": {"calories": 47, "carbs": 12, "sugar": 9, "fiber": 2.4, "protein": 0.9, "fat": 0.1},
+    "grapes": {"calories": 69, "carbs": 18, "sugar": 15, "fiber": 0.9, "protein": 0.7, "fat": 0.2},
+    "strawberry": {"calories": 32, "carbs": 7.7, "sugar": 4.9, "fiber": 2.0, "protein": 0.7, "fat": 0.3},
+    "oatmeal": {"calories": 68, "carbs": 12, "sugar": 0.5, "fiber": 1.7, "protein": 2.4, "fat": 1.4},
+    "white bread": {"calories": 265, "carbs": 49, "sugar": 5, "fiber": 2.7, "protein": 9, "fat": 3.2},
+    "milk": {"calories": 50, "carbs": 4.8, "sugar": 5, "fiber": 0, "protein": 3.4, "fat": 2},
+    "egg": {"calories": 155, "carbs": 1.1, "sugar": 1.1, "fiber": 0, "protein": 13, "fat": 11},
+}
+
+
+def load_frame(csv_path) -> pd.DataFrame:
+    """Read nutrition_master.csv, normalize columns and names, and apply PATCH_DATA."""
+    df = pd.read_csv(csv_path)
+    # Normalize
+    df.columns = [c.strip().lower() for c in df.columns]
+    df["food_name"] = df["food_name"].astype(str).str.strip().str.lower()
+
+    for food, data in PATCH_DATA.items():
+        mask = df["food_name"] == food
+        if mask.any():
+            # Update existing
+            for col, val in data.items():
+                if col in df.columns:
+                    df.loc[mask, col] = val
+        else:
+            # Append new if not exists (simple append)
+            new_row = {"food_name": food, **data}
+            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+
+    return df
+
+
+def patch_hash():
+    return hashlib.sha256(json.dumps(PATCH_DATA, sort_keys=True).encode()).hexdigest()
+
+
+def dataset_version(csv_path):
+    """Content hash of the CSV plus PATCH_DATA; changes whenever either does."""
+    digest = hashlib.sha256()
+    with open(csv_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(patch_hash().encode())
+    return digest.hexdigest()[:16]
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+from .logs import get_logger
+
+logger = get_logger("engines")
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_PATH = os.path.join(BASE_DIR, "nutrition_master.csv")
+
+
+class EngineRegistry:
+    """
+    Builds engines on first use instead of at import time.
+
+    Each engine is constructed at most once, guarded by its own lock, so a
+    request that arrives mid warm-up waits for that engine only.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._errors = {}
+        self._build_seconds = {}
+        self._warmup_thread = None
+
+    def register(self, name, factory):
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                try:
+                    self._instances[name] = self._factories[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._errors.pop(name, None)
+                self._build_seconds[name] = round(time.perf_counter() - start, 3)
+                logger.info("Engine %s ready in %ss", name, self._build_seconds[name])
+        return self._instances[name]
+
+    def peek(self, name):
+        """The engine if it has already been built, else None. Never triggers construction."""
+        return self._instances.get(name)
+
+    def is_ready(self):
+        return all(name in self._instances for name in self._factories)
+
+    def status(self):
+        engines = {}
+        for name in self._factories:
+            if name in self._instances:
+                engines[name] = {"ready": True, "build_seconds": self._build_seconds.get(name)}
+            else:
+                engines[name] = {"ready": False, "error": self._errors.get(name)}
+        return {
+            "ready": self.is_ready(),
+            "warming_up": self._warmup_thread is not None and self._warmup_thread.is_alive(),
+            "engines": engines,
+        }
+
+    def warm_up(self, background=True):
+        """Build every registered engine, on a daemon thread unless background=False."""
+        def run():
+            for name in self._factories:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Engine warm-up failed for {name}: {e}")
+
+        if not background:
+            run()
+            return None
+
+        if self._warmup_thread is None or not self._warmup_thread.is_alive():
+            self._warmup_thread = threading.Thread(target=run, name="engine-warmup", daemon=True)
+            self._warmup_thread.start()
+        return self._warmup_thread
+
+
+def _build_nutrition():
+    from .nutrition import NutritionEngine
+    return NutritionEngine(CSV_PATH)
+
+
+def _build_nlp():
+    from .nlp import NLPEngine
+    from .gazetteer import Gazetteer
+    engine = NLPEngine()
+    # The fast path needs the food vocabulary, so the nutrition engine is built first.
+    # Without it, parsing still works through spaCy alone.
+    try:
+        nutrition = registry.get("nutrition")
+        engine.use_gazetteer(Gazetteer(nutrition.food_names, version=nutrition.dataset_version))
+        # Follow dataset hot reloads
+        nutrition.add_reload_listener(lambda dataset: engine.use_gazetteer(
+            Gazetteer(dataset.food_names, version=dataset.version)))
+    except Exception as e:
+        logger.warning("Gazetteer fast path disabled: %s", e)
+    return engine
+
+
+def _build_rag():
+    from .rag import RAGEngine
+    return RAGEngine()
+
+
+registry = EngineRegistry()
+registry.register("nutrition", _build_nutrition)
+registry.register("nlp", _build_nlp)
+registry.register("rag", _build_rag)
+
+
+def get_nutrition_engine():
+    return registry.get("nutrition")
+
+
+def get_nlp_engine():
+    return registry.get("nlp")
+
+
+def get_rag_engine():
+    return registry.get("rag")
@@ -0,0 +1,147 @@
+"""
+Streaming export of the analysis history for clinicians and analytics.
+
+Entries are read from one SQLite cursor in chunks and encoded as they go,
+so an export of any size runs in constant memory.
+
+    python -m app.export [--format ndjson|csv] [--user ID] [--start 2024-01-01] [--end 2024-12-31]
+                         [--risk High --risk Moderate] [--gzip] [-o history.ndjson.gz]
+
+NDJSON lines carry user_id, date, risk_level, risk_reason, totals, meals and
+suggestions. CSV has one column per total and per meal, and leaves out
+suggestions. Entries are ordered by user, then by date, oldest first.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import zlib
+from datetime import datetime
+
+from .batch import MEALS
+from .storage import TOTAL_COLUMNS, iter_history
+
+FORMATS = ("ndjson", "csv")
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+RISK_LEVELS = ("Safe", "Moderate", "High")
+CSV_HEADER = ["user_id", "date", "risk_level", "risk_reason"] + TOTAL_COLUMNS + list(MEALS)
+
+
+def _ndjson(chunks):
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            head = json.dumps({
+                "user_id": row[0],
+                "date": row[1],
+                "risk_level": row[2],
+                "risk_reason": row[3],
+                "totals": dict(zip(TOTAL_COLUMNS, row[4:10])),
+            })
+            # meals_json and suggestions_json were written by json.dumps; splice them in instead of a decode/encode round trip
+            lines.append(f'{head[:-1]}, "meals": {row[10] or "{}"}, "suggestions": {row[11] or "null"}}}\n')
+        yield "".join(lines).encode("utf-8")
+
+
+def _csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for rows in chunks:
+        for row in rows:
+            meals = json.loads(row[10]) if row[10] else {}
+            writer.writerow([*row[:10], *(meals.get(meal, "") for meal in MEALS)])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _gzip(parts, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for part in parts:
+        out = compressor.compress(part)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _counted(chunks, progress):
+    for rows in chunks:
+        progress(len(rows))
+        yield rows
+
+
+def export_history(fmt="ndjson", start_date=None, end_date=None, risk_levels=None, gzip=False,
+                   chunk_size=None, progress=None, user_id=None):
+    """
+    Iterator of bytes for the filtered history in `fmt`, for one user or
+    (user_id None) for all of them. Arguments are checked
+    here, before anything is read, so a ValueError can still become a 400.
+    progress(n) is called with the row count of each chunk.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise ValueError("start and end must be YYYY-MM-DD")
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("start must not be after end")
+    unknown = set(risk_levels or ()) - set(RISK_LEVELS)
+    if unknown:
+        raise ValueError(f"risk must be one of {', '.join(RISK_LEVELS)}")
+
+    chunk_size = chunk_size or int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))
+    chunks = iter_history(start_date, end_date, risk_levels, chunk_size, user_id)
+    if progress is not None:
+        chunks = _counted(chunks, progress)
+    parts = _ndjson(chunks) if fmt == "ndjson" else _csv(chunks)
+    return _gzip(parts) if gzip else parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the history database as NDJSON or CSV.")
+    parser.add_argument("--format", choices=FORMATS, default="ndjson")
+    parser.add_argument("--user", help="Only this user's history (default: every user)")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--risk", action="append", choices=RISK_LEVELS, help="Only these risk levels (repeatable)")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("-o", "--output", default="-", help="File to write, or - for stdout")
+    args = parser.parse_args()
+
+    from .storage import init_db
+
+    init_db()
+    rows = [0]
+
+    def progress(n):
+        rows[0] += n
+
+    start = time.perf_counter()
+    parts = export_history(args.format, args.start, args.end, args.risk, args.gzip, args.chunk_size, progress,
+                           args.user)
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    written = 0
+    with out:
+        for part in parts:
+            out.write(part)
+            written += len(part)
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        "rows": rows[0],
+        "bytes": written,
+        "seconds": round(seconds, 3),
+        "rows_per_s": round(rows[0] / seconds, 1) if seconds > 0 else None,
+    }), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
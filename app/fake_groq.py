@@ -0,0 +1,63 @@
+"""
+Offline stand-in for groq.Groq.
+
+Implements the one call RAGEngine makes, client.chat.completions.create(),
+and answers with deterministic JSON built from the prompt, so suggestions,
+caching and background jobs can run without network access or an API key.
+
+    GROQ_FAKE=1 python app.py
+    RAGEngine(client_factory=FakeGroq)
+"""
+import json
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeGroq:
+    # RAGEngine only needs GROQ_API_KEY for the real client
+    requires_api_key = False
+
+    def __init__(self, api_key=None, latency=None, fail=False, **kwargs):
+        self.api_key = api_key
+        self.latency = float(os.environ.get("GROQ_FAKE_LATENCY", 0) if latency is None else latency)
+        self.fail = fail
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, messages, model=None, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if timeout is not None and self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("FakeGroq request timed out")
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("FakeGroq configured to fail")
+
+        prompt = messages[-1]["content"] if messages else ""
+        risk = re.search(r"Calculated Risk Level:\s*(\w+)", prompt)
+        sugar = re.search(r"Sugar:\s*([\d.]+)g", prompt)
+        risk = risk.group(1) if risk else "Unknown"
+        sugar = sugar.group(1) if sugar else "0"
+
+        content = json.dumps({
+            "suggestions": [
+                f"Since your sugar was {sugar}g, take a 10-15 minute walk after meals.",
+                "Drink 250-500ml of water with your next meal.",
+                "Eat fiber and protein before starches.",
+                "Swap white rice or bread for a low-GI alternative.",
+                "Halve the simple carb portion at your next meal.",
+            ],
+            "analysis": [
+                f"Risk level is {risk}.",
+                "Generated by the offline fake client.",
+                "Values are derived from the submitted totals only.",
+            ],
+        })
+        message = SimpleNamespace(content=content, role="assistant")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], model=model)
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# Column order of FoodTable.matrix; totals keys follow the same order
+NUTRIENT_COLUMNS = ["calories", "carbs", "sugar", "protein", "fat", "fiber"]
+TOTAL_KEYS = [f"total_{col}" for col in NUTRIENT_COLUMNS]
+
+
+class FoodTable:
+    """
+    Compact nutrient store: a name -> row index map plus one contiguous
+    float64 matrix (rows x NUTRIENT_COLUMNS).
+
+    float64 keeps values identical to what float(row[col]) returned from the
+    old per-row pandas Series, so totals don't drift.
+    """
+
+    def __init__(self, names: List[str], matrix: np.ndarray):
+        self.names = names
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        # Later duplicates win, like the old {name: row for row in iterrows()} dict
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame):
+        if df is None or df.empty or "food_name" not in df.columns:
+            return cls.empty()
+
+        matrix = np.zeros((len(df), len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        for j, col in enumerate(NUTRIENT_COLUMNS):
+            if col in df.columns:
+                matrix[:, j] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+        return cls(df["food_name"].tolist(), matrix)
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.zeros((0, len(NUTRIENT_COLUMNS)), dtype=np.float64))
+
+    def __len__(self):
+        return len(self.names)
+
+    def row_index(self, name: str) -> Optional[int]:
+        return self.index.get(name)
+
+    def row(self, name: str) -> Optional[Dict[str, float]]:
+        """Nutrients for one food as a plain dict, or None if unknown."""
+        idx = self.index.get(name)
+        if idx is None:
+            return None
+        return dict(zip(NUTRIENT_COLUMNS, self.matrix[idx].tolist()))
+
+    def nbytes(self):
+        return self.matrix.nbytes
+
+
+def api_vector(data: Dict[str, float]) -> List[float]:
+    """Nutrient dict (e.g. from the Edamam API) as a row in NUTRIENT_COLUMNS order."""
+    return [float(data.get(col, 0) or 0) for col in NUTRIENT_COLUMNS]
+
+
+def sum_totals(values: np.ndarray, quantities: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Quantity-weighted nutrient totals for many days at once.
+
+    values is (items x NUTRIENT_COLUMNS), quantities is (items,), and offsets
+    holds the first item position of each day. Returns (days x NUTRIENT_COLUMNS).
+
+    This is the quantities-times-matrix product, but evaluated as an ordered
+    reduction rather than a BLAS matmul (or np.add.reduceat, which sums
+    pairwise): item slot k of every day is added in one vector step, so each
+    day's items are summed in input order starting from 0.0, bit-for-bit
+    identical to adding them one by one.
+    """
+    days = len(offsets)
+    totals = np.zeros((days, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+    if len(values) == 0:
+        return totals
+
+    contributions = values * quantities[:, None]
+    counts = np.diff(np.append(offsets, len(values)))
+    day_of_item = np.repeat(np.arange(days), counts)
+    slot = np.arange(len(values)) - np.repeat(offsets, counts)
+
+    # Days x longest-day x nutrients, zero padded; x + 0.0 == x so padding is exact
+    padded = np.zeros((days, counts.max(), len(NUTRIENT_COLUMNS)), dtype=np.float64)
+    padded[day_of_item, slot] = contributions
+    for k in range(padded.shape[1]):
+        totals += padded[:, k]
+    return totals
+
+
+def round_totals(row: np.ndarray) -> Dict[str, float]:
+    # Python's round(), not np.round, to keep the existing 2-decimal results exactly
+    return {key: round(value, 2) for key, value in zip(TOTAL_KEYS, row.tolist())}
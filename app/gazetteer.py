@@ -0,0 +1,105 @@
+"""
+Dictionary-driven fast path for meal parsing.
+
+Most meal text is short and formulaic ("2 rotis and dal, 1 cup of milk").
+The Gazetteer splits it into segments on commas, "and", "with" and similar
+words, then matches each segment against a small grammar:
+
+    [QTY] UNIT of FOOD | [QTY] FOOD | [a|an|some|the] FOOD
+
+FOOD must be a phrase from the food table's vocabulary, singular or plural.
+Everything runs in one linear pass over the tokens. If any segment doesn't
+fit the grammar, the whole text is left to spaCy (extract() returns None),
+so the fast path only answers text it fully understands. Its output follows
+NLPEngine._extract_items: "cups of milk" with the unit, and the food phrase
+as written otherwise.
+"""
+import re
+from typing import List, Optional, Tuple
+
+from .nlp import STOP_WORDS, UNIT_WORDS
+
+TOKEN = re.compile(r"\d+(?:\.\d+)?|[^\W\d_]+(?:'[^\W\d_]+)?|[^\w\s]")
+SEPARATORS = {",", ";", "&", "+", ".", "and", "with"}
+DETERMINERS = {"a", "an", "some", "the"}
+
+
+def normalize(words):
+    """Lowercased words without stop words, as used for vocabulary lookups."""
+    return " ".join(w for w in (w.lower() for w in words) if w not in STOP_WORDS)
+
+
+class Gazetteer:
+    def __init__(self, food_names, version=None):
+        self.version = version
+        self.units = set(UNIT_WORDS)
+        self.vocabulary = set()
+        for name in food_names:
+            key = normalize(TOKEN.findall(str(name)))
+            if key:
+                self.vocabulary.add(key)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def is_food(self, words) -> bool:
+        key = normalize(words)
+        if not key:
+            return False
+        if key in self.vocabulary:
+            return True
+        # Plurals of the last word: "rotis", "mangoes", "berries"
+        for suffix, replacement in (("ies", "y"), ("es", ""), ("s", "")):
+            if key.endswith(suffix) and key[:-len(suffix)] + replacement in self.vocabulary:
+                return True
+        return False
+
+    def extract(self, text: str) -> Optional[List[Tuple[str, float]]]:
+        """(food, qty) pairs, or None if some of the text is outside the grammar."""
+        counted, plain = [], []
+        segment = []
+        for token in TOKEN.findall(text) + [","]:
+            if token.lower() not in SEPARATORS:
+                segment.append(token)
+                continue
+            if not segment:
+                continue
+            item = self._segment(segment)
+            if item is None:
+                return None
+            name, qty = item
+            if qty is not None:
+                counted.append((name, qty))
+            elif not any(n == name for n, _ in counted + plain):
+                plain.append((name, 1.0))
+            segment = []
+        # Same order as the spaCy path: items with a number first, then bare noun phrases
+        return counted + plain
+
+    def _segment(self, tokens):
+        """(name, qty) for one segment; qty is None when no number was given. None if it doesn't parse."""
+        words = [t for t in tokens if t[0].isalnum()]
+        if len(words) != len(tokens) or not words:
+            # Stray punctuation ("1/2", "-", "(") is left to spaCy
+            return None
+
+        qty = None
+        if words[0][0].isdigit():
+            qty = float(words[0])
+            words = words[1:]
+        elif words[0].lower() in DETERMINERS:
+            words = words[1:]
+        if not words or any(w[0].isdigit() for w in words):
+            return None
+
+        if words[0].lower() in self.units:
+            # Units are only understood as "QTY UNIT of FOOD"
+            if qty is None or len(words) < 3 or words[1].lower() != "of" or not self.is_food(words[2:]):
+                return None
+            name = f"{words[0]} of {' '.join(w for w in words[2:] if w.lower() not in STOP_WORDS)}"
+            return name, qty
+
+        if not self.is_food(words):
+            return None
+        name = " ".join(w for w in words if w.lower() not in STOP_WORDS)
+        return (name, qty) if len(name) > (1 if qty is not None else 2) else None
@@ -0,0 +1,155 @@
+"""
+Background suggestion jobs.
+
+/analyze returns its totals straight away and hands the LLM call to this
+pool; clients poll /api/suggestions/<job_id> or listen on its SSE stream.
+Finished results are also written to the user_history row for the date, so
+any worker (or a later visit) can still answer for a job it never ran.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .logs import get_logger
+
+logger = get_logger("jobs")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _generate(totals, risk_level):
+    from .engines import get_rag_engine
+    return get_rag_engine().generate_suggestions(totals, risk_level)
+
+
+def _store(date_str, totals, suggestions, user_id):
+    from .storage import save_suggestions
+    return save_suggestions(date_str, totals, suggestions, user_id)
+
+
+def job_date(job_id):
+    """The YYYY-MM-DD entry date a job ID was issued for."""
+    return job_id[:10]
+
+
+class SuggestionJob:
+    def __init__(self, job_id, date_str, totals, risk_level, user_id):
+        self.id = job_id
+        self.user_id = user_id
+        self.date = date_str
+        self.totals = totals
+        self.risk_level = risk_level
+        self.status = PENDING
+        self.suggestions = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        data = {"job_id": self.id, "date": self.date, "status": self.status, "suggestions": self.suggestions}
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class SuggestionJobs:
+    """
+    Runs generate_suggestions on a small thread pool and keeps recent jobs in
+    memory. Finished jobs are dropped after `ttl` seconds or once more than
+    `max_jobs` are held; their results stay available from the database.
+    """
+
+    def __init__(self, max_workers=None, max_jobs=None, ttl=None, generate=_generate, store=_store):
+        self.max_workers = max_workers or int(os.environ.get("SUGGESTION_WORKERS", 4))
+        self.max_jobs = max_jobs or int(os.environ.get("SUGGESTION_MAX_JOBS", 1000))
+        self.ttl = ttl if ttl is not None else int(os.environ.get("SUGGESTION_JOB_TTL", 900))
+        self.generate = generate
+        self.store = store
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self.completed = 0
+        self.failed = 0
+
+    def _get_executor(self):
+        # Created on first submit and per process, so a pre-forking server never inherits dead threads
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="suggestions")
+                self._executor_pid = os.getpid()
+                self._jobs.clear()
+            return self._executor
+
+    def submit(self, date_str, totals, risk_level, user_id=None):
+        """Queue suggestion generation for user_id's entry (default: the default user). Returns the job ID."""
+        from .storage import DEFAULT_USER
+        executor = self._get_executor()
+        job = SuggestionJob(f"{date_str}-{uuid.uuid4().hex}", date_str, totals, risk_level, user_id or DEFAULT_USER)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        executor.submit(self._run, job)
+        return job.id
+
+    def _run(self, job):
+        job.status = RUNNING
+        try:
+            job.suggestions = self.generate(job.totals, job.risk_level)
+            if not self.store(job.date, job.totals, job.suggestions, job.user_id):
+                logger.info("Entry %s changed before job %s finished; result not stored", job.date, job.id)
+            job.status = DONE
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"Suggestion Job Error: {e}")
+            job.error = str(e)
+            job.status = FAILED
+            with self._lock:
+                self.failed += 1
+        finally:
+            job.finished = time.time()
+            job.done.set()
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) < self.max_jobs and (job.finished is None or now - job.finished < self.ttl):
+                break
+            if job.finished is None:
+                # Oldest job still running; keep it and everything newer
+                break
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job finishes or timeout passes. Returns the job, or None if unknown."""
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def stats(self):
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if job.finished is None)
+            held = len(self._jobs)
+        return {
+            "workers": self.max_workers,
+            "active": active,
+            "held": held,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+suggestion_jobs = SuggestionJobs()
@@ -0,0 +1,145 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+ROOT_LOGGER = "glucovision"
+SECRET_ENV_VARS = ("EDAMAM_APP_ID", "EDAMAM_APP_KEY", "GROQ_API_KEY")
+# Catches secrets passed inline, e.g. "app_key=abc123" or "'app_key': 'abc123'"
+SECRET_PATTERN = re.compile(r"((?:app_id|app_key|api_key)['\"]?\s*[:=]\s*['\"]?)([^'\"&\s,}]+)", re.IGNORECASE)
+
+_listener = None
+_queue_handler = None
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def redact(text):
+    """Mask configured API credentials and inline key=value secrets in text."""
+    for name in SECRET_ENV_VARS:
+        secret = os.environ.get(name)
+        if secret and len(secret) > 3:
+            text = text.replace(secret, "[REDACTED]")
+    return SECRET_PATTERN.sub(r"\1[REDACTED]", text)
+
+
+class RedactingFilter(logging.Filter):
+    """Strips API credentials from the formatted message before it is written."""
+
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: if the writer falls behind, records are dropped and counted."""
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def worker_log_path(path, pid):
+    """trace.log -> trace.1234.log, so forked workers never rotate each other's file."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid}{ext}"
+
+
+def configure_logging(per_process=False):
+    """
+    Route the glucovision.* loggers through a queue to a background writer.
+
+    Tracing is off unless GLUCOVISION_TRACE_LOG names a file. When off, the
+    loggers sit above CRITICAL so every debug call is a single level check.
+    Each process writes its own file when per_process is set (a forked worker)
+    or GLUCOVISION_LOG_PER_PROCESS=1 (set by gunicorn.conf.py, which also covers
+    workers that import the app after the fork).
+    """
+    global _listener, _queue_handler
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.propagate = False
+    if _listener is not None:
+        return root
+
+    path = os.environ.get("GLUCOVISION_TRACE_LOG")
+    if not path:
+        root.handlers = [logging.NullHandler()]
+        root.setLevel(logging.CRITICAL + 1)
+        return root
+    if per_process or os.environ.get("GLUCOVISION_LOG_PER_PROCESS") == "1":
+        path = worker_log_path(path, os.getpid())
+
+    file_handler = RotatingFileHandler(
+        path,
+        maxBytes=int(os.environ.get("GLUCOVISION_LOG_MAX_BYTES", 5 * 1024 * 1024)),
+        backupCount=int(os.environ.get("GLUCOVISION_LOG_BACKUPS", 3)),
+        encoding="utf-8",
+    )
+    file_handler.addFilter(RedactingFilter())
+    file_handler.setFormatter(JSONFormatter())
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=int(os.environ.get("GLUCOVISION_LOG_QUEUE", 10000))))
+    root.handlers = [_queue_handler]
+    root.setLevel(os.environ.get("GLUCOVISION_LOG_LEVEL", "DEBUG").upper())
+
+    _listener = QueueListener(_queue_handler.queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return root
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _restart_after_fork():
+    # The writer thread doesn't survive fork(); a forked worker (e.g. gunicorn --preload) starts its own.
+    # RotatingFileHandler isn't safe across processes, so each worker also gets its own file.
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener = _queue_handler = None
+        configure_logging(per_process=True)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def logging_stats():
+    return {
+        "enabled": _listener is not None,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+    }
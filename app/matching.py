@@ -0,0 +1,288 @@
+import numpy as np
+from rapidfuzz import fuzz, process
+from typing import List, Dict, Tuple, Optional
+
+# extractOne's cached WRatio drops names that score a hair under a cutoff equal
+# to their own score, so the confirming scan asks for slightly less
+CUTOFF_SLACK = 0.01
+# Room for float rounding between the WRatio upper bound and the real score
+BOUND_EPSILON = 1e-6
+# Past this many names left after the bound, score the most promising ones to raise the cutoff first
+REFINE_ABOVE = 1024
+REFINE_BATCH = 256
+
+# Character buckets for the WRatio upper bound: ASCII letters (case folded), digits,
+# whitespace, NBSP/NEL, and everything else. Merging characters can only raise the bound.
+_BUCKETS = 39
+_WHITESPACE, _OTHER, _AMBIGUOUS = 36, 37, 38
+# rapidfuzz splits tokens on NBSP and NEL in some strings and not in others, depending
+# on how it stores them, so strings holding either get no bound
+_AMBIGUOUS_SPACES = np.array([0x85, 0xA0], dtype=np.uint32)
+_ASCII_BUCKET = np.full(128, _OTHER, dtype=np.int64)
+for _cp in range(128):
+    _ch = chr(_cp)
+    if _ch.isspace():
+        _ASCII_BUCKET[_cp] = _WHITESPACE
+    elif "a" <= _ch.lower() <= "z":
+        _ASCII_BUCKET[_cp] = ord(_ch.lower()) - ord("a")
+    elif "0" <= _ch <= "9":
+        _ASCII_BUCKET[_cp] = 26 + ord(_ch) - ord("0")
+_UNICODE_SPACES = np.array([cp for cp in range(128, 0x3001) if chr(cp).isspace()], dtype=np.uint32)
+
+
+def normalize_key(text: str) -> str:
+    """Lowercase and collapse whitespace so 'White  Bread ' and 'white bread' share a key."""
+    return " ".join(str(text).lower().split())
+
+
+def _char_counts(strings: List[str], chunk=65536) -> np.ndarray:
+    """Per-string character bucket counts, (len(strings), _BUCKETS) uint8, saturating at 255."""
+    out = np.zeros((len(strings), _BUCKETS), dtype=np.uint8)
+    for start in range(0, len(strings), chunk):
+        part = strings[start:start + chunk]
+        lengths = np.fromiter(map(len, part), dtype=np.int64, count=len(part))
+        cps = np.frombuffer("".join(part).encode("utf-32-le"), dtype=np.uint32)
+        buckets = np.where(cps < 128, _ASCII_BUCKET[np.minimum(cps, 127)],
+                           np.where(np.isin(cps, _AMBIGUOUS_SPACES), _AMBIGUOUS,
+                                    np.where(np.isin(cps, _UNICODE_SPACES), _WHITESPACE, _OTHER)))
+        rows = np.repeat(np.arange(len(part)), lengths)
+        counts = np.bincount(rows * _BUCKETS + buckets, minlength=len(part) * _BUCKETS)
+        out[start:start + len(part)] = np.minimum(counts, 255).reshape(len(part), _BUCKETS)
+    return out
+
+
+def _token_length(text: str) -> int:
+    """Length of the sorted, de-duplicated tokens joined by spaces, as WRatio's token scorers build them."""
+    tokens = set(text.split())
+    return sum(map(len, tokens)) + len(tokens) - 1 if tokens else 0
+
+
+def _trigrams(key: str):
+    # Pad each word so short words ("egg", "dal") still produce grams
+    grams = set()
+    for word in key.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+class FoodMatchIndex:
+    """
+    Precompiled lookup structure for NutritionEngine.fuzzy_match.
+
+    Lookups go through three tiers:
+    1. Exact hash lookup on the raw name (WRatio would score it 100 anyway).
+    2. Normalized-key hash lookup, used to seed the candidate set.
+    3. Trigram candidate index that narrows the list before WRatio scoring.
+
+    The best candidate score is only a lower bound. It is confirmed by
+    extractOne over every name whose WRatio upper bound (see _upper_bounds)
+    reaches it, in index order, so the result (name, score, and the lowest
+    index on ties) is the same as the old linear extractOne, below min_score
+    too. The bound is computed for every name with a few numpy operations
+    per row; WRatio itself only runs on the names that survive it.
+    """
+
+    def __init__(self, names: List[str], min_containment=0.5, max_candidates=256):
+        self.min_containment = min_containment
+        self.max_candidates = max_candidates
+
+        # Unique names in first-seen order, so ties break the same way extractOne does
+        self.names: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._normalized: Dict[str, int] = {}
+
+        gram_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+        gram_counts = []
+
+        for name in names:
+            if name in self._exact:
+                continue
+            idx = len(self.names)
+            self.names.append(name)
+            self._exact[name] = idx
+
+            key = normalize_key(name)
+            self._normalized.setdefault(key, idx)
+
+            grams = _trigrams(key)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                gid = gram_ids.get(gram)
+                if gid is None:
+                    gid = len(postings)
+                    gram_ids[gram] = gid
+                    postings.append([])
+                postings[gid].append(idx)
+
+        self._gram_ids = gram_ids
+        self._postings = [np.asarray(p, dtype=np.int32) for p in postings]
+        self._gram_counts = np.asarray(gram_counts, dtype=np.int32)
+
+        # Inputs to the WRatio upper bound
+        self._lengths = np.fromiter(map(len, self.names), dtype=np.int32, count=len(self.names))
+        self._token_lengths = np.fromiter(map(_token_length, self.names), dtype=np.int32, count=len(self.names))
+        self._char_counts = _char_counts(self.names)
+
+    def to_arrays(self):
+        """Flatten the index into plain lists/arrays (for the binary snapshot)."""
+        grams = sorted(self._gram_ids, key=self._gram_ids.get)
+        lengths = [len(p) for p in self._postings]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        postings = np.concatenate(self._postings) if self._postings else np.zeros(0, dtype=np.int32)
+        return {
+            "names": self.names,
+            "grams": grams,
+            "postings": postings.astype(np.int32),
+            "offsets": offsets,
+            "gram_counts": self._gram_counts,
+            "lengths": self._lengths,
+            "token_lengths": self._token_lengths,
+            "char_counts": self._char_counts,
+        }
+
+    @classmethod
+    def from_arrays(cls, names, grams, postings, offsets, gram_counts, lengths, token_lengths, char_counts,
+                    min_containment=0.5, max_candidates=256):
+        """Rebuild an index from to_arrays() output; arrays may be read-only memory maps."""
+        index = cls([], min_containment=min_containment, max_candidates=max_candidates)
+        index.names = list(names)
+        index._exact = {name: i for i, name in enumerate(index.names)}
+        for i, name in enumerate(index.names):
+            index._normalized.setdefault(normalize_key(name), i)
+        index._gram_ids = {gram: i for i, gram in enumerate(grams)}
+        index._postings = [postings[offsets[i]:offsets[i + 1]] for i in range(len(grams))]
+        index._gram_counts = gram_counts
+        index._lengths = lengths
+        index._token_lengths = token_lengths
+        index._char_counts = char_counts
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def _candidates(self, query: str) -> List[int]:
+        key = normalize_key(query)
+        seeds = []
+        if key in self._normalized:
+            seeds.append(self._normalized[key])
+
+        gids = [self._gram_ids[g] for g in _trigrams(key) if g in self._gram_ids]
+        if not gids:
+            return seeds
+
+        hits = np.bincount(np.concatenate([self._postings[g] for g in gids]))
+        found = np.flatnonzero(hits)
+        # Containment against the shorter side, so "white bread" still scores
+        # well for the longer phrase "slice of white bread" (WRatio's partial path)
+        query_grams = len(_trigrams(key))
+        containment = hits[found] / np.minimum(self._gram_counts[found], query_grams)
+
+        keep = containment >= self.min_containment
+        found, containment = found[keep], containment[keep]
+        if len(found) > self.max_candidates:
+            top = np.argpartition(-containment, self.max_candidates)[:self.max_candidates]
+            found = found[top]
+
+        return sorted(set(found.tolist()).union(seeds))
+
+    def _shares_word(self, query: str) -> np.ndarray:
+        """
+        Mask of names that may share a whole word with query. A name holding
+        the word holds every padded trigram of it, so this is a superset.
+        """
+        shared = np.zeros(len(self.names), dtype=bool)
+        for word in set(normalize_key(query).split()):
+            gids = [self._gram_ids.get(g) for g in _trigrams(word)]
+            if None in gids:
+                continue
+            hits = np.bincount(np.concatenate([self._postings[g] for g in gids]), minlength=len(self.names))
+            shared |= hits == len(gids)
+        return shared
+
+    def _upper_bounds(self, query: str) -> np.ndarray:
+        """
+        An upper bound on fuzz.WRatio(query, name) for every name.
+
+        WRatio takes the max of ratio, and either the token ratios x 0.95
+        (length ratio < 1.5) or partial_ratio and partial_token_ratio x 0.95,
+        scaled by 0.9 (length ratio <= 8) or 0.6. Each of those compares a
+        string x built from query's characters with a string y built from the
+        name's, so their common subsequence is at most h, the bucketed
+        character overlap capped at the shorter length. Then:
+          ratio                   <= 2h / (len(query) + len(name))
+          token ratios            <= 2h / (h + m), m the shorter de-duplicated token length
+          partial_ratio           <= 2h / (h + m), m the shorter raw length
+          partial_token_ratio     <= the token bound, or 100 when a word is shared
+        """
+        counts = _char_counts([query])[0]
+        if counts[_AMBIGUOUS]:
+            return np.full(len(self.names), 100.0)
+        overlap = np.minimum(self._char_counts, counts).sum(axis=1, dtype=np.int64)
+        lengths = self._lengths.astype(np.int64)
+        qlen, qtokens = len(query), _token_length(query)
+
+        def capped(m):
+            # 2h / (h + m) as a percentage, with h = min(overlap, m); 0 when a side has nothing to compare
+            h = np.minimum(overlap, m)
+            return np.where(m > 0, 200.0 * h / np.maximum(h + m, 1), 0.0)
+
+        short, long = np.minimum(lengths, qlen), np.maximum(lengths, qlen)
+        simple = 200.0 * np.minimum(overlap, short) / np.maximum(lengths + qlen, 1)
+        tokens = capped(np.minimum(self._token_lengths, qtokens))
+        partial = capped(short)
+
+        len_ratio = long / np.maximum(short, 1)
+        scale = np.where(len_ratio <= 8.0, 0.9, 0.6)
+        partial_tokens = np.where(self._shares_word(query), 100.0, tokens)
+        bounds = np.where(len_ratio < 1.5,
+                          np.maximum(simple, 0.95 * tokens),
+                          np.maximum(simple, scale * np.maximum(partial, 0.95 * partial_tokens)))
+        # Counts saturate at 255, so longer names are never ruled out
+        bounds[(lengths > 255) | (self._char_counts[:, _AMBIGUOUS] > 0)] = 100.0
+        return bounds
+
+    def _confirm(self, query: str, best_score: float):
+        """extractOne over the names that can reach best_score, in index order."""
+        bounds = self._upper_bounds(query)
+        survivors = np.flatnonzero(bounds >= best_score - CUTOFF_SLACK - BOUND_EPSILON)
+        while len(survivors) > REFINE_ABOVE:
+            # Score the names with the highest bounds; a better score rules out more names
+            top = survivors[np.argpartition(-bounds[survivors], REFINE_BATCH)[:REFINE_BATCH]]
+            scores = process.cdist([query], [self.names[i] for i in top], scorer=fuzz.WRatio, dtype=np.float64)[0]
+            if scores.max() <= best_score:
+                break
+            best_score = float(scores.max())
+            survivors = survivors[bounds[survivors] >= best_score - CUTOFF_SLACK - BOUND_EPSILON]
+        names = [self.names[i] for i in survivors]
+        return process.extractOne(query, names, scorer=fuzz.WRatio, score_cutoff=max(best_score - CUTOFF_SLACK, 0))
+
+    def lookup(self, query: str, min_score=80) -> Tuple[Optional[str], float]:
+        """
+        Returns (matched_name, score). matched_name is None when nothing
+        scores at least min_score.
+        """
+        if not query or not self.names:
+            return None, 0.0
+
+        if query in self._exact:
+            return query, 100.0
+
+        candidates = [self.names[i] for i in self._candidates(query)]
+        best_score = 0.0
+        if candidates:
+            match = process.extractOne(query, candidates, scorer=fuzz.WRatio)
+            if match:
+                best_score = float(match[1])
+
+        # An earlier name outside the candidate set may tie or beat it; the
+        # scan returns the first name with the highest score, as the linear one did
+        match = self._confirm(query, best_score)
+        if not match:
+            return None, best_score
+        if match[1] < min_score:
+            return None, float(match[1])
+        return match[0], float(match[1])
@@ -0,0 +1,311 @@
+"""
+In-process metrics in Prometheus text format, plus opt-in request profiling.
+
+Stage timers (`with stage("match"):`) feed the glucovision_stage_seconds
+histogram. When the current request is being profiled they also record a
+per-request breakdown. Metrics are per process: with several server workers,
+each one reports its own.
+
+Profiling is off unless REQUEST_PROFILING=1; then a request carrying
+`X-Profile: stages` gets a Server-Timing header (and a "profile" key in
+JSON bodies), and `X-Profile: cprofile` adds the top of a cProfile dump.
+"""
+import bisect
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+from flask import g, request
+
+# Seconds; spans cache hits (sub-ms) up to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_HEADER = "X-Profile"
+PROFILE_MODES = ("stages", "cprofile")
+
+_profile = contextvars.ContextVar("glucovision_profile", default=None)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+        out = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for le, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                out.append((f"{self.name}_bucket",
+                            _format_labels(self.labelnames, key, [("le", _format_value(le))]), cumulative))
+            out.append((f"{self.name}_sum", _format_labels(self.labelnames, key), total))
+            out.append((f"{self.name}_count", _format_labels(self.labelnames, key), count))
+        return out
+
+
+class CallbackMetric:
+    """Read at scrape time from fn(), which yields (labels dict, value) pairs; for stats kept elsewhere."""
+
+    def __init__(self, name, help, kind, fn):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        try:
+            rows = list(self.fn())
+        except Exception as e:
+            print(f"Metrics Error: {self.name}: {e}")
+            return []
+        return [(self.name, _format_labels(list(labels), list(labels.values())), value)
+                for labels, value in rows if value is not None]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name, help, kind, fn):
+        return self.register(CallbackMetric(name, help, kind, fn))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "glucovision_stage_seconds", "Time spent in each analysis stage.", ["stage"])
+HTTP_SECONDS = REGISTRY.histogram(
+    "glucovision_http_request_seconds", "HTTP request latency.", ["endpoint", "method", "status"])
+EXTERNAL_SECONDS = REGISTRY.histogram(
+    "glucovision_external_call_seconds", "Latency of calls to external services.", ["service", "outcome"])
+API_FALLBACKS = REGISTRY.counter(
+    "glucovision_api_fallbacks_total", "External calls answered by a local fallback.", ["service", "reason"])
+UNMATCHED_ITEMS = REGISTRY.counter(
+    "glucovision_unmatched_items_total", "Parsed food items with no local or API match.")
+ANALYZED_DAYS = REGISTRY.counter(
+    "glucovision_analyzed_days_total", "Days analyzed (single and bulk).")
+DATASET_RELOADS = REGISTRY.counter(
+    "glucovision_dataset_reloads_total", "Nutrition dataset reloads by outcome.", ["outcome"])
+PARSE_PATHS = REGISTRY.counter(
+    "glucovision_parse_path_total", "Meal texts parsed by the gazetteer fast path vs spaCy.", ["path"])
+
+
+class stage:
+    """
+    Times a block into glucovision_stage_seconds{stage=name} and, while a
+    request is being profiled, into its breakdown. Cost when not profiling:
+    two perf_counter() calls and one histogram update.
+    """
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        profile = _profile.get()
+        if profile is not None:
+            profile.append((self.name, elapsed))
+        return False
+
+
+def _cache_samples():
+    from .engines import registry
+
+    nutrition = registry.peek("nutrition")
+    nlp = registry.peek("nlp")
+    rag = registry.peek("rag")
+    caches = {}
+    if nutrition is not None:
+        caches["edamam"] = nutrition.api_cache.stats()
+        caches["match"] = nutrition.match_cache.stats()
+    if getattr(nlp, "parse_cache", None) is not None:
+        caches["parse"] = nlp.parse_cache.stats()
+    if rag is not None:
+        caches["suggestion"] = rag.suggestion_cache.stats()
+    from .routes import history_views
+    caches["history_views"] = history_views.stats()
+    for name, stats in caches.items():
+        hits = stats.get("hits", stats.get("memory_hits", 0) + stats.get("disk_hits", 0) + stats.get("negative_hits", 0))
+        yield {"cache": name, "result": "hit"}, hits
+        yield {"cache": name, "result": "miss"}, stats["misses"]
+
+
+def _job_samples():
+    from .jobs import suggestion_jobs
+    stats = suggestion_jobs.stats()
+    for state in ("active", "completed", "failed"):
+        yield {"state": state}, stats[state]
+
+
+def _breaker_samples():
+    from .resilience import resilience_stats
+    states = {"closed": 0, "half_open": 1, "open": 2}
+    for service, stats in resilience_stats().items():
+        yield {"service": service}, states[stats["state"]]
+
+
+def _timeout_samples():
+    from .resilience import resilience_stats
+    for service, stats in resilience_stats().items():
+        yield {"service": service}, stats["timeout"]
+
+
+REGISTRY.callback("glucovision_cache_lookups_total", "Cache and memo lookups by result.", "counter", _cache_samples)
+REGISTRY.callback("glucovision_suggestion_jobs", "Background suggestion jobs by state.", "gauge", _job_samples)
+REGISTRY.callback("glucovision_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open).",
+                  "gauge", _breaker_samples)
+REGISTRY.callback("glucovision_external_timeout_seconds", "Current adaptive timeout per service.",
+                  "gauge", _timeout_samples)
+
+
+def profiling_enabled():
+    return os.environ.get("REQUEST_PROFILING") == "1"
+
+
+def init_app(app):
+    """Time every request and honour the X-Profile header when REQUEST_PROFILING=1."""
+
+    @app.before_request
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+        mode = request.headers.get(PROFILE_HEADER) if profiling_enabled() else None
+        if mode in PROFILE_MODES:
+            g.profile_mode = mode
+            g.profile_token = _profile.set([])
+            if mode == "cprofile":
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+    @app.after_request
+    def _finish_request(response):
+        elapsed = time.perf_counter() - g.pop("metrics_start", time.perf_counter())
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+
+        mode = g.pop("profile_mode", None)
+        if mode is None:
+            return response
+
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        stages = list(_profile.get() or [])
+
+        timing = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in stages]
+        timing.append(f"total;dur={elapsed * 1000:.3f}")
+        response.headers["Server-Timing"] = ", ".join(timing)
+
+        if response.is_json and not response.is_streamed:
+            profile = {
+                "total_ms": round(elapsed * 1000, 3),
+                "stages": [{"stage": name, "ms": round(seconds * 1000, 3)} for name, seconds in stages],
+            }
+            if profiler is not None:
+                out = io.StringIO()
+                pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+                profile["cprofile"] = out.getvalue()
+            body = response.get_json()
+            if isinstance(body, dict):
+                body["profile"] = profile
+                response.set_data(json.dumps(body))
+        return response
+
+    @app.teardown_request
+    def _end_profile(exc):
+        # Runs even when the view raised; server threads are reused, so the context must be restored
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+        token = g.pop("profile_token", None)
+        if token is not None:
+            _profile.reset(token)
@@ -1,13 +1,69 @@
+import os
 import spacy
 
+from .cache import MemoCache, MISSING
+from .metrics import PARSE_PATHS
+
+# parse_meals only reads tokens, POS tags, the dependency tree and noun chunks,
+# so the entity recognizer and lemmatizer are never loaded.
+UNUSED_COMPONENTS = ["ner", "lemmatizer"]
+UNIT_WORDS = ["cup", "cups", "slice", "slices", "piece", "pieces", "bowl", "bowls", "glass", "glasses", "plate", "plates"]
+STOP_WORDS = {"a", "an", "the", "some", "of", "in", "with"}
+
+
+def clean_name(tokens):
+    text = " ".join([t.text for t in tokens if not t.is_punct and not t.like_num]).strip()
+    # Remove stop words
+    words = text.split()
+    return " ".join([w for w in words if w.lower() not in STOP_WORDS])
+
+
 class NLPEngine:
-    def __init__(self):
+    def __init__(self, batch_size=None, n_process=None):
+        self.batch_size = batch_size or int(os.environ.get("NLP_BATCH_SIZE", 64))
+        self.n_process = n_process or int(os.environ.get("NLP_N_PROCESS", 1))
+        # Raw meal text -> parsed items. Versioned by the gazetteer's dataset, since the fast path depends on it.
+        self.parse_cache = MemoCache(maxsize=int(os.environ.get("NLP_PARSE_CACHE_SIZE", 4096)))
+        # Dictionary fast path (app.gazetteer); set by use_gazetteer(), spaCy only until then
+        self.gazetteer = None
+        self.fast_path = os.environ.get("NLP_FAST_PATH", "1") != "0"
+        self.fast_hits = 0
+        self.fallbacks = 0
         try:
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS)
         except OSError:
             from spacy.cli import download
             download("en_core_web_sm")
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = spacy.load("en_core_web_sm", exclude=UNUSED_COMPONENTS)
+
+    def use_gazetteer(self, gazetteer):
+        """Answer formulaic text from the food vocabulary and only send the rest through spaCy."""
+        self.gazetteer = gazetteer
+        self.parse_cache.set_version(gazetteer.version)
+
+    def _fast_extract(self, text):
+        gazetteer = self.gazetteer if self.fast_path else None
+        if gazetteer is None:
+            return None
+        items = gazetteer.extract(text)
+        # Plain counters; an occasional lost update under threads only skews the reported rate
+        if items is None:
+            self.fallbacks += 1
+            PARSE_PATHS.inc(path="spacy")
+        else:
+            self.fast_hits += 1
+            PARSE_PATHS.inc(path="gazetteer")
+        return items
+
+    def fast_path_stats(self):
+        total = self.fast_hits + self.fallbacks
+        return {
+            "enabled": self.fast_path and self.gazetteer is not None,
+            "vocabulary": len(self.gazetteer) if self.gazetteer is not None else 0,
+            "hits": self.fast_hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": round(self.fast_hits / total, 4) if total else 0.0,
+        }
 
     def parse_meals(self, text: str):
         """
@@ -17,16 +73,62 @@ class NLPEngine:
         if not text:
             return []
 
-        doc = self.nlp(text)
+        cached = self.parse_cache.get(text)
+        if cached is not MISSING:
+            return list(cached)
+
+        version = self.parse_cache.version
+        items = self._fast_extract(text)
+        if items is None:
+            items = self._extract_items(self.nlp(text))
+        self.parse_cache.set(text, tuple(items), version)
+        return items
+
+    def parse_meals_batch(self, texts, batch_size=None, n_process=None):
+        """
+        Parse several meal texts in one batched nlp.pipe pass.
+        Returns one list of (food_name, quantity) per input text, in input order.
+        """
+        results = [[] for _ in texts]
+        # Only texts not seen before go through spaCy, each distinct one once
+        pending = {}
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            if text in pending:
+                pending[text].append(i)
+                continue
+            cached = self.parse_cache.get(text)
+            if cached is not MISSING:
+                results[i] = list(cached)
+            else:
+                pending[text] = [i]
+
+        version = self.parse_cache.version
+        for text in list(pending):
+            items = self._fast_extract(text)
+            if items is not None:
+                self.parse_cache.set(text, tuple(items), version)
+                for i in pending.pop(text):
+                    results[i] = list(items)
+        if not pending:
+            return results
+
+        docs = self.nlp.pipe(
+            iter(pending),
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process,
+        )
+        for (text, positions), doc in zip(pending.items(), docs):
+            items = self._extract_items(doc)
+            self.parse_cache.set(text, tuple(items), version)
+            for i in positions:
+                results[i] = list(items)
+        return results
+
+    def _extract_items(self, doc):
         items = []
         
-        def clean_name(tokens):
-            text = " ".join([t.text for t in tokens if not t.is_punct and not t.like_num]).strip()
-            # Remove stop words
-            words = text.split()
-            stop_words = {"a", "an", "the", "some", "of", "in", "with"}
-            return " ".join([w for w in words if w.lower() not in stop_words])
-
         processed_tokens = set()
         
         # Logic matches Step 1 implementation
@@ -40,7 +142,7 @@ class NLPEngine:
                 head = token.head
                 food_name = ""
                 
-                if head.text.lower() in ["cup", "cups", "slice", "slices", "piece", "pieces", "bowl", "bowls", "glass", "glasses", "plate", "plates"]:
+                if head.text.lower() in UNIT_WORDS:
                     of_child = next((c for c in head.children if c.text.lower() == "of"), None)
                     if of_child:
                         food_child = next((c for c in of_child.children if c.pos_ in ["NOUN", "PROPN"]), None)
@@ -1,72 +1,280 @@
-import pandas as pd
-from rapidfuzz import fuzz, process
+import numpy as np
 from typing import List, Dict, Tuple, Any
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, wait
+import importlib
+import threading
+import logging
 import os
+import time
+
+from . import dataset as dataset_module
+from .matching import FoodMatchIndex, normalize_key
+from .dataset import load_frame, dataset_version
+from .snapshot import load_snapshot, source_version
+from .food_table import FoodTable, NUTRIENT_COLUMNS, api_vector, sum_totals, round_totals
+from .cache import LRUCache, SQLiteCache, TieredCache, MemoCache, MISSING, default_cache_path
+from .logs import get_logger, redact
+from .resilience import get_guard, ServiceError, ServiceUnavailable
+from .metrics import stage, DATASET_RELOADS
+
+logger = get_logger("nutrition")
+
+EDAMAM_URL = "https://api.edamam.com/api/nutrition-data"
+
+
+class Dataset:
+    """
+    One loaded version of the food data. Never modified after it is built:
+    a reload builds a new Dataset and swaps it in, so a request that took a
+    reference keeps a consistent table, index and version until it finishes.
+    """
+
+    __slots__ = ("table", "match_index", "food_names", "version", "source", "loaded_at")
+
+    def __init__(self, table, match_index, version, source):
+        self.table = table
+        self.match_index = match_index
+        self.food_names = table.names
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+
+    @classmethod
+    def empty(cls):
+        return cls(FoodTable.empty(), FoodMatchIndex([]), None, None)
+
 
 class NutritionEngine:
     def __init__(self, csv_path):
-        self.df = None
-        self.food_names = []
-        self.food_lookup = {}
+        self.csv_path = csv_path
+        self.dataset = Dataset.empty()
+        self.api_cache = self._build_api_cache()
+        # (phrase, min_score, dataset version) -> (matched name, score); a new CSV, snapshot or PATCH_DATA resets it
+        self.match_cache = MemoCache(maxsize=int(os.environ.get("MATCH_CACHE_SIZE", 16384)))
+
+        # Hot reload: reload() rebuilds the dataset off the request path and swaps it in.
+        # DATASET_WATCH_INTERVAL > 0 also polls the CSV, snapshot and PATCH_DATA for changes.
+        self.watch_interval = float(os.environ.get("DATASET_WATCH_INTERVAL", 0))
+        self.last_reload = None
+        self._reload_lock = threading.Lock()
+        self._reload_listeners = []
+        self._watcher_lock = threading.Lock()
+        self._watcher_pid = None
+        self._patch_mtime = self._mtime(dataset_module.__file__)
+
+        # External lookups for one request fan out over a shared, bounded pool.
+        # EDAMAM_DEADLINE caps the wall time a request spends waiting on them.
+        self.api_workers = int(os.environ.get("EDAMAM_MAX_WORKERS", 8))
+        self.api_deadline = float(os.environ.get("EDAMAM_DEADLINE", 8))
+        self.api_url = os.environ.get("EDAMAM_API_URL", EDAMAM_URL)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.api_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Breaker, adaptive timeout, retries and bulkhead shared by every Edamam call in the process
+        self.api_guard = get_guard("edamam", "EDAMAM", max_timeout=5.0, max_concurrent=self.api_workers)
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
         self.load_data(csv_path)
 
+    def _build_api_cache(self):
+        # Cache Edamam results per normalized query so repeat foods skip the network.
+        # Set EDAMAM_CACHE_PATH to an empty string to keep the cache in-process only.
+        ttl = int(os.environ.get("EDAMAM_CACHE_TTL", 7 * 24 * 3600))
+        memory = LRUCache(maxsize=int(os.environ.get("EDAMAM_CACHE_SIZE", 2048)), ttl=ttl)
+
+        disk = None
+        path = os.environ.get("EDAMAM_CACHE_PATH", default_cache_path("api_cache.db"))
+        if path:
+            try:
+                disk = SQLiteCache(path, table="edamam_cache",
+                                   maxsize=int(os.environ.get("EDAMAM_CACHE_DISK_SIZE", 50000)), ttl=ttl)
+            except Exception as e:
+                print(f"Cache Error: {e}")
+
+        return TieredCache(memory, disk, negative_ttl=int(os.environ.get("EDAMAM_CACHE_NEGATIVE_TTL", 600)))
+
+    # Views of the current dataset. Code that needs several of them to agree
+    # should take self.dataset once and read from that instead.
+    @property
+    def table(self):
+        return self.dataset.table
+
+    @property
+    def match_index(self):
+        return self.dataset.match_index
+
+    @property
+    def food_names(self):
+        return self.dataset.food_names
+
+    @property
+    def dataset_version(self):
+        return self.dataset.version
+
+    @property
+    def dataset_source(self):
+        return self.dataset.source
+
+    def _load_dataset(self, csv_path) -> Dataset:
+        """Build a Dataset from a fresh snapshot if there is one, else from the CSV. Raises on failure."""
+        # Prefer the memory-mapped snapshot (python -m app.snapshot build) when it is fresh
+        if os.environ.get("NUTRITION_SNAPSHOT", "1") != "0":
+            snapshot = load_snapshot(csv_path)
+            if snapshot is not None:
+                meta, table, match_index = snapshot
+                return Dataset(table, match_index, meta["dataset_version"], "snapshot")
+
+        # The DataFrame is only needed to build the table and index; it is not kept
+        df = load_frame(csv_path)
+        table = FoodTable.from_dataframe(df)
+        # Built once here so fuzzy_match doesn't scan every name per phrase
+        match_index = FoodMatchIndex(df["food_name"].tolist())
+        return Dataset(table, match_index, dataset_version(csv_path), "csv")
+
+    def _swap(self, dataset):
+        # A single attribute store: every reader sees either the old dataset or the new one
+        self.dataset = dataset
+        self.match_cache.set_version(dataset.version)
+        for listener in list(self._reload_listeners):
+            try:
+                listener(dataset)
+            except Exception as e:
+                logger.warning("Dataset reload listener failed: %s", e)
 
     def load_data(self, csv_path):
         try:
-            self.df = pd.read_csv(csv_path)
-            # Normalize
-            self.df.columns = [c.strip().lower() for c in self.df.columns]
-            self.df["food_name"] = self.df["food_name"].astype(str).str.strip().str.lower()
-            
-            # PATCH: Fix known bad data (Zero sugar/nutrients for common items)
-            # Values are approx per 100g based on USDA
-            PATCH_DATA = {
-                "apple": {"calories": 52, "carbs": 14, "sugar": 10, "fiber": 2.4, "protein": 0.3, "fat": 0.2},
-                "banana": {"calories": 89, "carbs": 23, "sugar": 12, "fiber": 2.6, "protein": 1.1, "fat": 0.3},
-                "orange": {"calories": 47, "carbs": 12, "sugar": 9, "fiber": 2.4, "protein": 0.9, "fat": 0.1},
-                "grapes": {"calories": 69, "carbs": 18, "sugar": 15, "fiber": 0.9, "protein": 0.7, "fat": 0.2},
-                "strawberry": {"calories": 32, "carbs": 7.7, "sugar": 4.9, "fiber": 2.0, "protein": 0.7, "fat": 0.3},
-                "oatmeal": {"calories": 68, "carbs": 12, "sugar": 0.5, "fiber": 1.7, "protein": 2.4, "fat": 1.4},
-                "white bread": {"calories": 265, "carbs": 49, "sugar": 5, "fiber": 2.7, "protein": 9, "fat": 3.2},
-                "milk": {"calories": 50, "carbs": 4.8, "sugar": 5, "fiber": 0, "protein": 3.4, "fat": 2},
-                "egg": {"calories": 155, "carbs": 1.1, "sugar": 1.1, "fiber": 0, "protein": 13, "fat": 11},
-            }
-
-            for food, data in PATCH_DATA.items():
-                mask = self.df["food_name"] == food
-                if mask.any():
-                    # Update existing
-                    for col, val in data.items():
-                        if col in self.df.columns:
-                            self.df.loc[mask, col] = val
-                else:
-                    # Append new if not exists (simple append)
-                    new_row = {"food_name": food, **data}
-                    self.df = pd.concat([self.df, pd.DataFrame([new_row])], ignore_index=True)
-
-            self.food_names = self.df["food_name"].tolist()
-            self.food_lookup = {
-                row["food_name"]: row for _, row in self.df.iterrows()
-            }
+            self._swap(self._load_dataset(csv_path))
         except Exception as e:
+            # Keep serving whatever is loaded (empty on first load) rather than crash
             print(f"Error loading CSV: {e}")
-            # Initialize empty if fail, to prevent crash, but app should handle
-            self.df = pd.DataFrame()
 
-    def fuzzy_match(self, query: str, min_score=80) -> Tuple[str, pd.Series, float]:
+    def add_reload_listener(self, fn):
+        """Call fn(dataset) after every swap, e.g. to rebuild structures derived from the food names."""
+        self._reload_listeners.append(fn)
+
+    def reload(self, csv_path=None, force=False, background=True):
+        """
+        Rebuild the dataset and swap it in if its version changed (always with
+        force=True). Requests keep using the current dataset meanwhile.
+        Returns False if a reload is already running.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._reload(csv_path or self.csv_path, force)
+            finally:
+                self._reload_lock.release()
+
+        if background:
+            threading.Thread(target=run, name="dataset-reload", daemon=True).start()
+        else:
+            run()
+        return True
+
+    def _reload(self, csv_path, force):
+        start = time.perf_counter()
+        previous = self.dataset_version
+        try:
+            # PATCH_DATA lives in app/dataset.py; re-import it when that file has changed
+            mtime = self._mtime(dataset_module.__file__)
+            if mtime != self._patch_mtime:
+                importlib.reload(dataset_module)
+                self._patch_mtime = mtime
+            # Snapshot-only deployments have no CSV; the snapshot's version (checked against PATCH_DATA) stands in
+            if not force and previous is not None and source_version(csv_path) == previous:
+                outcome, dataset = "unchanged", self.dataset
+            else:
+                dataset = self._load_dataset(csv_path)
+                self._swap(dataset)
+                outcome = "swapped"
+        except Exception as e:
+            logger.warning("Dataset reload failed: %s", e)
+            DATASET_RELOADS.inc(outcome="failed")
+            self.last_reload = {"outcome": "failed", "error": str(e), "version": previous,
+                                "seconds": round(time.perf_counter() - start, 3), "finished_at": time.time()}
+            return
+        DATASET_RELOADS.inc(outcome=outcome)
+        self.last_reload = {"outcome": outcome, "error": None, "previous_version": previous,
+                            "version": dataset.version, "source": dataset.source,
+                            "seconds": round(time.perf_counter() - start, 3), "finished_at": time.time()}
+        logger.info("Dataset reload %s: %s -> %s in %ss", outcome, previous, dataset.version,
+                    self.last_reload["seconds"])
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _source_signature(self):
+        from .snapshot import default_snapshot_dir, META_FILE
+        return (
+            self._mtime(self.csv_path),
+            self._mtime(os.path.join(default_snapshot_dir(self.csv_path), META_FILE)),
+            self._mtime(dataset_module.__file__),
+        )
+
+    def _ensure_watcher(self):
+        # Started lazily and per process, so gunicorn workers forked after preload each get one
+        if self.watch_interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="dataset-watcher", daemon=True).start()
+
+    def _watch(self):
+        seen = self._source_signature()
+        while True:
+            time.sleep(self.watch_interval)
+            current = self._source_signature()
+            # Only mark the change as seen once a reload has actually started
+            if current != seen and self.reload(background=False):
+                seen = current
+
+    def dataset_status(self):
+        dataset = self.dataset
+        return {
+            "version": dataset.version,
+            "source": dataset.source,
+            "rows": len(dataset.table),
+            "loaded_at": dataset.loaded_at,
+            "reloading": self._reload_lock.locked(),
+            "watch_interval": self.watch_interval,
+            "last_reload": self.last_reload,
+        }
+
+    def fuzzy_match(self, query: str, min_score=80) -> Tuple[str, Dict[str, float], float]:
         if not query:
             return None, None, 0.0
-        
-        match = process.extractOne(query, self.food_names, scorer=fuzz.WRatio)
-        if not match:
-            return None, None, 0.0
 
-        matched_name, score, _ = match
-        if score < min_score:
-            return None, None, float(score)
+        dataset = self.dataset
+        matched_name, score = self._lookup(query, min_score, dataset)
+        if matched_name is None:
+            return None, None, score
 
-        return matched_name, self.food_lookup.get(matched_name), float(score)
+        return matched_name, dataset.table.row(matched_name), score
+
+    def _lookup(self, phrase: str, min_score=80, dataset=None) -> Tuple[str, float]:
+        """match_index.lookup through the memo; the same phrases come back day after day."""
+        dataset = dataset or self.dataset
+        # The version is part of the key, so a request still on the old dataset never reads a new-dataset match
+        key = (phrase, min_score, dataset.version)
+        cached = self.match_cache.get(key)
+        if cached is not MISSING:
+            return cached
+        result = dataset.match_index.lookup(phrase, min_score=min_score)
+        self.match_cache.set(key, result, dataset.version)
+        return result
 
     def _get_api_credentials(self):
         return os.environ.get("EDAMAM_APP_ID"), os.environ.get("EDAMAM_APP_KEY")
@@ -74,78 +282,95 @@ class NutritionEngine:
     def fetch_from_api(self, query: str) -> Dict[str, float]:
         app_id, app_key = self._get_api_credentials()
         
-        with open("debug_fallback.log", "a") as f:
-            f.write(f"API Call for '{query}'. Creds: {app_id}, {app_key}\n")
+        logger.debug("API call for %r", query)
 
         if not app_id or not app_key or "YOUR_" in app_key:
-            with open("debug_fallback.log", "a") as f:
-                f.write("Missing credentials.\n")
+            logger.debug("Missing credentials.")
             return None
-            
+
+        cache_key = normalize_key(query)
+        found, cached = self.api_cache.get(cache_key)
+        if found:
+            return dict(cached) if cached else None
+
+        try:
+            result = self.api_guard.call(lambda timeout: self._request_api(query, app_id, app_key, timeout))
+        except ServiceUnavailable as e:
+            if e.reason != "failed":
+                # Breaker open or too many calls in flight: use local values now, and don't cache that
+                logger.debug("Skipping API call for %r: %s", query, e)
+                return None
+            logger.debug("API exception for %r", query, exc_info=True)
+            # requests errors echo the URL, which carries the credentials
+            print(f"API Error: {redact(str(e))}")
+            result = None
+
+        # Misses and failures are cached too (with a shorter TTL)
+        self.api_cache.set(cache_key, result)
+        return dict(result) if result else None
+
+    def _request_api(self, query: str, app_id: str, app_key: str, timeout: float = 5) -> Dict[str, float]:
+        """One Edamam request. Raises on transport errors and 5xx/429 so the guard can count them."""
         # Edamam Nutrition Analysis API requires a quantity to return data.
         # If user didn't specify one (e.g. "blueberry cheesecake"), prepend "1 " to force a default match.
         if not query[0].isdigit():
              query = "1 " + query
 
         # SWITCHED TO NUTRITION ANALYSIS API based on user keys
-        url = "https://api.edamam.com/api/nutrition-data"
+        url = self.api_url
         params = {
             "app_id": app_id,
             "app_key": app_key,
             "ingr": query
         }
         
-        try:
-            with open("debug_fallback.log", "a") as f:
-                f.write(f"Sending Request to {url} with params {params}\n")
-            
-            response = requests.get(url, params=params, timeout=5)
+        logger.debug("Sending request to %s for %r", url, query)
+
+        response = self.session.get(url, params=params, timeout=timeout)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response status %s, body %s...", response.status_code, response.text[:200])
+
+        if response.status_code >= 500 or response.status_code == 429:
+            raise ServiceError(f"Edamam returned {response.status_code}")
+
+        if response.status_code == 200:
+            data = response.json()
             
-            with open("debug_fallback.log", "a") as f:
-                f.write(f"Response Status: {response.status_code}\n")
-                f.write(f"Response Body: {response.text[:200]}...\n")
-
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Nutrition Analysis API structure:
-                # 1. totalNutrients at root (Standard)
-                # 2. If missing, check ingredients[0].parsed[0].nutrients (Fallback)
-                
-                nutrients = None
-                if "totalNutrients" in data and data["totalNutrients"]:
-                    nutrients = data["totalNutrients"]
-                elif "ingredients" in data and data["ingredients"]:
-                    # Try to get from first parsed ingredient
-                    try:
-                        nutrients = data["ingredients"][0]["parsed"][0]["nutrients"]
-                    except (KeyError, IndexError):
-                        pass
-
-                if nutrients:
-                    return {
-                        "calories": nutrients.get("ENERC_KCAL", {}).get("quantity", 0),
-                        "protein": nutrients.get("PROCNT", {}).get("quantity", 0),
-                        "fat": nutrients.get("FAT", {}).get("quantity", 0),
-                        "carbs": nutrients.get("CHOCDF", {}).get("quantity", 0),
-                        "fiber": nutrients.get("FIBTG", {}).get("quantity", 0),
-                        "sugar": nutrients.get("SUGAR", {}).get("quantity", 0)
-                    }
-                elif "calories" in data and data["calories"] > 0:
-                     # Fallback if totalNutrients empty but calories exist
-                     return {
-                        "calories": data.get("calories", 0),
-                        "protein": 0,
-                        "fat": 0,
-                        "carbs": 0,
-                        "fiber": 0,
-                        "sugar": 0
-                     }
-        except Exception as e:
-            with open("debug_fallback.log", "a") as f:
-                f.write(f"EXCEPTION: {e}\n")
-            print(f"API Error: {e}")
+            # Nutrition Analysis API structure:
+            # 1. totalNutrients at root (Standard)
+            # 2. If missing, check ingredients[0].parsed[0].nutrients (Fallback)
             
+            nutrients = None
+            if "totalNutrients" in data and data["totalNutrients"]:
+                nutrients = data["totalNutrients"]
+            elif "ingredients" in data and data["ingredients"]:
+                # Try to get from first parsed ingredient
+                try:
+                    nutrients = data["ingredients"][0]["parsed"][0]["nutrients"]
+                except (KeyError, IndexError):
+                    pass
+
+            if nutrients:
+                return {
+                    "calories": nutrients.get("ENERC_KCAL", {}).get("quantity", 0),
+                    "protein": nutrients.get("PROCNT", {}).get("quantity", 0),
+                    "fat": nutrients.get("FAT", {}).get("quantity", 0),
+                    "carbs": nutrients.get("CHOCDF", {}).get("quantity", 0),
+                    "fiber": nutrients.get("FIBTG", {}).get("quantity", 0),
+                    "sugar": nutrients.get("SUGAR", {}).get("quantity", 0)
+                }
+            elif "calories" in data and data["calories"] > 0:
+                 # Fallback if totalNutrients empty but calories exist
+                 return {
+                    "calories": data.get("calories", 0),
+                    "protein": 0,
+                    "fat": 0,
+                    "carbs": 0,
+                    "fiber": 0,
+                    "sugar": 0
+                 }
+
         return None
 
     def calculate_risk(self, totals: Dict[str, float]) -> Tuple[str, str]:
@@ -195,66 +420,129 @@ class NutritionEngine:
 
         return level, reason
 
+    def _fetch_many(self, phrases: List[str]) -> Dict[str, Dict[str, float]]:
+        """
+        Fetch API data for several phrases concurrently on the shared pool.
+        Phrases still in flight when the per-request deadline passes resolve to None;
+        their results still land in the cache for the next request.
+        """
+        results = {phrase: None for phrase in phrases}
+        if not phrases:
+            return results
+
+        futures = {self._get_executor().submit(self.fetch_from_api, phrase): phrase for phrase in phrases}
+        done, not_done = wait(futures, timeout=self.api_deadline)
+        for future in done:
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                print(f"API Error: {redact(str(e))}")
+        if not_done:
+            print(f"API deadline of {self.api_deadline}s hit; {len(not_done)} lookup(s) skipped")
+
+        return results
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Per process, like the suggestion pool: a forked worker must not inherit the parent's dead threads
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.api_workers, thread_name_prefix="edamam")
+                    self._executor_pid = os.getpid()
+        return self._executor
+
     def analyze_meals(self, parsed_items: List[Tuple[str, float]]) -> Dict[str, Any]:
-        totals = {
-            "total_calories": 0.0,
-            "total_carbs": 0.0,
-            "total_sugar": 0.0,
-            "total_protein": 0.0,
-            "total_fat": 0.0,
-            "total_fiber": 0.0,
-        }
-        unmatched = []
-
-        for phrase, qty in parsed_items:
-            matched_name, row, score = self.fuzzy_match(phrase)
-            if row is None:
-                # Fallback to API
-                api_data = self.fetch_from_api(phrase)
-                if api_data:
-                    self._add_to_totals(totals, api_data, qty)
-                    continue
-                else:
-                    unmatched.append(phrase)
-                    continue
-            
+        return self.analyze_days([parsed_items])[0]
+
+    def _resolve_local(self, phrase: str, sugar_col: int, needs_api: List[str], dataset=None):
+        """Row index of the local match for phrase (or None), appending it to needs_api if the API should be asked."""
+        dataset = dataset or self.dataset
+        matched_name, score = self._lookup(phrase, dataset=dataset)
+        idx = dataset.table.row_index(matched_name) if matched_name is not None else None
+        if idx is None:
+            needs_api.append(phrase)
+        else:
             # Smart Fallback: If local data has 0 sugar but item doesn't claim to be sugar-free, check API
             # This fixes issues where CSV has missing sugar values (common in provided dataset)
-            local_sugar = float(row.get("sugar", 0) or 0)
-            
-            with open("debug_fallback.log", "a") as f:
-                f.write(f"Analyzed '{phrase}'. Matched '{matched_name}'. Sugar: {local_sugar}\n")
-            
+            local_sugar = float(dataset.table.matrix[idx, sugar_col])
+
+            logger.debug("Analyzed %r. Matched %r. Sugar: %s", phrase, matched_name, local_sugar)
+
             if local_sugar == 0 and "sugar free" not in matched_name and "zero sugar" not in matched_name:
-                with open("debug_fallback.log", "a") as f:
-                    f.write(f"Triggering API for '{phrase}'...\n")
-                
-                api_data = self.fetch_from_api(phrase)
-                
-                if api_data:
-                    with open("debug_fallback.log", "a") as f:
-                        f.write(f"API Result: {api_data}\n")
-                
-                if api_data and api_data.get("sugar", 0) > 0:
-                     self._add_to_totals(totals, api_data, qty)
-                     continue
-
-            totals["total_calories"] += float(row.get("calories", 0) or 0) * qty
-            totals["total_carbs"] += float(row.get("carbs", 0) or 0) * qty
-            totals["total_sugar"] += float(row.get("sugar", 0) or 0) * qty
-            totals["total_protein"] += float(row.get("protein", 0) or 0) * qty
-            totals["total_fat"] += float(row.get("fat", 0) or 0) * qty
-            totals["total_fiber"] += float(row.get("fiber", 0) or 0) * qty
-
-        # Round
-        rounded_totals = {k: round(v, 2) for k, v in totals.items()}
-        
-        return rounded_totals, unmatched
-    
-    def _add_to_totals(self, totals, data, qty):
-        totals["total_calories"] += float(data.get("calories", 0) or 0) * qty
-        totals["total_carbs"] += float(data.get("carbs", 0) or 0) * qty
-        totals["total_sugar"] += float(data.get("sugar", 0) or 0) * qty
-        totals["total_protein"] += float(data.get("protein", 0) or 0) * qty
-        totals["total_fat"] += float(data.get("fat", 0) or 0) * qty
-        totals["total_fiber"] += float(data.get("fiber", 0) or 0) * qty
+                logger.debug("Triggering API for %r", phrase)
+                needs_api.append(phrase)
+        return idx
+
+    def analyze_days(self, days: List[List[Tuple[str, float]]], dataset=None) -> List[Tuple[Dict[str, float], List[str]]]:
+        """
+        Batch form of analyze_meals: one (totals, unmatched) pair per day.
+
+        Every day is resolved first, the API is hit once for the union of
+        phrases that need it, and all totals come out of a single
+        quantities-times-nutrients reduction (see food_table.sum_totals).
+        All days use one dataset (the current one unless given), even if a
+        reload swaps in another midway.
+        """
+        self._ensure_watcher()
+        dataset = dataset or self.dataset
+        # Phase 1: resolve everything we can locally and note which phrases need the API
+        resolved_days = []
+        needs_api = []
+        # Backfills repeat the same phrases across days; resolve each distinct phrase once
+        lookups = {}
+        sugar_col = NUTRIENT_COLUMNS.index("sugar")
+        with stage("match"):
+            for parsed_items in days:
+                resolved = []
+                for phrase, qty in parsed_items:
+                    if phrase not in lookups:
+                        lookups[phrase] = self._resolve_local(phrase, sugar_col, needs_api, dataset)
+                    resolved.append((phrase, qty, lookups[phrase]))
+                resolved_days.append(resolved)
+
+        # Phase 2: one concurrent round-trip for every phrase that needs the API
+        with stage("api_fetch"):
+            api_results = self._fetch_many(needs_api)
+
+        # Phase 3: pick the source row for every item, in input order
+        with stage("totals"):
+            local_positions, local_rows = [], []
+            api_positions, api_rows = [], []
+            quantities, offsets, unmatched_days = [], [], []
+            for resolved in resolved_days:
+                offsets.append(len(quantities))
+                unmatched = []
+                for phrase, qty, idx in resolved:
+                    api_data = api_results.get(phrase)
+                    if idx is None:
+                        if api_data:
+                            api_positions.append(len(quantities))
+                            api_rows.append(api_vector(api_data))
+                            quantities.append(qty)
+                        else:
+                            unmatched.append(phrase)
+                        continue
+
+                    if phrase in api_results:
+                        if api_data:
+                            logger.debug("API result for %r: %s", phrase, api_data)
+
+                        if api_data and api_data.get("sugar", 0) > 0:
+                            api_positions.append(len(quantities))
+                            api_rows.append(api_vector(api_data))
+                            quantities.append(qty)
+                            continue
+
+                    local_positions.append(len(quantities))
+                    local_rows.append(idx)
+                    quantities.append(qty)
+                unmatched_days.append(unmatched)
+
+            values = np.zeros((len(quantities), len(NUTRIENT_COLUMNS)), dtype=np.float64)
+            if local_rows:
+                values[local_positions] = dataset.table.matrix[local_rows]
+            if api_rows:
+                values[api_positions] = api_rows
+
+            totals = sum_totals(values, np.asarray(quantities, dtype=np.float64), np.asarray(offsets, dtype=np.intp))
+        return [(round_totals(row), unmatched) for row, unmatched in zip(totals, unmatched_days)]
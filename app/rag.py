@@ -1,14 +1,42 @@
 import random
 import json
+import math
 import os
+import threading
+
+from .cache import LRUCache, SQLiteCache, TieredCache, default_cache_path
+from .fake_groq import FakeGroq
+from .resilience import get_guard
+from .metrics import stage
 
 try:
     from groq import Groq
 except ImportError:
     Groq = None
 
+# Totals within the same bins (plus the same risk level) share cached advice
+SUGGESTION_BINS = {
+    "total_sugar": 5,
+    "total_carbs": 20,
+    "total_fiber": 5,
+    "total_protein": 10,
+    "total_fat": 10,
+}
+MODEL_NAME = "llama-3.3-70b-versatile"
+
 class RAGEngine:
-    def __init__(self):
+    def __init__(self, client_factory=None):
+        # GROQ_FAKE=1 swaps in the offline client for tests and local runs
+        if client_factory is None:
+            client_factory = FakeGroq if os.environ.get("GROQ_FAKE") == "1" else Groq
+        self.client_factory = client_factory
+        # Groq calls share one breaker/bulkhead per process; retries are done by the guard, not the SDK
+        self.llm_guard = get_guard("groq", "GROQ", max_timeout=30.0, min_timeout=2.0, max_concurrent=4)
+        self.suggestion_cache = self._build_suggestion_cache()
+        self._client = None
+        self._client_key = None
+        self._client_lock = threading.Lock()
+
         # Clinical guidelines to inject into context, not to return directly
         self.clinical_context = """
         Clinical Guidelines for High Glycemic Management:
@@ -20,7 +48,41 @@ class RAGEngine:
         """
 
     def _get_api_key(self):
-        return os.environ.get("GROQ_API_KEY")
+        api_key = os.environ.get("GROQ_API_KEY")
+        if not api_key and self.client_factory and not getattr(self.client_factory, "requires_api_key", True):
+            api_key = "fake"
+        return api_key
+
+    def _build_suggestion_cache(self):
+        ttl = int(os.environ.get("SUGGESTION_CACHE_TTL", 24 * 3600))
+        memory = LRUCache(maxsize=int(os.environ.get("SUGGESTION_CACHE_SIZE", 512)), ttl=ttl)
+
+        disk = None
+        path = os.environ.get("SUGGESTION_CACHE_PATH", default_cache_path("api_cache.db"))
+        if path:
+            try:
+                disk = SQLiteCache(path, table="suggestion_cache",
+                                   maxsize=int(os.environ.get("SUGGESTION_CACHE_DISK_SIZE", 5000)), ttl=ttl)
+            except Exception as e:
+                print(f"Cache Error: {e}")
+
+        return TieredCache(memory, disk)
+
+    def _get_client(self, api_key):
+        # One long-lived client (and its connection pool) instead of one per call
+        with self._client_lock:
+            if self._client is None or self._client_key != api_key:
+                self._client = self.client_factory(api_key=api_key, max_retries=0)
+                self._client_key = api_key
+            return self._client
+
+    @staticmethod
+    def suggestion_key(totals, risk_level):
+        parts = [str(risk_level)]
+        for key, width in SUGGESTION_BINS.items():
+            value = float(totals.get(key, 0) or 0)
+            parts.append(f"{key}:{int(math.floor(value / width)) if math.isfinite(value) else 'nan'}")
+        return "|".join(parts)
 
     def generate_suggestions(self, totals, risk_level):
         """
@@ -29,9 +91,14 @@ class RAGEngine:
         """
         api_key = self._get_api_key()
         
-        if api_key and Groq:
+        if api_key and self.client_factory:
+            cache_key = self.suggestion_key(totals, risk_level)
+            found, cached = self.suggestion_cache.get(cache_key)
+            if found and cached:
+                return cached
+
             try:
-                client = Groq(api_key=api_key)
+                client = self._get_client(api_key)
                 
                 prompt = f"""
                 You are a senior clinical nutritionist specializing in diabetes and glycemic control.
@@ -63,28 +130,34 @@ class RAGEngine:
                 }}
                 """
                 
-                chat_completion = client.chat.completions.create(
-                    messages=[
-                        {"role": "system", "content": "You are a helpful nutrition assistant which outputs only valid JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    model="llama-3.3-70b-versatile",
-                    response_format={"type": "json_object"},
-                    temperature=0.7
-                )
+                messages = [
+                    {"role": "system", "content": "You are a helpful nutrition assistant which outputs only valid JSON."},
+                    {"role": "user", "content": prompt}
+                ]
+                with stage("llm"):
+                    chat_completion = self.llm_guard.call(lambda timeout: client.chat.completions.create(
+                        messages=messages,
+                        model=MODEL_NAME,
+                        response_format={"type": "json_object"},
+                        temperature=0.7,
+                        timeout=timeout
+                    ))
                 
                 response_content = chat_completion.choices[0].message.content
                 data = json.loads(response_content)
                 
-                if "suggestions" in data and "analysis" in data:
-                    return data
-                
-                return {
-                    "suggestions": data.get("suggestions", ["Guidance currently unavailable. Please focus on whole foods."]),
-                    "analysis": data.get("analysis", ["Analysis currently unavailable."])
-                }
+                if "suggestions" not in data or "analysis" not in data:
+                    data = {
+                        "suggestions": data.get("suggestions", ["Guidance currently unavailable. Please focus on whole foods."]),
+                        "analysis": data.get("analysis", ["Analysis currently unavailable."])
+                    }
+
+                # Only real model output is cached; fallbacks are cheap and may be transient
+                self.suggestion_cache.set(cache_key, data)
+                return data
 
             except Exception as e:
+                # Includes ServiceUnavailable: an open breaker or full bulkhead lands here without waiting
                 print(f"RAG Error: {e}")
                 return self._error_fallback()
         
@@ -110,25 +183,18 @@ class RAGEngine:
             ]
         }
 
-    def generate_weekly_context(self, history):
-        if not history:
+    def generate_weekly_context(self, summary):
+        """
+        Plain-language weekly summary from storage.get_window_summary():
+        days, sugar_high_days (> 40g) and fiber_low_days (< 25g).
+        """
+        total_days = summary.get('days', 0) if summary else 0
+        if not total_days:
             return "No data available for weekly analysis."
-        
-        sugar_high_days = 0
-        fiber_low_days = 0
-        total_days = len(history)
-
-        for entry in history:
-            totals = json.loads(entry['total_nutrition_json'])
-            sugar = totals.get('total_sugar', 0)
-            fiber = totals.get('total_fiber', 0)
-            
-            # Using 40g as the "safe" limit
-            if sugar > 40:
-                sugar_high_days += 1
-            if fiber < 25:
-                fiber_low_days += 1
-        
+
+        sugar_high_days = summary.get('sugar_high_days', 0)
+        fiber_low_days = summary.get('fiber_low_days', 0)
+
         messages = []
         if sugar_high_days > 0:
             messages.append(f"Sugar intake exceeded the safe limit on {sugar_high_days} of the last {total_days} days.")
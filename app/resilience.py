@@ -0,0 +1,260 @@
+"""
+Shared protection for calls to external services (Edamam, Groq).
+
+Each service gets one ServiceGuard per process combining:
+  - a circuit breaker that opens after consecutive failures and lets a
+    single trial call through once its reset timeout has passed,
+  - a timeout derived from recent latencies (p99 x multiplier, clamped to
+    [min_timeout, max_timeout]); a timed-out attempt counts as a sample at
+    the timeout it was given, and samples expire after latency_max_age,
+  - bounded retries with full-jitter exponential backoff,
+  - a bulkhead capping concurrent calls.
+
+Rejected calls raise ServiceUnavailable immediately, so callers can use
+their local fallback without waiting on the network.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from .logs import get_logger
+from .metrics import API_FALLBACKS, EXTERNAL_SECONDS
+
+logger = get_logger("resilience")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# A failed attempt that ran this share of its timeout is treated as having timed out
+TIMED_OUT_FRACTION = 0.9
+
+
+class ServiceUnavailable(Exception):
+    """Raised by ServiceGuard.call. reason is "open", "bulkhead" or "failed"."""
+
+    def __init__(self, service, reason, cause=None):
+        super().__init__(f"{service} unavailable ({reason})" + (f": {cause}" if cause else ""))
+        self.service = service
+        self.reason = reason
+        self.cause = cause
+
+
+class ServiceError(Exception):
+    """A response that means the service itself is unhealthy (5xx, 429)."""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_running:
+                # One trial call decides whether the service is back
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                    logger.info("%s circuit opened after %d failures", self.name, self.failures)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Sliding window of recent call durations, in seconds; samples older than max_age are dropped."""
+
+    def __init__(self, window=200, max_age=300.0):
+        self.max_age = max_age
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append((time.monotonic(), seconds))
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return len(self._samples)
+
+    def percentile(self, p):
+        with self._lock:
+            self._expire()
+            samples = sorted(seconds for _, seconds in self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+
+class ServiceGuard:
+    def __init__(self, name, max_timeout=5.0, min_timeout=0.5, timeout_multiplier=2.0, min_samples=20,
+                 retries=1, backoff=0.2, failure_threshold=5, reset_timeout=30.0, max_concurrent=8,
+                 latency_max_age=300.0):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.min_timeout = min_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.retries = retries
+        self.backoff = backoff
+        self.max_concurrent = max_concurrent
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.latency = LatencyTracker(max_age=latency_max_age)
+        self._bulkhead = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "retries": 0,
+                         "rejected_open": 0, "rejected_bulkhead": 0}
+
+    @classmethod
+    def from_env(cls, name, prefix, **defaults):
+        """Build a guard whose defaults can be overridden by <PREFIX>_* environment variables."""
+        env = {
+            "max_timeout": ("TIMEOUT", float),
+            "min_timeout": ("MIN_TIMEOUT", float),
+            "retries": ("RETRIES", int),
+            "failure_threshold": ("BREAKER_FAILURES", int),
+            "reset_timeout": ("BREAKER_RESET", float),
+            "max_concurrent": ("MAX_CONCURRENT", int),
+            "latency_max_age": ("LATENCY_MAX_AGE", float),
+        }
+        for arg, (suffix, cast) in env.items():
+            value = os.environ.get(f"{prefix}_{suffix}")
+            if value:
+                defaults[arg] = cast(value)
+        return cls(name, **defaults)
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def current_timeout(self):
+        """p99 of recent calls times the multiplier, within [min_timeout, max_timeout]."""
+        if len(self.latency) < self.min_samples:
+            return self.max_timeout
+        p99 = self.latency.percentile(99)
+        return min(self.max_timeout, max(self.min_timeout, p99 * self.timeout_multiplier))
+
+    def call(self, fn):
+        """
+        Run fn(timeout) under the breaker, bulkhead and retry policy and return
+        its result. Raises ServiceUnavailable when the call is rejected or every
+        attempt failed.
+        """
+        self._count("calls")
+        if not self._bulkhead.acquire(blocking=False):
+            self._count("rejected_bulkhead")
+            API_FALLBACKS.inc(service=self.name, reason="bulkhead")
+            raise ServiceUnavailable(self.name, "bulkhead")
+        if not self.breaker.allow():
+            self._bulkhead.release()
+            self._count("rejected_open")
+            API_FALLBACKS.inc(service=self.name, reason="open")
+            raise ServiceUnavailable(self.name, "open")
+
+        # The breaker's trial decides whether it closes again, so it gets the full ceiling
+        # rather than a timeout learned while the service was faster
+        full_timeout = self.breaker.state == HALF_OPEN
+        try:
+            attempt = 0
+            while True:
+                timeout = self.max_timeout if full_timeout else self.current_timeout()
+                start = time.perf_counter()
+                try:
+                    result = fn(timeout)
+                except Exception as e:
+                    elapsed = time.perf_counter() - start
+                    EXTERNAL_SECONDS.observe(elapsed, service=self.name, outcome="failure")
+                    # An attempt that used up its timeout is a censored sample: the call
+                    # took at least `timeout`. Recording it lets the timeout widen again.
+                    # The retry after it gets the full ceiling.
+                    full_timeout = elapsed >= timeout * TIMED_OUT_FRACTION
+                    if full_timeout:
+                        self.latency.add(timeout)
+                    self._count("failures")
+                    self.breaker.record_failure()
+                    logger.debug("%s attempt %d failed: %s", self.name, attempt + 1, e)
+                    if attempt >= self.retries or not self.breaker.allow():
+                        API_FALLBACKS.inc(service=self.name, reason="failed")
+                        raise ServiceUnavailable(self.name, "failed", e)
+                    attempt += 1
+                    self._count("retries")
+                    # Full jitter keeps many workers from retrying in lockstep
+                    time.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+                    continue
+
+                elapsed = time.perf_counter() - start
+                self.latency.add(elapsed)
+                EXTERNAL_SECONDS.observe(elapsed, service=self.name, outcome="success")
+                self._count("successes")
+                self.breaker.record_success()
+                return result
+        finally:
+            self._bulkhead.release()
+
+    def stats(self):
+        p50 = self.latency.percentile(50)
+        p99 = self.latency.percentile(99)
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "times_opened": self.breaker.times_opened,
+            "timeout": round(self.current_timeout(), 3),
+            "latency_p50": round(p50, 4) if p50 is not None else None,
+            "latency_p99": round(p99, 4) if p99 is not None else None,
+            "samples": len(self.latency),
+            "max_concurrent": self.max_concurrent,
+            **counters,
+        }
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(name, prefix, **defaults):
+    """The process-wide guard for a service, created from the environment on first use."""
+    guard = _guards.get(name)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(name)
+            if guard is None:
+                guard = _guards[name] = ServiceGuard.from_env(name, prefix, **defaults)
+    return guard
+
+
+def resilience_stats():
+    return {name: guard.stats() for name, guard in _guards.items()}
@@ -1,25 +1,55 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, Response, abort, make_response, render_template, request, jsonify, url_for
+from werkzeug.http import is_resource_modified
 from datetime import datetime
+import hmac
 import json
 import os
+import re
+import threading
+import time
 
-from .nutrition import NutritionEngine
-from .nlp import NLPEngine
-from .storage import log_daily_entry, get_history, get_user_settings, update_user_settings
-from .rag import RAGEngine
+from .storage import (
+    log_daily_entry, get_history, get_user_settings, update_user_settings,
+    get_recent_totals, get_window_summary, get_rollups, ROLLUP_PERIODS,
+    save_suggestions, get_suggestions, history_version, DEFAULT_USER
+)
+from .cache import MISSING, MemoCache
+from .engines import registry, get_rag_engine
+from .batch import analyze_records, import_records, parse_record, read_ndjson, SUGGESTION_MODES
+from .export import export_history, MIMETYPES
+from .jobs import suggestion_jobs, job_date, DONE, FAILED, PENDING
+from .logs import logging_stats
+from .metrics import REGISTRY, stage
+from .resilience import resilience_stats
 
 main_bp = Blueprint('main', __name__)
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CSV_PATH = os.path.join(BASE_DIR, "nutrition_master.csv")
+HISTORY_PAGE_SIZE = 30
+USER_HEADER = 'X-User-Id'
+USER_ID = re.compile(r'^[A-Za-z0-9_.@-]{1,64}$')
+# Rendered bodies of views that only depend on one user's history, keyed on that history's version
+history_views = MemoCache(maxsize=int(os.environ.get("HISTORY_VIEW_CACHE_SIZE", 256)))
+# Each open SSE stream holds a worker thread; past this many per process, clients are sent to polling
+suggestion_streams = threading.BoundedSemaphore(int(os.environ.get("SUGGESTION_MAX_STREAMS", 2)))
+STREAM_RETRY_AFTER = 2
 
-nutrition_engine = NutritionEngine(CSV_PATH)
-nlp_engine = NLPEngine()
-rag_engine = RAGEngine()
+def current_user_id():
+    """
+    The user a request acts for. With TRUST_USER_HEADER=1 this is the
+    X-User-Id header, set by the authenticating proxy in front of a
+    multi-user deployment. Otherwise the header is ignored, since any client
+    could send it, and every request acts for the default user.
+    """
+    if os.environ.get('TRUST_USER_HEADER') != '1':
+        return DEFAULT_USER
+    user_id = request.headers.get(USER_HEADER) or DEFAULT_USER
+    if not USER_ID.match(user_id):
+        abort(make_response(jsonify({"error": f"{USER_HEADER} must be 1-64 letters, digits or _.@-"}), 400))
+    return user_id
 
 @main_bp.route('/')
 def index():
-    settings = get_user_settings()
+    settings = get_user_settings(current_user_id())
     return render_template('index.html', name=settings.get('name', 'User'))
 
 @main_bp.route('/weekly-analysis')
@@ -28,12 +58,35 @@ def weekly_analysis():
 
 @main_bp.route('/history')
 def history():
-    entries = get_history()
-    return render_template('history.html', entries=entries)
+    """
+    Entries newest first, ?limit= per page. ?before=<date> is a keyset
+    cursor: the last date of the previous page.
+    """
+    user_id = current_user_id()
+    limit = max(1, min(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 200))
+    before = request.args.get('before') or None
+    if before:
+        try:
+            datetime.strptime(before, "%Y-%m-%d")
+        except ValueError:
+            return jsonify({"error": "before must be YYYY-MM-DD"}), 400
+
+    def render():
+        # One extra row tells whether an older page exists
+        entries = get_history(limit + 1, before=before, user_id=user_id)
+        page_args = {} if limit == HISTORY_PAGE_SIZE else {"limit": limit}
+        older_url = None
+        if len(entries) > limit:
+            older_url = url_for('main.history', before=entries[limit - 1]['date'], **page_args)
+        newest_url = url_for('main.history', **page_args) if before else None
+        return render_template('history.html', entries=entries[:limit],
+                               older_url=older_url, newest_url=newest_url)
+
+    return _history_view(user_id, ('history', before, limit), render)
 
 @main_bp.route('/settings')
 def settings():
-    settings = get_user_settings()
+    settings = get_user_settings(current_user_id())
     return render_template('settings.html', settings=settings)
 
 @main_bp.route('/about')
@@ -43,34 +96,178 @@ def about():
 @main_bp.route('/analyze', methods=['POST'])
 def analyze():
     data = request.get_json() or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be a JSON object"}), 400
+    user_id = current_user_id()
     
+    # Same normalisation as batch.parse_record: numbers become text, null becomes ""
     meals = {
-        "breakfast": data.get("breakfast", ""),
-        "lunch": data.get("lunch", ""),
-        "snacks": data.get("snacks", ""),
-        "dinner": data.get("dinner", "")
+        "breakfast": str(data.get("breakfast") or ""),
+        "lunch": str(data.get("lunch") or ""),
+        "snacks": str(data.get("snacks") or ""),
+        "dinner": str(data.get("dinner") or "")
     }
     
-    all_text = f"{meals['breakfast']} {meals['lunch']} {meals['snacks']} {meals['dinner']}"
-    
-    parsed_items = nlp_engine.parse_meals(all_text)
-    
-    totals, unmatched = nutrition_engine.analyze_meals(parsed_items)
-    
-    risk_level, risk_reason = nutrition_engine.calculate_risk(totals)
-    
     today = datetime.now().strftime("%Y-%m-%d")
-    log_daily_entry(today, meals, totals, risk_level, risk_reason)
-    
-    suggestions = rag_engine.generate_suggestions(totals, risk_level)
+    # Same pipeline as the bulk importer, with a single record
+    analysis = analyze_records([(today, meals)])[0]
+    totals, risk_level, risk_reason = analysis["totals"], analysis["risk_level"], analysis["risk_reason"]
+    with stage("db_write"):
+        log_daily_entry(today, meals, totals, risk_level, risk_reason, user_id)
     
-    return jsonify({
+    result = {
         "totals": totals,
         "risk_level": risk_level,
         "risk_reason": risk_reason,
-        "suggestions": suggestions,
-        "unmatched": unmatched
-    })
+        "suggestions": None,
+        "unmatched": analysis["unmatched"],
+        "dataset_version": analysis["dataset_version"]
+    }
+
+    if request.args.get('sync') == '1':
+        # Old blocking behaviour for clients that can't poll
+        result["suggestions"] = get_rag_engine().generate_suggestions(totals, risk_level)
+        save_suggestions(today, totals, result["suggestions"], user_id)
+        return _with_dataset_version(jsonify(result), result["dataset_version"])
+
+    # The LLM call takes seconds; hand it to the pool and answer with the numbers now
+    job_id = suggestion_jobs.submit(today, totals, risk_level, user_id)
+    result["suggestion_job"] = job_id
+    result["suggestions_url"] = url_for('main.suggestion_status', job_id=job_id)
+    result["suggestions_stream"] = url_for('main.suggestion_stream', job_id=job_id)
+    return _with_dataset_version(jsonify(result), result["dataset_version"])
+
+def _with_dataset_version(response, version):
+    if version:
+        response.headers['X-Dataset-Version'] = version
+    return response
+
+@main_bp.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze and store many days at once. Body is either JSON
+    {"records": [{"date": ..., "breakfast": ...}, ...], "suggestions": "none"|"deferred"}
+    or NDJSON (one record per line) with ?suggestions= in the query string.
+    Malformed records are reported in "errors" and skipped.
+    """
+    user_id = current_user_id()
+    records, errors = [], []
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        mode = request.args.get('suggestions', 'none')
+        lines = request.get_data(as_text=True).splitlines()
+        for number, record, error in read_ndjson(lines):
+            if error:
+                errors.append({"line": number, "error": error})
+            else:
+                records.append(record)
+    else:
+        data = request.get_json(silent=True) or {}
+        mode = data.get('suggestions', request.args.get('suggestions', 'none'))
+        for number, record in enumerate(data.get('records') or [], 1):
+            try:
+                records.append(parse_record(record))
+            except ValueError as e:
+                errors.append({"line": number, "error": str(e)})
+
+    if mode not in SUGGESTION_MODES:
+        return jsonify({"error": f"suggestions must be one of {', '.join(SUGGESTION_MODES)}"}), 400
+    max_records = int(os.environ.get("BATCH_MAX_RECORDS", 10000))
+    if len(records) > max_records:
+        return jsonify({"error": f"At most {max_records} records per request; use the CLI for larger imports"}), 413
+
+    results, summary = import_records(records, mode, user_id=user_id)
+    for r in results:
+        del r["meals"]
+    summary["errors"] = errors
+    return jsonify({"summary": summary, "results": results})
+
+@main_bp.route('/api/export/history')
+def history_export():
+    """
+    Stream the history as ?format=ndjson|csv, optionally filtered by
+    ?start=/?end= (YYYY-MM-DD) and ?risk=High,Moderate, and gzipped with
+    ?gzip=1. Rows are read and sent in chunks, so memory stays flat however
+    long the history is.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    risk_levels = [r for value in request.args.getlist('risk') for r in value.split(',') if r]
+    gzip = request.args.get('gzip') == '1'
+    user_id = current_user_id()
+    try:
+        parts = export_history(fmt, request.args.get('start'), request.args.get('end'), risk_levels, gzip,
+                               user_id=user_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    filename = f"history.{fmt}{'.gz' if gzip else ''}"
+    return Response(parts, mimetype='application/gzip' if gzip else MIMETYPES[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}"',
+                             "X-Accel-Buffering": "no"})
+
+def _suggestion_state(job_id, user_id):
+    """
+    Job status as a dict, or None if user_id has no such job. Jobs this
+    process no longer holds (or never ran) are answered from the stored entry.
+    """
+    job = suggestion_jobs.get(job_id)
+    if job is not None:
+        return job.to_dict() if job.user_id == user_id else None
+
+    date_str = job_date(job_id)
+    try:
+        datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return None
+    exists, suggestions = get_suggestions(date_str, user_id)
+    if not exists:
+        return None
+    status = DONE if suggestions is not None else PENDING
+    return {"job_id": job_id, "date": date_str, "status": status, "suggestions": suggestions}
+
+@main_bp.route('/api/suggestions/<job_id>')
+def suggestion_status(job_id):
+    state = _suggestion_state(job_id, current_user_id())
+    if state is None:
+        return jsonify({"error": "Unknown suggestion job"}), 404
+    return jsonify(state), 200 if state["status"] in (DONE, FAILED) else 202
+
+@main_bp.route('/api/suggestions/<job_id>/stream')
+def suggestion_stream(job_id):
+    """
+    Server-Sent Events: keep-alive comments until the job finishes, then one
+    `suggestions` event. When SUGGESTION_MAX_STREAMS streams are already
+    open in this process, answers 503 with Retry-After and the polling URL.
+    """
+    user_id = current_user_id()
+    if _suggestion_state(job_id, user_id) is None:
+        return jsonify({"error": "Unknown suggestion job"}), 404
+
+    if not suggestion_streams.acquire(blocking=False):
+        response = jsonify({"error": "Too many open suggestion streams",
+                            "poll": url_for('main.suggestion_status', job_id=job_id)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(STREAM_RETRY_AFTER)
+        return response
+
+    timeout = float(os.environ.get("SUGGESTION_STREAM_TIMEOUT", 30))
+
+    def events():
+        deadline = time.monotonic() + timeout
+        while True:
+            state = _suggestion_state(job_id, user_id)
+            if state is None or state["status"] in (DONE, FAILED) or time.monotonic() >= deadline:
+                break
+            # Wakes as soon as a local job finishes; jobs run elsewhere are re-read from the DB
+            if suggestion_jobs.wait(job_id, timeout=min(5.0, max(0.0, deadline - time.monotonic()))) is None:
+                time.sleep(1.0)
+            yield ": keep-alive\n\n"
+        state = state or {"job_id": job_id, "status": FAILED, "suggestions": None}
+        yield f"event: suggestions\ndata: {json.dumps(state)}\n\n"
+
+    response = Response(events(), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Released when the server closes the response, even if the client left before the first event
+    response.call_on_close(suggestion_streams.release)
+    return response
 
 @main_bp.route('/api/settings', methods=['POST'])
 def update_settings_api():
@@ -80,42 +277,38 @@ def update_settings_api():
         data.get('name'), 
         float(data.get('sugar_limit', 25.0)),
         data.get('weekly', False),
-        data.get('monthly', False)
+        data.get('monthly', False),
+        user_id=current_user_id()
     )
     return jsonify({"status": "success"})
 
 @main_bp.route('/api/settings/status')
 def settings_status():
-    settings = get_user_settings()
+    settings = get_user_settings(current_user_id())
     is_setup = settings.get('name') != 'User'
     return jsonify({"setup_complete": is_setup})
 
 @main_bp.route('/api/stats/weekly')
 def weekly_stats():
-    history = get_history(limit=7)
-    
-    history_asc = history[::-1]
-    
-    dates = []
-    sugar = []
-    carbs = []
-    fiber = []
-    risk_counts = {"Safe": 0, "Moderate": 0, "High": 0}
-    
-    for entry in history_asc:
-        d = datetime.strptime(entry['date'], "%Y-%m-%d")
-        dates.append(d.strftime("%d/%m"))
-        
-        totals = json.loads(entry['total_nutrition_json'])
-        sugar.append(totals.get('total_sugar', 0))
-        carbs.append(totals.get('total_carbs', 0))
-        fiber.append(totals.get('total_fiber', 0))
-        
-        r_level = entry['risk_level']
-        if r_level in risk_counts:
-            risk_counts[r_level] += 1
-            
-    context = rag_engine.generate_weekly_context(history)
+    user_id = current_user_id()
+    return _history_view(user_id, ('weekly',), lambda: _weekly_stats_payload(user_id))
+
+def _weekly_stats_payload(user_id):
+    # Numeric columns and SQL aggregates; no per-row JSON decoding
+    history_asc = get_recent_totals(limit=7, user_id=user_id)[::-1]
+    summary = get_window_summary(limit=7, user_id=user_id)
+
+    dates = [datetime.strptime(entry['date'], "%Y-%m-%d").strftime("%d/%m") for entry in history_asc]
+    sugar = [entry['total_sugar'] or 0 for entry in history_asc]
+    carbs = [entry['total_carbs'] or 0 for entry in history_asc]
+    fiber = [entry['total_fiber'] or 0 for entry in history_asc]
+    risk_counts = {
+        "Safe": summary["safe_days"],
+        "Moderate": summary["moderate_days"],
+        "High": summary["high_days"]
+    }
+
+    context = get_rag_engine().generate_weekly_context(summary)
     
     return jsonify({
         "dates": dates,
@@ -125,3 +318,168 @@ def weekly_stats():
         "risk_counts": risk_counts,
         "context": context
     })
+
+def _history_view(user_id, key, render):
+    """
+    Serve a GET whose body depends only on user_id's history. The ETag is
+    that history's version, so a client revalidating an unchanged view gets
+    a 304 before any table is read. Otherwise the body is rendered at most
+    once per version and key, and served from history_views after that;
+    bodies of superseded versions simply age out of the LRU.
+    """
+    tag, modified = history_version(user_id)
+    if not is_resource_modified(request.environ, etag=tag, last_modified=modified):
+        response = Response(status=304)
+    else:
+        cached = history_views.get((tag, key))
+        if cached is MISSING:
+            rendered = make_response(render())
+            cached = (rendered.get_data(), rendered.mimetype)
+            history_views.set((tag, key), cached)
+        response = Response(cached[0], mimetype=cached[1])
+    response.set_etag(tag)
+    if modified is not None:
+        response.last_modified = modified
+    # Browsers may keep the body but must revalidate before using it, and it differs per user
+    response.cache_control.no_cache = True
+    response.vary.add(USER_HEADER)
+    return response
+
+def _rollup_payload(rows):
+    """Turn rollup rows (newest first) into chart-ready buckets (oldest first) plus a window summary."""
+    buckets = []
+    summary = {"days": 0, "sugar_high_days": 0, "fiber_low_days": 0,
+               "safe_days": 0, "moderate_days": 0, "high_days": 0}
+    for row in reversed(rows):
+        days = row['days']
+        buckets.append({
+            "bucket": row['bucket'],
+            "days": days,
+            "avg_calories": round(row['sum_calories'] / days, 2),
+            "avg_carbs": round(row['sum_carbs'] / days, 2),
+            "avg_sugar": round(row['sum_sugar'] / days, 2),
+            "avg_protein": round(row['sum_protein'] / days, 2),
+            "avg_fat": round(row['sum_fat'] / days, 2),
+            "avg_fiber": round(row['sum_fiber'] / days, 2),
+            "risk_counts": {"Safe": row['safe_days'], "Moderate": row['moderate_days'], "High": row['high_days']},
+            "sugar_high_days": row['sugar_high_days'],
+            "fiber_low_days": row['fiber_low_days'],
+        })
+        for key in summary:
+            summary[key] += row[key]
+    return buckets, summary
+
+@main_bp.route('/api/stats/monthly')
+def monthly_stats():
+    months = request.args.get('months', 12, type=int)
+    buckets, summary = _rollup_payload(
+        get_rollups("month", limit=max(1, min(months, 1200)), user_id=current_user_id())
+    )
+    return jsonify({
+        "buckets": buckets,
+        "summary": summary,
+        "context": get_rag_engine().generate_weekly_context(summary)
+    })
+
+@main_bp.route('/api/stats/range')
+def range_stats():
+    """
+    Stats between ?start= and ?end= (YYYY-MM-DD) at ?granularity=day|week|month.
+    Week and month buckets overlapping the range are returned whole.
+    """
+    granularity = request.args.get('granularity', 'day')
+    start = request.args.get('start')
+    end = request.args.get('end')
+    if granularity not in ROLLUP_PERIODS:
+        return jsonify({"error": f"granularity must be one of {', '.join(ROLLUP_PERIODS)}"}), 400
+    try:
+        for value in (start, end):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+
+    buckets, summary = _rollup_payload(get_rollups(granularity, start, end, user_id=current_user_id()))
+    return jsonify({
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "buckets": buckets,
+        "summary": summary,
+        "context": get_rag_engine().generate_weekly_context(summary)
+    })
+
+def _admin_denied():
+    """
+    A 403 response unless the request sends ADMIN_TOKEN as X-Admin-Token.
+    Admin routes stay closed while ADMIN_TOKEN is unset, since a proxy on
+    the same host makes every request look local.
+    """
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({"error": "Admin routes are disabled; set ADMIN_TOKEN to enable them"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+@main_bp.route('/api/admin/dataset')
+def dataset_status():
+    denied = _admin_denied()
+    if denied:
+        return denied
+    engine = registry.peek("nutrition")
+    if engine is None:
+        return jsonify({"error": "Nutrition engine is still loading"}), 503
+    return jsonify(engine.dataset_status())
+
+@main_bp.route('/api/admin/dataset/reload', methods=['POST'])
+def dataset_reload():
+    """
+    Rebuild the nutrition dataset and swap it in without a restart. Needs
+    X-Admin-Token. Only this worker process reloads; with several workers,
+    use DATASET_WATCH_INTERVAL. {"wait": true} answers once the reload is
+    done, {"force": true} swaps even if the version is unchanged.
+    """
+    denied = _admin_denied()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    engine = registry.get("nutrition")
+    wait = bool(data.get('wait'))
+    if not engine.reload(force=bool(data.get('force')), background=not wait):
+        return jsonify({"error": "A reload is already running", **engine.dataset_status()}), 409
+    return jsonify(engine.dataset_status()), 200 if wait else 202
+
+@main_bp.route('/healthz')
+def healthz():
+    # Liveness only: the process is up and serving, engines may still be loading
+    return jsonify({"status": "ok"})
+
+@main_bp.route('/readyz')
+def readyz():
+    status = registry.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@main_bp.route('/metrics')
+def prometheus_metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@main_bp.route('/api/metrics')
+def metrics_api():
+    nutrition_engine = registry.peek("nutrition")
+    nlp_engine = registry.peek("nlp")
+    rag_engine = registry.peek("rag")
+    return jsonify({
+        "edamam_cache": nutrition_engine.api_cache.stats() if nutrition_engine else None,
+        "suggestion_cache": rag_engine.suggestion_cache.stats() if rag_engine else None,
+        "suggestion_jobs": suggestion_jobs.stats(),
+        "memo": {
+            "parse": nlp_engine.parse_cache.stats() if getattr(nlp_engine, "parse_cache", None) is not None else None,
+            "match": nutrition_engine.match_cache.stats() if nutrition_engine else None,
+            "history_views": history_views.stats()
+        },
+        "nlp_fast_path": nlp_engine.fast_path_stats() if hasattr(nlp_engine, "fast_path_stats") else None,
+        "dataset": nutrition_engine.dataset_status() if nutrition_engine else None,
+        "resilience": resilience_stats(),
+        "logging": logging_stats()
+    })
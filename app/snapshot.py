@@ -0,0 +1,191 @@
+"""
+Versioned binary snapshot of the nutrition dataset.
+
+The snapshot holds the food table (PATCH_DATA already merged) and the match
+index as .npy files that NutritionEngine memory-maps on start, so every
+worker shares one page-cached copy instead of re-parsing the CSV.
+
+    python -m app.snapshot build [--csv nutrition_master.csv] [--out DIR]
+    python -m app.snapshot info
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from .dataset import load_frame, patch_hash, dataset_version
+from .food_table import FoodTable, NUTRIENT_COLUMNS
+from .matching import FoodMatchIndex
+
+FORMAT_VERSION = 2
+META_FILE = "meta.json"
+
+
+def default_snapshot_dir(csv_path):
+    root, _ = os.path.splitext(csv_path)
+    return root + ".snapshot"
+
+
+def _csv_signature(csv_path):
+    stat = os.stat(csv_path)
+    return {"csv_size": stat.st_size, "csv_mtime_ns": stat.st_mtime_ns}
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def build_snapshot(csv_path, out_dir=None):
+    """Parse and patch the CSV once, then write the snapshot. Returns its meta dict."""
+    out_dir = out_dir or default_snapshot_dir(csv_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    df = load_frame(csv_path)
+    table = FoodTable.from_dataframe(df)
+    index = FoodMatchIndex(table.names).to_arrays()
+    version = dataset_version(csv_path)
+
+    # Data files carry the version in their name and meta.json is replaced last,
+    # so a reader never sees a half-written snapshot.
+    files = {
+        "matrix": f"nutrients-{version}.npy",
+        "names": f"names-{version}.json",
+        "index_names": f"index-names-{version}.json",
+        "grams": f"grams-{version}.json",
+        "postings": f"postings-{version}.npy",
+        "offsets": f"offsets-{version}.npy",
+        "gram_counts": f"gram-counts-{version}.npy",
+        "lengths": f"lengths-{version}.npy",
+        "token_lengths": f"token-lengths-{version}.npy",
+        "char_counts": f"char-counts-{version}.npy",
+    }
+    np.save(os.path.join(out_dir, files["matrix"]), table.matrix)
+    np.save(os.path.join(out_dir, files["postings"]), index["postings"])
+    np.save(os.path.join(out_dir, files["offsets"]), index["offsets"])
+    for key in ("gram_counts", "lengths", "token_lengths", "char_counts"):
+        np.save(os.path.join(out_dir, files[key]), index[key])
+    _write_json(os.path.join(out_dir, files["names"]), table.names)
+    _write_json(os.path.join(out_dir, files["index_names"]), index["names"])
+    _write_json(os.path.join(out_dir, files["grams"]), index["grams"])
+
+    previous = read_meta(out_dir)
+
+    meta = {
+        "format_version": FORMAT_VERSION,
+        "dataset_version": version,
+        "patch_hash": patch_hash(),
+        "columns": NUTRIENT_COLUMNS,
+        "rows": len(table),
+        "files": files,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "build_seconds": round(time.perf_counter() - start, 3),
+        **_csv_signature(csv_path),
+    }
+    _write_json(os.path.join(out_dir, META_FILE), meta)
+
+    # Clean up data files from the snapshot this one replaced
+    if previous and previous.get("dataset_version") != version:
+        for name in previous.get("files", {}).values():
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError:
+                pass
+
+    return meta
+
+
+def read_meta(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(meta, csv_path):
+    """A snapshot is fresh when its format, PATCH_DATA and CSV size/mtime all still match."""
+    if not meta or meta.get("format_version") != FORMAT_VERSION:
+        return False
+    if meta.get("patch_hash") != patch_hash() or meta.get("columns") != NUTRIENT_COLUMNS:
+        return False
+    if not os.path.exists(csv_path):
+        # Deployments may ship the snapshot without the CSV
+        return True
+    signature = _csv_signature(csv_path)
+    return all(meta.get(k) == v for k, v in signature.items())
+
+
+def source_version(csv_path, snapshot_dir=None):
+    """
+    Version of the data a load would see now: the CSV's, or a fresh
+    snapshot's when the CSV isn't shipped. None if neither is there.
+    """
+    if os.path.exists(csv_path):
+        return dataset_version(csv_path)
+    meta = read_meta(snapshot_dir or default_snapshot_dir(csv_path))
+    return meta["dataset_version"] if is_fresh(meta, csv_path) else None
+
+
+def load_snapshot(csv_path, snapshot_dir=None):
+    """
+    Memory-map a fresh snapshot. Returns (meta, FoodTable, FoodMatchIndex),
+    or None when the snapshot is missing, stale or unreadable.
+    """
+    snapshot_dir = snapshot_dir or default_snapshot_dir(csv_path)
+    meta = read_meta(snapshot_dir)
+    if not is_fresh(meta, csv_path):
+        return None
+
+    files = {k: os.path.join(snapshot_dir, v) for k, v in meta["files"].items()}
+    try:
+        with open(files["names"], encoding="utf-8") as f:
+            names = json.load(f)
+        with open(files["index_names"], encoding="utf-8") as f:
+            index_names = json.load(f)
+        with open(files["grams"], encoding="utf-8") as f:
+            grams = json.load(f)
+        table = FoodTable(names, np.load(files["matrix"], mmap_mode="r"))
+        index = FoodMatchIndex.from_arrays(
+            index_names,
+            grams,
+            np.load(files["postings"], mmap_mode="r"),
+            np.load(files["offsets"], mmap_mode="r"),
+            np.load(files["gram_counts"], mmap_mode="r"),
+            np.load(files["lengths"], mmap_mode="r"),
+            np.load(files["token_lengths"], mmap_mode="r"),
+            np.load(files["char_counts"], mmap_mode="r"),
+        )
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Snapshot Error: {e}")
+        return None
+
+    return meta, table, index
+
+
+def main():
+    from .engines import CSV_PATH
+
+    parser = argparse.ArgumentParser(description="Build or inspect the nutrition dataset snapshot.")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--out", default=None, help="Snapshot directory (default: next to the CSV)")
+    args = parser.parse_args()
+
+    out_dir = args.out or default_snapshot_dir(args.csv)
+    if args.command == "build":
+        meta = build_snapshot(args.csv, out_dir)
+    else:
+        meta = read_meta(out_dir)
+        if meta:
+            meta["fresh"] = is_fresh(meta, args.csv)
+    print(json.dumps(meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -84,6 +84,7 @@ async function handleAnalysis() {
         if (data.error) throw new Error(data.error);
 
         displayResults(data);
+        if (data.suggestion_job) loadSuggestions(data);
 
         // Real-time update of graphs
         await updateDashboard();
@@ -130,7 +131,19 @@ function displayResults(data) {
 
     riskDesc.textContent = data.risk_reason || data.risk_level;
 
-    // Suggestions & Analysis
+    // Suggestions & Analysis (filled in later when generated in the background)
+    renderSuggestions(data.suggestions, data.suggestion_job ? 'Generating personalized suggestions...' : null);
+
+    // Unmatched
+    if (data.unmatched.length > 0) {
+        alert('Could not match: ' + data.unmatched.join(', '));
+    }
+
+    // Scroll to results
+    riskEl.scrollIntoView({ behavior: 'smooth' });
+}
+
+function renderSuggestions(data, placeholder) {
     const sugList = document.getElementById('sug-list');
     sugList.innerHTML = '';
 
@@ -138,11 +151,11 @@ function displayResults(data) {
     let suggestions = [];
     let analysis = [];
 
-    if (Array.isArray(data.suggestions)) {
-        suggestions = data.suggestions;
-    } else if (typeof data.suggestions === 'object') {
-        suggestions = data.suggestions.suggestions || [];
-        analysis = data.suggestions.analysis || [];
+    if (Array.isArray(data)) {
+        suggestions = data;
+    } else if (data && typeof data === 'object') {
+        suggestions = data.suggestions || [];
+        analysis = data.analysis || [];
     }
 
     // Render Suggestions
@@ -153,7 +166,9 @@ function displayResults(data) {
             sugList.appendChild(li);
         });
     } else {
-        sugList.innerHTML = '<li>No specific suggestions for this entry.</li>';
+        const li = document.createElement('li');
+        li.textContent = placeholder || 'No specific suggestions for this entry.';
+        sugList.appendChild(li);
     }
 
     // Render Analysis (Dynamic Section)
@@ -198,14 +213,55 @@ function displayResults(data) {
     } else {
         analysisContainer.style.display = 'none';
     }
+}
 
-    // Unmatched
-    if (data.unmatched.length > 0) {
-        alert('Could not match: ' + data.unmatched.join(', '));
+// Suggestions arrive after the numbers: listen on the SSE stream, or poll where EventSource is unavailable
+let currentSuggestionJob = null;
+
+function loadSuggestions(data) {
+    const jobId = data.suggestion_job;
+    currentSuggestionJob = jobId;
+    const finish = (state) => {
+        // A newer analysis replaced this one while it was generating
+        if (currentSuggestionJob !== jobId) return;
+        if (!state || state.status !== 'done') {
+            renderSuggestions(null, 'Suggestions are unavailable right now.');
+            return;
+        }
+        renderSuggestions(state.suggestions);
+    };
+
+    if (window.EventSource) {
+        const source = new EventSource(data.suggestions_stream);
+        source.addEventListener('suggestions', (e) => {
+            source.close();
+            finish(JSON.parse(e.data));
+        });
+        source.onerror = () => {
+            source.close();
+            pollSuggestions(data.suggestions_url, finish);
+        };
+        return;
     }
+    pollSuggestions(data.suggestions_url, finish);
+}
 
-    // Scroll to results
-    riskEl.scrollIntoView({ behavior: 'smooth' });
+async function pollSuggestions(url, finish, attempts = 60) {
+    for (let i = 0; i < attempts; i++) {
+        try {
+            const response = await fetch(url);
+            if (response.status === 404) break;
+            const state = await response.json();
+            if (state.status === 'done' || state.status === 'failed') {
+                finish(state);
+                return;
+            }
+        } catch (err) {
+            // Transient network error; try again on the next tick
+        }
+        await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+    finish(null);
 }
 
 async function handleSettingsUpdate(e) {
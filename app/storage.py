@@ -1,105 +1,487 @@
 import sqlite3
 import json
 import os
-from datetime import datetime
+import threading
+from datetime import datetime, timedelta, timezone
 
 DB_NAME = "nutrition.db"
+# Owner of entries and settings when no user is given, and of everything written before schema 6
+DEFAULT_USER = "default"
+
+# Bumped whenever _migrate gains a step; stored in PRAGMA user_version
+SCHEMA_VERSION = 6
+TOTAL_COLUMNS = ["total_calories", "total_carbs", "total_sugar", "total_protein", "total_fat", "total_fiber"]
+
+# One connection per thread (and per process, so forked workers never share one).
+# sqlite3 caches prepared statements per connection keyed on the SQL text, so
+# the statements below are module constants and get compiled once per thread.
+_local = threading.local()
+
+# Every per-user statement leads with user_id, so the (user_id, ...) indexes keep
+# reads and writes proportional to that user's rows, however many users there are.
+UPSERT_DAILY_ENTRY = '''
+    INSERT INTO user_history (user_id, date, meals_json, total_nutrition_json, risk_level, risk_reason,
+                              total_calories, total_carbs, total_sugar, total_protein, total_fat, total_fiber)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(user_id, date) DO UPDATE SET
+        meals_json = excluded.meals_json,
+        total_nutrition_json = excluded.total_nutrition_json,
+        risk_level = excluded.risk_level,
+        risk_reason = excluded.risk_reason,
+        total_calories = excluded.total_calories,
+        total_carbs = excluded.total_carbs,
+        total_sugar = excluded.total_sugar,
+        total_protein = excluded.total_protein,
+        total_fat = excluded.total_fat,
+        total_fiber = excluded.total_fiber,
+        suggestions_json = NULL,
+        timestamp = CURRENT_TIMESTAMP
+'''
+# Only lands if the row still holds the totals the suggestions were generated for
+UPDATE_SUGGESTIONS = '''
+    UPDATE user_history SET suggestions_json = ? WHERE user_id = ? AND date = ? AND total_nutrition_json = ?
+'''
+SELECT_SUGGESTIONS = 'SELECT suggestions_json FROM user_history WHERE user_id = ? AND date = ?'
+SELECT_HISTORY = 'SELECT * FROM user_history WHERE user_id = ? ORDER BY date DESC LIMIT ?'
+# Keyset page: the unique (user_id, date) index seeks straight to the cursor, so deep pages cost the same as the first
+SELECT_HISTORY_BEFORE = 'SELECT * FROM user_history WHERE user_id = ? AND date < ? ORDER BY date DESC LIMIT ?'
+# Every write to a user's history bumps that user's version in the same transaction
+BUMP_HISTORY_VERSION = '''
+    INSERT INTO history_versions (user_id, version, updated_at) VALUES (?, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT(user_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+'''
+SELECT_HISTORY_VERSION = '''
+    SELECT m.epoch, v.version, v.updated_at
+    FROM history_meta m LEFT JOIN history_versions v ON v.user_id = ?
+    WHERE m.id = 1
+'''
+SELECT_RECENT_TOTALS = '''
+    SELECT date, risk_level, total_calories, total_carbs, total_sugar, total_protein, total_fat, total_fiber
+    FROM user_history WHERE user_id = ? ORDER BY date DESC LIMIT ?
+'''
+# Aggregates over a user's most recent N entries; the (user_id, date) index serves the inner ORDER BY/LIMIT
+SELECT_WINDOW_SUMMARY = '''
+    SELECT
+        COUNT(*) AS days,
+        SUM(COALESCE(total_sugar, 0) > 40) AS sugar_high_days,
+        SUM(COALESCE(total_fiber, 0) < 25) AS fiber_low_days,
+        AVG(total_sugar) AS avg_sugar,
+        AVG(total_carbs) AS avg_carbs,
+        AVG(total_fiber) AS avg_fiber,
+        SUM(total_sugar) AS sum_sugar,
+        SUM(total_carbs) AS sum_carbs,
+        SUM(total_fiber) AS sum_fiber,
+        SUM(risk_level = 'Safe') AS safe_days,
+        SUM(risk_level = 'Moderate') AS moderate_days,
+        SUM(risk_level = 'High') AS high_days
+    FROM (SELECT * FROM user_history WHERE user_id = ? ORDER BY date DESC LIMIT ?)
+'''
+SELECT_SETTINGS = 'SELECT * FROM user_settings WHERE user_id = ?'
+# Columns streamed by iter_history, in order
+EXPORT_COLUMNS = ["user_id", "date", "risk_level", "risk_reason"] + TOTAL_COLUMNS + ["meals_json", "suggestions_json"]
+
+# Rollup buckets: day = YYYY-MM-DD, week = Monday of the ISO week (YYYY-MM-DD), month = YYYY-MM
+ROLLUP_PERIODS = ("day", "week", "month")
+ROLLUP_COLUMNS = ["days"] + [f"sum_{c[len('total_'):]}" for c in TOTAL_COLUMNS] + [
+    "safe_days", "moderate_days", "high_days", "sugar_high_days", "fiber_low_days"
+]
+# Same thresholds as the weekly summary: sugar safe limit 40g, fiber target 25g
+ROLLUP_AGGREGATES = '''
+    COUNT(*),
+    SUM(COALESCE(total_calories, 0)), SUM(COALESCE(total_carbs, 0)), SUM(COALESCE(total_sugar, 0)),
+    SUM(COALESCE(total_protein, 0)), SUM(COALESCE(total_fat, 0)), SUM(COALESCE(total_fiber, 0)),
+    SUM(risk_level = 'Safe'), SUM(risk_level = 'Moderate'), SUM(risk_level = 'High'),
+    SUM(COALESCE(total_sugar, 0) > 40), SUM(COALESCE(total_fiber, 0) < 25)
+'''
+SELECT_BUCKET_AGGREGATES = f'SELECT {ROLLUP_AGGREGATES} FROM user_history WHERE user_id = ? AND date BETWEEN ? AND ?'
+UPSERT_ROLLUP = f'''
+    INSERT OR REPLACE INTO history_rollups (user_id, period, bucket, {", ".join(ROLLUP_COLUMNS)})
+    VALUES (?, ?, ?, {", ".join("?" for _ in ROLLUP_COLUMNS)})
+'''
+DELETE_ROLLUP = 'DELETE FROM history_rollups WHERE user_id = ? AND period = ? AND bucket = ?'
+SELECT_ROLLUPS = f'''
+    SELECT bucket, {", ".join(ROLLUP_COLUMNS)} FROM history_rollups
+    WHERE user_id = ? AND period = ? AND bucket BETWEEN ? AND ?
+    ORDER BY bucket DESC LIMIT ?
+'''
 
 def get_db_path():
     base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    return os.path.join(base_dir, DB_NAME)
+    return os.environ.get("GLUCOVISION_DB", os.path.join(base_dir, DB_NAME))
+
+def _configure(conn):
+    # WAL lets readers run alongside a writer; NORMAL sync is durable across
+    # app crashes in WAL mode and avoids an fsync per commit.
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA cache_size=-{int(os.environ.get("SQLITE_CACHE_KB", 16384))}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+
+def get_connection():
+    """Return this thread's connection, opening and configuring it on first use."""
+    path = get_db_path()
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != path or _local.pid != os.getpid():
+        conn = sqlite3.connect(path, timeout=30, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        _configure(conn)
+        _local.conn, _local.path, _local.pid = conn, path, os.getpid()
+        _local.history_versions = None
+    return conn
+
+def close_connection():
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn = None
 
 def init_db():
     """Initialize the SQLite database with required tables."""
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            api_key TEXT,
-            sugar_limit REAL DEFAULT 25.0,
-            weekly_alert_enabled INTEGER DEFAULT 0,
-            monthly_alert_enabled INTEGER DEFAULT 0
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS user_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            meals_json TEXT, -- JSON string of meals input
-            total_nutrition_json TEXT, -- JSON string of calculated totals
-            risk_level TEXT,
-            risk_reason TEXT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    cursor.execute('SELECT count(*) FROM user_settings')
-    if cursor.fetchone()[0] == 0:
-        cursor.execute('INSERT INTO user_settings (name, sugar_limit) VALUES (?, ?)', ("User", 25.0))
-
-    conn.commit()
-    conn.close()
-
-def get_user_settings():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM user_settings LIMIT 1')
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else {}
-
-def update_user_settings(name, sugar_limit, weekly, monthly, api_key=None):
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-    
-    if api_key is None:
-        cursor.execute('''
-            UPDATE user_settings 
-            SET name = ?, sugar_limit = ?, weekly_alert_enabled = ?, monthly_alert_enabled = ?
-            WHERE id = (SELECT id FROM user_settings LIMIT 1)
-        ''', (name, sugar_limit, int(weekly), int(monthly)))
-    else:
+    conn = get_connection()
+    with conn:
+        cursor = conn.cursor()
+
         cursor.execute('''
-            UPDATE user_settings 
-            SET name = ?, sugar_limit = ?, weekly_alert_enabled = ?, monthly_alert_enabled = ?, api_key = ?
-            WHERE id = (SELECT id FROM user_settings LIMIT 1)
-        ''', (name, sugar_limit, int(weekly), int(monthly), api_key))
-        
-    conn.commit()
-    conn.close()
-
-def log_daily_entry(date_str, meals, totals, risk_level, risk_reason):
-    conn = sqlite3.connect(get_db_path())
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT id FROM user_history WHERE date = ?', (date_str,))
-    existing = cursor.fetchone()
-
-    if existing:
+            CREATE TABLE IF NOT EXISTS user_settings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                api_key TEXT,
+                sugar_limit REAL DEFAULT 25.0,
+                weekly_alert_enabled INTEGER DEFAULT 0,
+                monthly_alert_enabled INTEGER DEFAULT 0
+            )
+        ''')
+
         cursor.execute('''
-            UPDATE user_history 
-            SET meals_json = ?, total_nutrition_json = ?, risk_level = ?, risk_reason = ?, timestamp = CURRENT_TIMESTAMP
-            WHERE date = ?
-        ''', (json.dumps(meals), json.dumps(totals), risk_level, risk_reason, date_str))
+            CREATE TABLE IF NOT EXISTS user_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT NOT NULL,
+                meals_json TEXT, -- JSON string of meals input
+                total_nutrition_json TEXT, -- JSON string of calculated totals
+                risk_level TEXT,
+                risk_reason TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        _migrate(conn)
+
+        cursor.execute('INSERT OR IGNORE INTO user_settings (user_id, name, sugar_limit) VALUES (?, ?, ?)',
+                       (DEFAULT_USER, "User", 25.0))
+
+def _add_column(conn, table, column, decl):
+    existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if column not in existing:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+def _migrate(conn):
+    """Bring an existing database up to SCHEMA_VERSION. Each step is idempotent."""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+
+    if version < 1:
+        # One row per date, which the upsert in log_daily_entry relies on.
+        # Older databases may hold duplicates from racing writers; keep the newest.
+        conn.execute('''
+            DELETE FROM user_history
+            WHERE id NOT IN (SELECT MAX(id) FROM user_history GROUP BY date)
+        ''')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_user_history_date ON user_history(date)')
+
+    if version < 2:
+        # Real columns for the totals so stats can aggregate in SQL; backfill from the JSON blob
+        for column in TOTAL_COLUMNS:
+            _add_column(conn, 'user_history', column, 'REAL')
+        rows = conn.execute(
+            'SELECT id, total_nutrition_json FROM user_history WHERE total_nutrition_json IS NOT NULL'
+        ).fetchall()
+        updates = []
+        for row in rows:
+            try:
+                totals = json.loads(row[1]) or {}
+            except ValueError:
+                continue
+            updates.append([totals.get(c) for c in TOTAL_COLUMNS] + [row[0]])
+        conn.executemany(
+            f'UPDATE user_history SET {", ".join(c + " = ?" for c in TOTAL_COLUMNS)} WHERE id = ?', updates
+        )
+
+    if version < 3:
+        # Maintained daily/weekly/monthly rollups so long-range stats read O(buckets) rows
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS history_rollups (
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                {", ".join(f"{c} {'INTEGER' if c.endswith('_days') or c == 'days' else 'REAL'} DEFAULT 0" for c in ROLLUP_COLUMNS)},
+                PRIMARY KEY (period, bucket)
+            )
+        ''')
+        conn.execute('DELETE FROM history_rollups')
+        for period, expr in (("day", "date"),
+                             ("week", "date(date, 'weekday 0', '-6 days')"),
+                             ("month", "substr(date, 1, 7)")):
+            conn.execute(f'''
+                INSERT INTO history_rollups (period, bucket, {", ".join(ROLLUP_COLUMNS)})
+                SELECT '{period}', {expr}, {ROLLUP_AGGREGATES}
+                FROM user_history GROUP BY {expr}
+            ''')
+
+    if version < 4:
+        # Suggestions generated in the background are stored next to the entry they describe
+        _add_column(conn, 'user_history', 'suggestions_json', 'TEXT')
+
+    if version < 5:
+        # Version counter for user_history so views derived from it can be cached and revalidated.
+        # The random epoch keeps versions from a recreated database from matching old ETags.
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS history_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                epoch TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO history_meta (id, epoch, version, updated_at)
+            VALUES (1, lower(hex(randomblob(8))), 0, (SELECT MAX(timestamp) FROM user_history))
+        ''')
+
+    if version < 6:
+        # Many users per database. Existing rows belong to DEFAULT_USER, and user_id
+        # leads every key so one user's reads and writes never scan other users' rows.
+        _add_column(conn, 'user_history', 'user_id', f"TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+        conn.execute('DROP INDEX IF EXISTS idx_user_history_date')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_user_history_user_date ON user_history(user_id, date)')
+
+        conn.execute('ALTER TABLE history_rollups RENAME TO history_rollups_v5')
+        conn.execute(f'''
+            CREATE TABLE history_rollups (
+                user_id TEXT NOT NULL,
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                {", ".join(f"{c} {'INTEGER' if c.endswith('_days') or c == 'days' else 'REAL'} DEFAULT 0" for c in ROLLUP_COLUMNS)},
+                PRIMARY KEY (user_id, period, bucket)
+            )
+        ''')
+        columns = ", ".join(["period", "bucket"] + ROLLUP_COLUMNS)
+        conn.execute(f'INSERT INTO history_rollups (user_id, {columns}) SELECT ?, {columns} FROM history_rollups_v5',
+                     (DEFAULT_USER,))
+        conn.execute('DROP TABLE history_rollups_v5')
+
+        # The single settings row becomes DEFAULT_USER's; any others were never read
+        _add_column(conn, 'user_settings', 'user_id', 'TEXT')
+        conn.execute('UPDATE user_settings SET user_id = ? WHERE id = (SELECT MIN(id) FROM user_settings)',
+                     (DEFAULT_USER,))
+        conn.execute('DELETE FROM user_settings WHERE user_id IS NULL')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_user_settings_user ON user_settings(user_id)')
+
+        # Versions move to one row per user; history_meta keeps the epoch
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS history_versions (
+                user_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT
+            )
+        ''')
+        conn.execute('''
+            INSERT OR IGNORE INTO history_versions (user_id, version, updated_at)
+            SELECT ?, version, updated_at FROM history_meta WHERE id = 1 AND version > 0
+        ''', (DEFAULT_USER,))
+
+    if version < SCHEMA_VERSION:
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+def get_user_settings(user_id=DEFAULT_USER):
+    """Settings for user_id; a user who never saved any gets the defaults, as "User"."""
+    row = get_connection().execute(SELECT_SETTINGS, (user_id,)).fetchone()
+    if row is None:
+        return {"user_id": user_id, "name": "User", "api_key": None, "sugar_limit": 25.0,
+                "weekly_alert_enabled": 0, "monthly_alert_enabled": 0}
+    return dict(row)
+
+def update_user_settings(name, sugar_limit, weekly, monthly, api_key=None, user_id=DEFAULT_USER):
+    conn = get_connection()
+    with conn:
+        conn.execute('''
+            INSERT INTO user_settings (user_id, name, sugar_limit, weekly_alert_enabled, monthly_alert_enabled, api_key)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                name = excluded.name,
+                sugar_limit = excluded.sugar_limit,
+                weekly_alert_enabled = excluded.weekly_alert_enabled,
+                monthly_alert_enabled = excluded.monthly_alert_enabled,
+                api_key = COALESCE(excluded.api_key, api_key)
+        ''', (user_id, name, sugar_limit, int(weekly), int(monthly), api_key))
+
+def _entry_params(user_id, date_str, meals, totals, risk_level, risk_reason):
+    return (user_id, date_str, json.dumps(meals), json.dumps(totals), risk_level, risk_reason,
+            *[totals.get(c) for c in TOTAL_COLUMNS])
+
+def log_daily_entry(date_str, meals, totals, risk_level, risk_reason, user_id=DEFAULT_USER):
+    conn = get_connection()
+    # Single atomic statement instead of SELECT followed by UPDATE or INSERT
+    with conn:
+        conn.execute(UPSERT_DAILY_ENTRY, _entry_params(user_id, date_str, meals, totals, risk_level, risk_reason))
+        _refresh_rollups(conn, user_id, [date_str])
+        conn.execute(BUMP_HISTORY_VERSION, (user_id,))
+    _local.history_versions = None
+
+def log_daily_entries(entries, user_id=DEFAULT_USER):
+    """
+    Bulk form of log_daily_entry for backfills: entries is an iterable of
+    (date_str, meals, totals, risk_level, risk_reason) for one user. All rows
+    and the rollup buckets they touch are written in one transaction. Later
+    entries for the same date win. Returns the number of rows written.
+    """
+    params = [_entry_params(user_id, *entry) for entry in entries]
+    if not params:
+        return 0
+    conn = get_connection()
+    with conn:
+        conn.executemany(UPSERT_DAILY_ENTRY, params)
+        _refresh_rollups(conn, user_id, {p[1] for p in params})
+        conn.execute(BUMP_HISTORY_VERSION, (user_id,))
+    _local.history_versions = None
+    return len(params)
+
+def save_suggestions(date_str, totals, suggestions, user_id=DEFAULT_USER):
+    """
+    Attach suggestions to the entry for date_str. Returns False (and writes
+    nothing) if the entry has since been re-analyzed with different totals.
+    Doesn't bump the history version: no history view shows suggestions.
+    """
+    conn = get_connection()
+    with conn:
+        cursor = conn.execute(UPDATE_SUGGESTIONS, (json.dumps(suggestions), user_id, date_str, json.dumps(totals)))
+    return cursor.rowcount > 0
+
+def get_suggestions(date_str, user_id=DEFAULT_USER):
+    """(entry_exists, suggestions) for date_str; suggestions is None until they are stored."""
+    row = get_connection().execute(SELECT_SUGGESTIONS, (user_id, date_str)).fetchone()
+    if row is None:
+        return False, None
+    return True, json.loads(row[0]) if row[0] else None
+
+def rollup_bucket(period, date_str):
+    """Bucket key of `period` that contains the YYYY-MM-DD date."""
+    if period == "day":
+        return date_str
+    if period == "month":
+        return date_str[:7]
+    day = datetime.strptime(date_str, "%Y-%m-%d")
+    return (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d")
+
+def _bucket_range(period, bucket):
+    """First and last YYYY-MM-DD date covered by a bucket (string-comparable)."""
+    if period == "day":
+        return bucket, bucket
+    if period == "month":
+        return f"{bucket}-01", f"{bucket}-31"
+    monday = datetime.strptime(bucket, "%Y-%m-%d")
+    return bucket, (monday + timedelta(days=6)).strftime("%Y-%m-%d")
+
+def _refresh_rollups(conn, user_id, dates):
+    """
+    Recompute user_id's day, week and month buckets containing `dates` from
+    the indexed rows (at most 31 per bucket). Exact, unlike adding deltas,
+    and runs in the caller's transaction. Each bucket is refreshed once.
+    """
+    for period in ROLLUP_PERIODS:
+        for bucket in sorted({rollup_bucket(period, d) for d in dates}):
+            start, end = _bucket_range(period, bucket)
+            aggregates = conn.execute(SELECT_BUCKET_AGGREGATES, (user_id, start, end)).fetchone()
+            if aggregates[0]:
+                conn.execute(UPSERT_ROLLUP, (user_id, period, bucket, *aggregates))
+            else:
+                conn.execute(DELETE_ROLLUP, (user_id, period, bucket))
+
+def get_rollups(period, start_date=None, end_date=None, limit=-1, user_id=DEFAULT_USER):
+    """
+    Rollup buckets for `period`, newest first. Buckets are whole: a week or month
+    that overlaps [start_date, end_date] is returned in full.
+    """
+    start = rollup_bucket(period, start_date) if start_date else ""
+    end = rollup_bucket(period, end_date) if end_date else "9999"
+    rows = get_connection().execute(SELECT_ROLLUPS, (user_id, period, start, end, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def get_history(limit=30, before=None, user_id=DEFAULT_USER):
+    """
+    user_id's entries newest first. `before` (YYYY-MM-DD) is a keyset
+    cursor: pass the last date of one page to get the next.
+    """
+    if before:
+        rows = get_connection().execute(SELECT_HISTORY_BEFORE, (user_id, before, limit)).fetchall()
     else:
-        cursor.execute('''
-            INSERT INTO user_history (date, meals_json, total_nutrition_json, risk_level, risk_reason)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (date_str, json.dumps(meals), json.dumps(totals), risk_level, risk_reason))
-
-    conn.commit()
-    conn.close()
-
-def get_history(limit=30):
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM user_history ORDER BY date DESC LIMIT ?', (limit,))
-    rows = cursor.fetchall()
-    conn.close()
+        rows = get_connection().execute(SELECT_HISTORY, (user_id, limit)).fetchall()
+    return [dict(row) for row in rows]
+
+def iter_history(start_date=None, end_date=None, risk_levels=None, chunk_size=1000, user_id=None):
+    """
+    Stream entries by user, oldest first, as lists of at most chunk_size
+    tuples in EXPORT_COLUMNS order. Optionally limited to one user, to
+    [start_date, end_date] and to some risk levels. Rows are fetched from one server-side cursor as
+    they are consumed, so memory doesn't grow with the history.
+
+    Uses its own connection: the SELECT reads one consistent snapshot for
+    as long as the consumer takes, without holding this thread's connection.
+    """
+    clauses, params = [], []
+    if user_id is not None:
+        clauses.append('user_id = ?')
+        params.append(user_id)
+    if start_date:
+        clauses.append('date >= ?')
+        params.append(start_date)
+    if end_date:
+        clauses.append('date <= ?')
+        params.append(end_date)
+    if risk_levels:
+        clauses.append(f'risk_level IN ({", ".join("?" for _ in risk_levels)})')
+        params.extend(risk_levels)
+    where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+    # A streamed response may be closed from another thread than the one that started it
+    conn = sqlite3.connect(get_db_path(), timeout=30, check_same_thread=False)
+    try:
+        cursor = conn.execute(f'SELECT {", ".join(EXPORT_COLUMNS)} FROM user_history{where} ORDER BY user_id, date', params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+def history_version(user_id=DEFAULT_USER):
+    """
+    (tag, last_modified) for user_id's history. The tag changes with every
+    write to it, from any process; last_modified is a UTC datetime, or None
+    if the user has no history.
+
+    Versions are only re-read when PRAGMA data_version says another
+    connection has committed since this thread last looked (or this thread
+    wrote), so an unchanged history costs no table reads.
+    """
+    conn = get_connection()
+    data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+    seen = _local.history_versions
+    if seen is None or seen[0] != data_version or len(seen[1]) > 4096:
+        seen = _local.history_versions = (data_version, {})
+    found = seen[1].get(user_id)
+    if found is None:
+        epoch, version, updated_at = conn.execute(SELECT_HISTORY_VERSION, (user_id,)).fetchone()
+        try:
+            modified = datetime.strptime(updated_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+        except (TypeError, ValueError):
+            modified = None
+        found = seen[1][user_id] = (f"{epoch}.{user_id}.{version or 0}", modified)
+    return found
+
+def get_recent_totals(limit=7, user_id=DEFAULT_USER):
+    """Numeric totals for user_id's most recent entries, newest first. No JSON decoding."""
+    rows = get_connection().execute(SELECT_RECENT_TOTALS, (user_id, limit)).fetchall()
     return [dict(row) for row in rows]
+
+def get_window_summary(limit=7, user_id=DEFAULT_USER):
+    """SUM/AVG/COUNT aggregates over user_id's most recent `limit` entries, computed by SQLite."""
+    row = get_connection().execute(SELECT_WINDOW_SUMMARY, (user_id, limit)).fetchone()
+    return {k: (row[k] or 0) for k in row.keys()}
@@ -0,0 +1,88 @@
+"""
+Days/sec for importing a food diary: one /analyze-style pass per day
+(parse, analyze_meals, log_daily_entry) vs app.batch.import_records (one
+batched parse, analyze_days and a single transaction per chunk).
+Suggestions are left out of both.
+
+    python -m benchmarks.bench_batch --days 2000 --rows 20000 [--nlp simple]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from benchmarks.common import SimpleMealParser, synthetic_days, synthetic_food_rows
+
+MEALS = ("breakfast", "lunch", "snacks", "dinner")
+
+
+def per_day(records, nlp, nutrition, storage):
+    for date_str, meals in records:
+        per_meal = nlp.parse_meals_batch([meals[m] for m in MEALS])
+        totals, _ = nutrition.analyze_meals([item for items in per_meal for item in items])
+        risk_level, risk_reason = nutrition.calculate_risk(totals)
+        storage.log_daily_entry(date_str, meals, totals, risk_level, risk_reason)
+
+
+def run(label, fn, db_path, storage):
+    os.environ["GLUCOVISION_DB"] = db_path
+    storage.close_connection()
+    storage.init_db()
+    start = time.perf_counter()
+    fn()
+    return label, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=20000, help="Synthetic food table size")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--nlp", choices=["spacy", "simple"], default="spacy",
+                        help="simple swaps spaCy for a regex parser (no model needed)")
+    args = parser.parse_args()
+
+    for var in ("EDAMAM_APP_ID", "EDAMAM_APP_KEY"):
+        os.environ.pop(var, None)
+    os.environ.setdefault("EDAMAM_CACHE_PATH", "")
+
+    from app import storage
+    from app.batch import import_records
+    from app.nutrition import NutritionEngine
+
+    if args.nlp == "spacy":
+        from app.nlp import NLPEngine
+        nlp = NLPEngine()
+    else:
+        nlp = SimpleMealParser()
+
+    first = date(2000, 1, 1)
+    records = [((first + timedelta(days=i)).isoformat(), meals) for i, meals in enumerate(synthetic_days(args.days))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "nutrition_master.csv")
+        pd.DataFrame(synthetic_food_rows(args.rows)).to_csv(csv_path, index=False)
+        os.environ["NUTRITION_SNAPSHOT"] = "0"
+        nutrition = NutritionEngine(csv_path)
+
+        results = [
+            run("per_day", lambda: per_day(records, nlp, nutrition, storage), os.path.join(tmp, "a.db"), storage),
+            run("batch", lambda: import_records(records, chunk_size=args.chunk_size,
+                                                nlp_engine=nlp, nutrition_engine=nutrition),
+                os.path.join(tmp, "b.db"), storage),
+        ]
+        storage.close_connection()
+
+    out = {"days": args.days, "rows": args.rows, "nlp": args.nlp}
+    for label, seconds in results:
+        out[label] = {"seconds": round(seconds, 3), "days_per_s": round(args.days / seconds, 1)}
+    out["speedup"] = round(results[0][1] / results[1][1], 2)
+    print(json.dumps(out, indent=2))
+
+
+if __name__ == "__main__":
+    main()
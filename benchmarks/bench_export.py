@@ -0,0 +1,117 @@
+"""
+Streaming history export on large histories: rows/s and output MB/s per
+format, with and without gzip and filters, plus the peak Python memory of an
+export, which should stay flat as the history grows.
+
+    python -m benchmarks.bench_export --rows 100000 1000000 3000000
+
+Rows are seeded straight into user_history (no rollups), up to 3.6M
+distinct dates.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+MEALS = [
+    {"breakfast": "2 idli and sambar", "lunch": "rice and dal", "snacks": "tea", "dinner": "2 roti and paneer"},
+    {"breakfast": "oats with milk", "lunch": "chicken biryani", "snacks": "1 banana", "dinner": "dal and rice"},
+    {"breakfast": "bread and egg", "lunch": "curd rice", "snacks": "", "dinner": "3 chapati, mixed veg"},
+]
+RISKS = ["Safe", "Moderate", "High"]
+
+CASES = [
+    ("ndjson", {}),
+    ("csv", {}),
+    ("ndjson", {"gzip": True}),
+    ("csv", {"gzip": True}),
+    ("ndjson", {"risk_levels": ["High"]}),
+]
+
+
+def seed(storage, rows, seed=0):
+    rng = random.Random(seed)
+    first = date(1000, 1, 1)
+
+    def entries():
+        for i in range(rows):
+            totals = {c: round(rng.uniform(0, 300), 2) for c in storage.TOTAL_COLUMNS}
+            risk = rng.choice(RISKS)
+            # Same parameters as log_daily_entry, so the seed follows schema changes
+            yield storage._entry_params(storage.DEFAULT_USER, (first + timedelta(days=i)).isoformat(),
+                                        rng.choice(MEALS), totals, risk, f"{risk} glycemic load")
+
+    conn = storage.get_connection()
+    with conn:
+        conn.executemany(storage.UPSERT_DAILY_ENTRY, entries())
+    return first, first + timedelta(days=rows - 1)
+
+
+def run(export_history, fmt, options):
+    rows = [0]
+    written = 0
+    start = time.perf_counter()
+    for part in export_history(fmt, progress=lambda n: rows.__setitem__(0, rows[0] + n), **options):
+        written += len(part)
+    seconds = time.perf_counter() - start
+    return rows[0], written, seconds
+
+
+def peak_mb(export_history, fmt, options):
+    tracemalloc.start()
+    try:
+        for _ in export_history(fmt, **options):
+            pass
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slower) traced memory runs")
+    args = parser.parse_args()
+
+    from app import storage
+    from app.export import export_history
+
+    results = []
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["GLUCOVISION_DB"] = os.path.join(tmp, "export.db")
+            storage.init_db()
+            start = time.perf_counter()
+            first, last = seed(storage, rows)
+            seed_s = time.perf_counter() - start
+            middle = {"start_date": (first + timedelta(days=rows // 4)).isoformat(),
+                      "end_date": (last - timedelta(days=rows // 4)).isoformat()}
+            first_result = len(results)
+            for fmt, options in CASES + [("ndjson", middle)]:
+                options = {**options, "chunk_size": args.chunk_size}
+                exported, written, seconds = run(export_history, fmt, options)
+                result = {
+                    "rows": rows,
+                    "format": fmt,
+                    "options": {k: v for k, v in options.items() if k != "chunk_size"},
+                    "exported": exported,
+                    "seconds": round(seconds, 3),
+                    "rows_per_s": round(exported / seconds),
+                    "mb_per_s": round(written / 1e6 / seconds, 1),
+                    "output_mb": round(written / 1e6, 1),
+                }
+                if not args.no_memory and not options.get("risk_levels") and "start_date" not in options:
+                    result["peak_mb"] = round(peak_mb(export_history, fmt, options), 2)
+                results.append(result)
+            results[first_result]["seed_s"] = round(seed_s, 1)
+            storage.close_connection()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
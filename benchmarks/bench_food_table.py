@@ -0,0 +1,84 @@
+"""
+Build time, memory footprint and read latency of the old dict of pandas
+Series (one per food) vs FoodTable's name index + float64 matrix.
+
+    python -m benchmarks.bench_food_table --rows 100000 250000
+"""
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.food_table import FoodTable, NUTRIENT_COLUMNS
+from benchmarks.common import synthetic_food_rows
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    seconds = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, seconds, current
+
+
+def read_series(lookup, names):
+    total = 0.0
+    for name in names:
+        row = lookup[name]
+        for col in NUTRIENT_COLUMNS:
+            total += float(row.get(col, 0) or 0)
+    return total
+
+
+def read_table(table, names):
+    total = 0.0
+    for name in names:
+        for value in table.matrix[table.index[name]].tolist():
+            total += value
+    return total
+
+
+def run(rows, reads):
+    df = pd.DataFrame(synthetic_food_rows(rows))
+    names = random.Random(0).choices(df["food_name"].tolist(), k=reads)
+
+    series_lookup, series_s, series_mem = measure(
+        lambda: {row["food_name"]: row for _, row in df.iterrows()}
+    )
+    table, table_s, table_mem = measure(lambda: FoodTable.from_dataframe(df))
+
+    start = time.perf_counter()
+    read_series(series_lookup, names)
+    series_read = (time.perf_counter() - start) / reads * 1e6
+    start = time.perf_counter()
+    read_table(table, names)
+    table_read = (time.perf_counter() - start) / reads * 1e6
+
+    return {
+        "rows": rows,
+        "dict_of_series": {"build_s": round(series_s, 3), "memory_mb": round(series_mem / 2**20, 2),
+                           "read_us_per_item": round(series_read, 3)},
+        "food_table": {"build_s": round(table_s, 3), "memory_mb": round(table_mem / 2**20, 2),
+                       "matrix_mb": round(table.nbytes() / 2**20, 2),
+                       "read_us_per_item": round(table_read, 3)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--reads", type=int, default=100_000)
+    args = parser.parse_args()
+    for rows in args.rows:
+        print(json.dumps(run(rows, args.reads)))
+
+
+if __name__ == "__main__":
+    main()
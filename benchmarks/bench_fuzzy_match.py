@@ -0,0 +1,74 @@
+"""
+Per-lookup latency of FoodMatchIndex vs the old linear extractOne scan.
+
+    python -m benchmarks.bench_fuzzy_match --sizes 10000 100000 1000000
+
+The linear baseline is sampled with fewer queries at large sizes since each
+call scans every row. Agreement (same name and score as the linear scan) is
+measured on the same sampled queries; anything below 1.0 exits non-zero.
+"""
+import argparse
+import json
+import sys
+import time
+
+from rapidfuzz import fuzz, process
+
+from app.matching import FoodMatchIndex
+from benchmarks.common import synthetic_food_names, synthetic_queries, time_calls, summarize
+
+
+def linear_match(names, query, min_score=80):
+    match = process.extractOne(query, names, scorer=fuzz.WRatio)
+    if not match:
+        return None, 0.0
+    if match[1] < min_score:
+        return None, float(match[1])
+    return match[0], float(match[1])
+
+
+def run(size, n_queries, n_baseline):
+    names = synthetic_food_names(size)
+    queries = synthetic_queries(names, n_queries)
+
+    start = time.perf_counter()
+    index = FoodMatchIndex(names)
+    build_s = time.perf_counter() - start
+
+    indexed = time_calls(lambda q: index.lookup(q), queries)
+
+    sample = queries[:n_baseline]
+    linear = time_calls(lambda q: linear_match(names, q), sample)
+    agree = sum(1 for q in sample if index.lookup(q) == linear_match(names, q))
+
+    return {
+        "rows": size,
+        "build_s": round(build_s, 3),
+        "indexed": summarize(indexed),
+        "linear": summarize(linear),
+        "agreement": round(agree / len(sample), 4) if sample else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--baseline-queries", type=int, default=None,
+                        help="Queries timed against the linear scan (default scales down with size)")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        n_baseline = args.baseline_queries or max(20, min(args.queries, 2_000_000 // size))
+        results.append(run(size, args.queries, n_baseline))
+        print(json.dumps(results[-1]))
+
+    if any(r["agreement"] is not None and r["agreement"] < 1.0 for r in results):
+        print("FoodMatchIndex disagreed with the linear scan", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
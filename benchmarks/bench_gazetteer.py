@@ -0,0 +1,92 @@
+"""
+Gazetteer fast path vs the full spaCy parse on a synthetic meal corpus:
+fast-path hit rate, per-text latency, and agreement with spaCy on the texts
+the fast path answered. Texts it declines go to spaCy anyway, so they
+always agree.
+
+    python -m benchmarks.bench_gazetteer --texts 5000 --off-table 0.1 --modifier-rate 0.1 [--csv nutrition_master.csv]
+
+Agreement needs the en_core_web_sm model; without it only the hit rate and
+fast-path latency are reported.
+"""
+import argparse
+import json
+import os
+import random
+from collections import Counter
+
+import spacy.util
+
+from app.gazetteer import Gazetteer
+from benchmarks.common import BASE_FOODS, summarize, synthetic_food_rows, synthetic_meal_text, time_calls
+from benchmarks.suite import OFF_TABLE_FOODS
+
+
+def item_f1(a, b):
+    """F1 over (name, qty) items, treating each list as a multiset; names compared case-insensitively."""
+    ca = Counter((n.lower(), q) for n, q in a)
+    cb = Counter((n.lower(), q) for n, q in b)
+    common = sum((ca & cb).values())
+    if not ca and not cb:
+        return 1.0
+    if not common:
+        return 0.0
+    precision, recall = common / sum(ca.values()), common / sum(cb.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--max-items", type=int, default=4)
+    parser.add_argument("--modifier-rate", type=float, default=0.1,
+                        help="Share of items given a random extra adjective (usually not in the table)")
+    parser.add_argument("--off-table", type=float, default=0.1, help="Share of picks not in the food table")
+    parser.add_argument("--csv", help="Food table to take the vocabulary from (default: 20k synthetic rows)")
+    args = parser.parse_args()
+    os.environ.setdefault("EDAMAM_CACHE_PATH", "")
+
+    from app.dataset import load_frame
+    if args.csv:
+        names = load_frame(args.csv)["food_name"].tolist()
+    else:
+        names = [row["food_name"] for row in synthetic_food_rows(20_000)] + BASE_FOODS
+    gazetteer = Gazetteer(names)
+
+    rng = random.Random(0)
+    on_table = [n for n in names if len(n.split()) <= 3][:2000] or names
+    n_off = max(1, round(len(on_table) * args.off_table / (1 - args.off_table))) if args.off_table else 0
+    vocabulary = on_table + [OFF_TABLE_FOODS[i % len(OFF_TABLE_FOODS)] for i in range(n_off)]
+    texts = [synthetic_meal_text(rng, args.max_items, vocabulary, args.modifier_rate) for _ in range(args.texts)]
+
+    fast = [gazetteer.extract(t) for t in texts]
+    answered = [i for i, items in enumerate(fast) if items is not None]
+    result = {
+        "texts": len(texts),
+        "vocabulary": len(gazetteer),
+        "hit_rate": round(len(answered) / len(texts), 4),
+        "fast_path": summarize(time_calls(gazetteer.extract, texts)),
+    }
+
+    if spacy.util.is_package("en_core_web_sm"):
+        from app.nlp import NLPEngine
+        engine = NLPEngine()
+        docs = list(engine.nlp.pipe(texts))
+        reference = [engine._extract_items(doc) for doc in docs]
+        result["spacy"] = summarize(time_calls(lambda t: engine._extract_items(engine.nlp(t)), texts[:1000]))
+        exact = sum(1 for i in answered if fast[i] == reference[i])
+        result["agreement"] = {
+            "exact": round(exact / len(answered), 4) if answered else None,
+            "item_f1": round(sum(item_f1(fast[i], reference[i]) for i in answered) / len(answered), 4)
+            if answered else None,
+            "examples": [{"text": texts[i], "fast": fast[i], "spacy": reference[i]}
+                         for i in answered if fast[i] != reference[i]][:10],
+        }
+    else:
+        result["agreement"] = None
+        result["note"] = "en_core_web_sm not installed; agreement not measured"
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
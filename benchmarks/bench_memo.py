@@ -0,0 +1,74 @@
+"""
+Per-day /analyze latency for users who log the same meals again and again:
+memo caches disabled vs enabled (NLPEngine.parse_cache for meal text ->
+items, NutritionEngine.match_cache for phrase -> match).
+
+    python -m benchmarks.bench_memo --days 2000 --distinct 50 --rows 100000 [--nlp simple]
+
+With --nlp simple the regex parser stands in for spaCy, so only the match
+layer is measured.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+import pandas as pd
+
+from app.cache import MemoCache
+from benchmarks.common import SimpleMealParser, summarize, synthetic_days, synthetic_food_rows, time_calls
+
+MEALS = ("breakfast", "lunch", "snacks", "dinner")
+
+
+def analyze_day(nlp, nutrition, meals):
+    per_meal = nlp.parse_meals_batch([meals[m] for m in MEALS])
+    return nutrition.analyze_meals([item for items in per_meal for item in items])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=50, help="Distinct days the workload repeats")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--nlp", choices=["spacy", "simple"], default="spacy")
+    args = parser.parse_args()
+    os.environ.setdefault("EDAMAM_CACHE_PATH", "")
+    os.environ["NUTRITION_SNAPSHOT"] = "0"
+    for var in ("EDAMAM_APP_ID", "EDAMAM_APP_KEY"):
+        os.environ.pop(var, None)
+
+    from app.nutrition import NutritionEngine
+    if args.nlp == "spacy":
+        from app.nlp import NLPEngine
+        nlp = NLPEngine()
+    else:
+        nlp = SimpleMealParser()
+
+    rng = random.Random(0)
+    pool = synthetic_days(args.distinct)
+    workload = [rng.choice(pool) for _ in range(args.days)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "nutrition_master.csv")
+        pd.DataFrame(synthetic_food_rows(args.rows)).to_csv(csv_path, index=False)
+        nutrition = NutritionEngine(csv_path)
+
+    results = {"days": args.days, "distinct": args.distinct, "rows": args.rows, "nlp": args.nlp}
+    for label, maxsize in (("memo_off", 0), ("memo_on", 16384)):
+        nutrition.match_cache = MemoCache(maxsize=maxsize, version=nutrition.dataset_version)
+        if hasattr(nlp, "parse_cache"):
+            nlp.parse_cache = MemoCache(maxsize=maxsize)
+        latencies = time_calls(lambda meals: analyze_day(nlp, nutrition, meals), workload)
+        results[label] = {
+            **summarize(latencies),
+            "days_per_s": round(len(latencies) / (sum(latencies) / 1000.0), 1),
+            "match_cache": nutrition.match_cache.stats(),
+            "parse_cache": nlp.parse_cache.stats() if hasattr(nlp, "parse_cache") else None,
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
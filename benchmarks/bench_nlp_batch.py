@@ -0,0 +1,73 @@
+"""
+Docs/sec for meal parsing: the old path (full en_core_web_sm pipeline, one
+joined string per day) vs parse_meals_batch (trimmed pipeline, four meal
+docs per day through nlp.pipe).
+
+    python -m benchmarks.bench_nlp_batch --days 500 --batch-size 64
+"""
+import argparse
+import json
+import time
+
+import spacy
+
+from app.nlp import NLPEngine
+from benchmarks.common import synthetic_days
+
+
+def run_joined(engine, days):
+    for meals in days:
+        engine.parse_meals(" ".join(meals.values()))
+
+
+def run_batched(engine, days, batch_size, n_process):
+    texts = [text for meals in days for text in meals.values()]
+    engine.parse_meals_batch(texts, batch_size=batch_size, n_process=n_process)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    days = synthetic_days(args.days)
+
+    trimmed = NLPEngine()
+    full = NLPEngine()
+    full.nlp = spacy.load("en_core_web_sm")
+
+    # Warm both pipelines before timing
+    run_joined(full, days[:5])
+    run_batched(trimmed, days[:5], args.batch_size, 1)
+
+    joined_s = timed(lambda: run_joined(full, days))
+    batched_s = timed(lambda: run_batched(trimmed, days, args.batch_size, args.n_process))
+
+    print(json.dumps({
+        "days": args.days,
+        "joined_full_pipeline": {
+            "seconds": round(joined_s, 3),
+            "docs_per_s": round(args.days / joined_s, 1),
+            "days_per_s": round(args.days / joined_s, 1),
+        },
+        "batched_trimmed_pipeline": {
+            "pipes": trimmed.nlp.pipe_names,
+            "batch_size": args.batch_size,
+            "n_process": args.n_process,
+            "seconds": round(batched_s, 3),
+            "docs_per_s": round(4 * args.days / batched_s, 1),
+            "days_per_s": round(args.days / batched_s, 1),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
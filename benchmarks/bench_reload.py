@@ -0,0 +1,146 @@
+"""
+Hot reload of the nutrition dataset under load: reload time, memory while
+two datasets are alive, analyze latency before/during/after the swap, and
+a consistency check.
+
+    python -m benchmarks.bench_reload --rows 100000 --threads 4 [--snapshot]
+
+Every row has sugar 1.0 in the first dataset and 2.0 in the second, so a
+day's total sugar is exactly 1x or 2x its quantity sum. Any other value
+would mean one analysis mixed rows from both versions.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from benchmarks.common import summarize, synthetic_food_rows
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024.0
+    return 0.0
+
+
+def write_csv(path, rows, sugar):
+    df = pd.DataFrame(rows)
+    df["sugar"] = sugar
+    df.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=4, help="Threads calling analyze_meals during the reload")
+    parser.add_argument("--settle", type=float, default=1.0, help="Seconds of load before and after the reload")
+    parser.add_argument("--snapshot", action="store_true", help="Reload from a rebuilt snapshot instead of the CSV")
+    args = parser.parse_args()
+    os.environ.setdefault("EDAMAM_CACHE_PATH", "")
+    os.environ["NUTRITION_SNAPSHOT"] = "1" if args.snapshot else "0"
+    for var in ("EDAMAM_APP_ID", "EDAMAM_APP_KEY"):
+        os.environ.pop(var, None)
+
+    from app.dataset import PATCH_DATA
+    from app.nutrition import NutritionEngine
+    from app.snapshot import build_snapshot
+
+    rows = synthetic_food_rows(args.rows)
+    # PATCH_DATA rows keep their own sugar values, so they can't take part in the check
+    names = [r["food_name"] for r in rows if r["food_name"] not in PATCH_DATA]
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "nutrition_master.csv")
+        write_csv(csv_path, rows, 1.0)
+        if args.snapshot:
+            build_snapshot(csv_path)
+        gc.collect()
+        before_load = rss_mb()
+        engine = NutritionEngine(csv_path)
+        dataset_mb = rss_mb() - before_load
+        first_version = engine.dataset_version
+
+        stop = threading.Event()
+        samples = []  # (finished_at, ms)
+        mixed = []
+        versions_seen = set()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                items = [(rng.choice(names), float(rng.randint(1, 3))) for _ in range(8)]
+                qty = sum(q for _, q in items)
+                start = time.perf_counter()
+                totals, _ = engine.analyze_meals(items)
+                end = time.perf_counter()
+                samples.append((end, (end - start) * 1000.0))
+                ratio = round(totals["total_sugar"] / qty, 6)
+                versions_seen.add(ratio)
+                if ratio not in (1.0, 2.0):
+                    mixed.append(totals["total_sugar"])
+
+        peak = [0.0]
+
+        def sampler():
+            while not stop.is_set():
+                peak[0] = max(peak[0], rss_mb())
+                time.sleep(0.005)
+
+        threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.threads)]
+        threads.append(threading.Thread(target=sampler, daemon=True))
+        for t in threads:
+            t.start()
+        time.sleep(args.settle)
+
+        write_csv(csv_path, rows, 2.0)
+        snapshot_build_s = None
+        if args.snapshot:
+            start = time.perf_counter()
+            build_snapshot(csv_path)
+            snapshot_build_s = round(time.perf_counter() - start, 3)
+        baseline = rss_mb()
+        peak[0] = baseline
+        reload_start = time.perf_counter()
+        engine.reload(background=False)
+        reload_end = time.perf_counter()
+
+        time.sleep(args.settle)
+        stop.set()
+        for t in threads:
+            t.join()
+        gc.collect()
+
+        def window(lo, hi):
+            return [ms for at, ms in samples if lo <= at < hi]
+
+        result = {
+            "rows": args.rows,
+            "source": engine.dataset_source,
+            "dataset_mb": round(dataset_mb, 1),
+            "reload_s": round(reload_end - reload_start, 3),
+            "snapshot_build_s": snapshot_build_s,
+            "last_reload": engine.last_reload,
+            "swapped": engine.dataset_version != first_version,
+            "rss_mb": {"before": round(baseline, 1), "peak_during": round(peak[0], 1),
+                       "after": round(rss_mb(), 1), "overhead": round(peak[0] - baseline, 1)},
+            "latency": {
+                "before": summarize(window(0, reload_start)),
+                "during": summarize(window(reload_start, reload_end)),
+                "after": summarize(window(reload_end, float("inf"))),
+            },
+            "analyses": len(samples),
+            "mixed_results": len(mixed),
+            "sugar_ratios_seen": sorted(versions_seen),
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Edamam lookups against the local stub server while it is healthy, slow,
+failing and then recovered, showing per-call latency and breaker state.
+
+    python -m benchmarks.bench_resilience --calls 200 --slow 3.0
+
+With the breaker, calls during an outage return in microseconds once it has
+opened instead of each waiting out the timeout.
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.common import summarize
+from benchmarks.stub_server import start_stub_server, EDAMAM_PATH
+
+
+def run_phase(engine, calls, label):
+    timings = []
+    for i in range(calls):
+        start = time.perf_counter()
+        # Unique phrases so the API cache never answers
+        engine.fetch_from_api(f"{label} food {i} {time.perf_counter_ns()}")
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return {"phase": label, **summarize(timings), "guard": engine.api_guard.stats()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--slow", type=float, default=2.0, help="Stub latency in the slow phase (seconds)")
+    parser.add_argument("--reset", type=float, default=1.0, help="Breaker reset timeout (seconds)")
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    os.environ.update({
+        "EDAMAM_APP_ID": "bench", "EDAMAM_APP_KEY": "bench",
+        "EDAMAM_API_URL": server.base_url + EDAMAM_PATH,
+        "EDAMAM_CACHE_PATH": "", "EDAMAM_TIMEOUT": "1.0", "EDAMAM_BREAKER_RESET": str(args.reset),
+    })
+
+    from app.nutrition import NutritionEngine
+    engine = NutritionEngine(os.devnull)
+
+    results = [run_phase(engine, args.calls, "healthy")]
+
+    server.latency = args.slow
+    results.append(run_phase(engine, args.calls, "slow"))
+
+    server.latency, server.fail_rate = 0.0, 1.0
+    results.append(run_phase(engine, args.calls, "failing"))
+
+    server.fail_rate = 0.0
+    time.sleep(args.reset)
+    results.append(run_phase(engine, args.calls, "recovered"))
+
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+NutritionEngine start-up from the CSV vs from the memory-mapped snapshot.
+
+    python -m benchmarks.bench_snapshot --rows 100000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from app.nutrition import NutritionEngine
+from app.snapshot import build_snapshot
+from benchmarks.common import synthetic_food_rows
+
+
+def timed_engine(csv_path, use_snapshot):
+    os.environ["NUTRITION_SNAPSHOT"] = "1" if use_snapshot else "0"
+    start = time.perf_counter()
+    engine = NutritionEngine(csv_path)
+    return time.perf_counter() - start, engine.dataset_source
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    os.environ.setdefault("EDAMAM_CACHE_PATH", "")
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "nutrition_master.csv")
+            pd.DataFrame(synthetic_food_rows(rows)).to_csv(csv_path, index=False)
+
+            csv_s, _ = timed_engine(csv_path, use_snapshot=False)
+            meta = build_snapshot(csv_path)
+            snap_s, source = timed_engine(csv_path, use_snapshot=True)
+
+            print(json.dumps({
+                "rows": rows,
+                "csv_start_s": round(csv_s, 3),
+                "snapshot_build_s": meta["build_seconds"],
+                "snapshot_start_s": round(snap_s, 3),
+                "source": source,
+            }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cold start and time-to-ready for the Flask app.
+
+Each mode runs in a fresh interpreter so import costs are counted:
+- lazy:  create_app() with background warm-up; time to serve /about and
+         time until /readyz returns 200.
+- eager: create_app() then build every engine before serving, as the old
+         import-time construction did.
+
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {base!r})
+os.environ["ENGINE_WARMUP"] = "0" if {eager!r} else "1"
+from app import create_app
+app = create_app()
+if {eager!r}:
+    from app.engines import registry
+    registry.warm_up(background=False)
+t_created = time.perf_counter() - t0
+client = app.test_client()
+client.get("/about")
+t_first = time.perf_counter() - t0
+while True:
+    resp = client.get("/readyz")
+    if resp.status_code == 200:
+        break
+    errors = {{k: v["error"] for k, v in resp.get_json()["engines"].items() if v.get("error")}}
+    if errors and not resp.get_json()["warming_up"]:
+        sys.exit("Engine build failed: %s" % errors)
+    time.sleep(0.01)
+t_ready = time.perf_counter() - t0
+print(json.dumps({{"create_app_s": t_created, "first_response_s": t_first, "ready_s": t_ready}}))
+'''
+
+
+def probe(eager):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(base=BASE_DIR, eager=eager)],
+        capture_output=True, text=True, check=True, cwd=BASE_DIR,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    report = {}
+    for mode, eager in (("lazy", False), ("eager", True)):
+        runs = [probe(eager) for _ in range(args.runs)]
+        report[mode] = {
+            key: round(sorted(r[key] for r in runs)[len(runs) // 2], 3)
+            for key in runs[0]
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Stats over years of daily history: the old path (fetch rows, json.loads every
+total_nutrition_json, loop in Python) vs numeric columns + SQL aggregates,
+plus rollup queries and the write cost of keeping rollups current.
+
+    python -m benchmarks.bench_stats --years 1 5 20 --windows 7 30 365
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import summarize
+
+
+def seed_history(storage, years, seed=0):
+    rng = random.Random(seed)
+    start = date(2000, 1, 1)
+    for i in range(int(years * 365)):
+        totals = {
+            "total_calories": round(rng.uniform(1200, 3000), 2),
+            "total_carbs": round(rng.uniform(100, 300), 2),
+            "total_sugar": round(rng.uniform(10, 90), 2),
+            "total_protein": round(rng.uniform(30, 120), 2),
+            "total_fat": round(rng.uniform(30, 120), 2),
+            "total_fiber": round(rng.uniform(5, 40), 2),
+        }
+        risk = rng.choice(["Safe", "Moderate", "High"])
+        storage.log_daily_entry((start + timedelta(days=i)).isoformat(), {"lunch": "rice"}, totals, risk, "")
+
+
+def legacy_window(storage, limit):
+    history = storage.get_history(limit=limit)
+    sugar_high = fiber_low = 0
+    risk_counts = {"Safe": 0, "Moderate": 0, "High": 0}
+    sums = {"sugar": 0.0, "carbs": 0.0, "fiber": 0.0}
+    for entry in history:
+        totals = json.loads(entry['total_nutrition_json'])
+        sugar = totals.get('total_sugar', 0)
+        fiber = totals.get('total_fiber', 0)
+        sums["sugar"] += sugar
+        sums["carbs"] += totals.get('total_carbs', 0)
+        sums["fiber"] += fiber
+        sugar_high += sugar > 40
+        fiber_low += fiber < 25
+        if entry['risk_level'] in risk_counts:
+            risk_counts[entry['risk_level']] += 1
+    return sugar_high, fiber_low, risk_counts, sums
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--windows", type=int, nargs="+", default=[7, 30, 365])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for years in args.years:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["GLUCOVISION_DB"] = os.path.join(tmp, "bench.db")
+            from app import storage
+            storage.init_db()
+            seed_history(storage, years)
+
+            for window in args.windows + [10 ** 9]:
+                legacy = [0.0] * args.repeat
+                sql = [0.0] * args.repeat
+                for i in range(args.repeat):
+                    start = time.perf_counter()
+                    legacy_window(storage, window)
+                    legacy[i] = (time.perf_counter() - start) * 1000.0
+                    start = time.perf_counter()
+                    storage.get_window_summary(limit=window)
+                    sql[i] = (time.perf_counter() - start) * 1000.0
+                print(json.dumps({
+                    "years": years,
+                    "window_days": window if window < 10 ** 9 else "all",
+                    "json_loop": summarize(legacy),
+                    "sql_aggregate": summarize(sql),
+                }))
+
+            # Rollups: cost should track the number of buckets, not the history size
+            rollups = {
+                "monthly_12": lambda: storage.get_rollups("month", limit=12),
+                "weekly_1y": lambda: storage.get_rollups("week", "2000-01-01", "2000-12-31"),
+                "daily_90d": lambda: storage.get_rollups("day", "2000-01-01", "2000-03-31"),
+            }
+            for name, query in rollups.items():
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    query()
+                    latencies.append((time.perf_counter() - start) * 1000.0)
+                print(json.dumps({"years": years, "rollup": name, **summarize(latencies)}))
+
+            # Write cost including rollup maintenance
+            latencies = []
+            for i in range(args.repeat):
+                start = time.perf_counter()
+                storage.log_daily_entry(f"2000-01-{(i % 28) + 1:02d}", {}, {"total_sugar": 50.0}, "Moderate", "")
+                latencies.append((time.perf_counter() - start) * 1000.0)
+            print(json.dumps({"years": years, "log_daily_entry": summarize(latencies)}))
+            storage.close_connection()
+
+
+if __name__ == "__main__":
+    main()
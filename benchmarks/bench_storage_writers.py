@@ -0,0 +1,108 @@
+"""
+Concurrent log_daily_entry writers: the old connect-per-call, SELECT then
+UPDATE/INSERT path on a rollback journal vs the per-thread WAL connection
+with a single upsert.
+
+    python -m benchmarks.bench_storage_writers --workers 4 --writes 500
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import summarize
+
+TOTALS = {"total_calories": 1800.5, "total_carbs": 220.1, "total_sugar": 45.2,
+          "total_protein": 70.0, "total_fat": 60.3, "total_fiber": 22.0}
+MEALS = {"breakfast": "2 idli", "lunch": "rice and dal", "snacks": "tea", "dinner": "2 roti"}
+
+
+def legacy_log_daily_entry(db_path, date_str, meals, totals, risk_level, risk_reason):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM user_history WHERE date = ?', (date_str,))
+    if cursor.fetchone():
+        cursor.execute('''
+            UPDATE user_history
+            SET meals_json = ?, total_nutrition_json = ?, risk_level = ?, risk_reason = ?, timestamp = CURRENT_TIMESTAMP
+            WHERE date = ?
+        ''', (json.dumps(meals), json.dumps(totals), risk_level, risk_reason, date_str))
+    else:
+        cursor.execute('''
+            INSERT INTO user_history (date, meals_json, total_nutrition_json, risk_level, risk_reason)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (date_str, json.dumps(meals), json.dumps(totals), risk_level, risk_reason))
+    conn.commit()
+    conn.close()
+
+
+def _dates(worker, writes):
+    # Workers overlap on half their dates so both inserts and updates happen
+    start = date(2020, 1, 1) + timedelta(days=worker * writes // 2)
+    return [(start + timedelta(days=i % writes)).isoformat() for i in range(writes)]
+
+
+def worker(args):
+    mode, db_path, worker_id, writes = args
+    os.environ["GLUCOVISION_DB"] = db_path
+    from app import storage
+
+    latencies, errors = [], 0
+    for date_str in _dates(worker_id, writes):
+        start = time.perf_counter()
+        try:
+            if mode == "legacy":
+                legacy_log_daily_entry(db_path, date_str, MEALS, TOTALS, "Moderate", "bench")
+            else:
+                storage.log_daily_entry(date_str, MEALS, TOTALS, "Moderate", "bench")
+        except sqlite3.OperationalError:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies, errors
+
+
+def run(mode, workers, writes):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["GLUCOVISION_DB"] = db_path
+        from app import storage
+        storage.init_db()
+        storage.close_connection()
+        if mode == "legacy":
+            # The old schema had no unique index and used the default rollback journal
+            conn = sqlite3.connect(db_path)
+            conn.execute('PRAGMA journal_mode=DELETE')
+            conn.execute('DROP INDEX IF EXISTS idx_user_history_user_date')
+            conn.close()
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(worker, [(mode, db_path, w, writes) for w in range(workers)])
+        elapsed = time.perf_counter() - start
+
+    latencies = [lat for lats, _ in results for lat in lats]
+    return {
+        "mode": mode,
+        "workers": workers,
+        "writes": len(latencies),
+        "errors": sum(err for _, err in results),
+        "writes_per_s": round(len(latencies) / elapsed, 1),
+        **summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=500)
+    args = parser.parse_args()
+    for mode in ("legacy", "pooled"):
+        print(json.dumps(run(mode, args.workers, args.writes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Many users in one history database: per-user read and write latency as the
+population grows (it should stay flat, since every query is bounded by the
+(user_id, ...) indexes), then concurrent writer and reader processes.
+
+    python -m benchmarks.bench_users --users 10000 --days 30 --writers 4 --readers 2 --duration 10
+
+Writers log entries for random users; readers fetch the weekly summary,
+history page and monthly rollups of random users, as /api/stats/weekly,
+/history and /api/stats/monthly do. Each process has its own connection, as
+gunicorn workers would.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import summarize
+
+FIRST_DAY = date(2024, 1, 1)
+
+
+def user_id(i):
+    return f"patient-{i:06d}"
+
+
+def totals(rng):
+    return {
+        "total_calories": round(rng.uniform(1200, 3000), 2),
+        "total_carbs": round(rng.uniform(100, 300), 2),
+        "total_sugar": round(rng.uniform(10, 90), 2),
+        "total_protein": round(rng.uniform(30, 120), 2),
+        "total_fat": round(rng.uniform(30, 120), 2),
+        "total_fiber": round(rng.uniform(5, 40), 2),
+    }
+
+
+def seed_users(storage, first, last, days, rng):
+    for i in range(first, last):
+        entries = [((FIRST_DAY + timedelta(days=d)).isoformat(), {"lunch": "rice and dal"}, totals(rng),
+                    rng.choice(["Safe", "Moderate", "High"]), "") for d in range(days)]
+        storage.log_daily_entries(entries, user_id(i))
+
+
+def read_user(storage, uid):
+    storage.get_recent_totals(7, user_id=uid)
+    storage.get_window_summary(7, user_id=uid)
+    storage.get_history(31, user_id=uid)
+    storage.get_rollups("month", limit=12, user_id=uid)
+
+
+def write_user(storage, uid, rng, days):
+    day = (FIRST_DAY + timedelta(days=rng.randrange(days + 30))).isoformat()
+    storage.log_daily_entry(day, {"lunch": "2 roti"}, totals(rng), "Moderate", "", uid)
+
+
+def per_user_latency(storage, population, days, calls, rng):
+    picks = [user_id(rng.randrange(population)) for _ in range(calls)]
+    reads, writes = [], []
+    for uid in picks:
+        start = time.perf_counter()
+        read_user(storage, uid)
+        reads.append((time.perf_counter() - start) * 1000.0)
+    for uid in picks:
+        start = time.perf_counter()
+        write_user(storage, uid, rng, days)
+        writes.append((time.perf_counter() - start) * 1000.0)
+    return {"users": population, "rows": storage.get_connection().execute(
+        "SELECT COUNT(*) FROM user_history").fetchone()[0],
+        "read": summarize(reads), "write": summarize(writes)}
+
+
+def worker(role, seed, users, days, duration):
+    """Runs in a child process; returns (role, latencies_ms, busy_errors)."""
+    from app import storage
+    rng = random.Random(seed)
+    latencies, busy = [], 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        uid = user_id(rng.randrange(users))
+        start = time.perf_counter()
+        try:
+            if role == "writer":
+                write_user(storage, uid, rng, days)
+            else:
+                read_user(storage, uid)
+        except sqlite3.OperationalError:
+            busy += 1
+            continue
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return role, latencies, busy
+
+
+def concurrent(users, days, writers, readers, duration):
+    context = multiprocessing.get_context("fork")
+    jobs = [("writer", i, users, days, duration) for i in range(writers)]
+    jobs += [("reader", 1000 + i, users, days, duration) for i in range(readers)]
+    with context.Pool(len(jobs)) as pool:
+        outcomes = pool.starmap(worker, jobs)
+    out = {}
+    for role in ("writer", "reader"):
+        latencies = [x for r, lat, _ in outcomes if r == role for x in lat]
+        out[role + "s"] = {
+            "processes": sum(1 for r, _, _ in outcomes if r == role),
+            "ops_per_s": round(len(latencies) / duration, 1),
+            "busy_errors": sum(b for r, _, b in outcomes if r == role),
+            **summarize(latencies),
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30, help="History days seeded per user")
+    parser.add_argument("--checkpoints", type=int, nargs="*", default=[100, 1000],
+                        help="Populations measured on the way to --users")
+    parser.add_argument("--calls", type=int, default=300, help="Per-user reads and writes timed at each checkpoint")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent writer processes")
+    parser.add_argument("--readers", type=int, default=2, help="Concurrent reader processes")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    from app import storage
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["GLUCOVISION_DB"] = os.path.join(tmp, "users.db")
+        storage.init_db()
+        scaling, seeded, seed_s = [], 0, 0.0
+        for population in sorted({p for p in args.checkpoints if p < args.users} | {args.users}):
+            start = time.perf_counter()
+            seed_users(storage, seeded, population, args.days, rng)
+            seed_s += time.perf_counter() - start
+            seeded = population
+            scaling.append(per_user_latency(storage, population, args.days, args.calls, rng))
+        # Children open their own connections
+        storage.close_connection()
+        result = {
+            "users": args.users,
+            "days_per_user": args.days,
+            "seed_s": round(seed_s, 1),
+            "scaling": scaling,
+            "concurrent": concurrent(args.users, args.days, args.writers, args.readers, args.duration),
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Shared helpers for the benchmark scripts: synthetic data and latency stats."""
+import random
+import re
+import time
+
+BASE_FOODS = [
+    "rice", "dal", "roti", "chapati", "paneer", "chicken", "egg", "milk", "bread",
+    "apple", "banana", "orange", "grapes", "oatmeal", "yogurt", "curd", "idli", "dosa",
+    "sambar", "poha", "upma", "biryani", "khichdi", "lentil", "potato", "spinach",
+    "cheesecake", "cookie", "juice", "coffee", "tea", "samosa", "paratha", "noodles",
+    "pasta", "salad", "soup", "fish", "mutton", "tofu", "almond", "cashew", "mango",
+]
+MODIFIERS = [
+    "white", "brown", "fried", "boiled", "roasted", "steamed", "spicy", "sweet",
+    "masala", "butter", "ghee", "low fat", "whole wheat", "baked", "grilled", "raw",
+    "homemade", "instant", "tandoori", "plain", "stuffed", "creamy", "crispy",
+]
+SUFFIXES = ["", "", "", "curry", "soup", "salad", "sandwich", "roll", "bowl", "fry", "shake"]
+NUTRIENTS = ["calories", "carbs", "sugar", "protein", "fat", "fiber"]
+
+
+def synthetic_food_names(n, seed=0):
+    """Unique, realistic-looking food names. Adds a numeric variant tag past the combinatorial space."""
+    rng = random.Random(seed)
+    names = []
+    seen = set()
+    while len(names) < n:
+        parts = [rng.choice(MODIFIERS), rng.choice(BASE_FOODS), rng.choice(SUFFIXES)]
+        if rng.random() < 0.3:
+            parts.insert(0, rng.choice(MODIFIERS))
+        name = " ".join(p for p in parts if p)
+        if name in seen:
+            name = f"{name} {rng.choice(['style', 'type', 'variety', 'brand'])} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def synthetic_food_rows(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for name in synthetic_food_names(n, seed):
+        row = {"food_name": name}
+        for col in NUTRIENTS:
+            row[col] = round(rng.uniform(0, 300 if col == "calories" else 40), 2)
+        rows.append(row)
+    return rows
+
+
+def synthetic_queries(names, n, seed=1):
+    """Mix of exact names, miscased names, typos and names wrapped in a longer phrase."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        name = rng.choice(names)
+        kind = rng.random()
+        if kind < 0.25:
+            q = name
+        elif kind < 0.5:
+            q = name.title()
+        elif kind < 0.75 and len(name) > 4:
+            i = rng.randrange(1, len(name) - 1)
+            q = name[:i] + name[i + 1:]
+        else:
+            q = f"{rng.choice(['cup', 'bowl', 'plate', 'slice'])} of {name}"
+        queries.append(q)
+    return queries
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def time_calls(fn, args_list):
+    """Run fn(arg) for every arg; return per-call latencies in milliseconds."""
+    latencies = []
+    for arg in args_list:
+        start = time.perf_counter()
+        fn(arg)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def summarize(latencies):
+    return {
+        "n": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+        "mean_ms": round(sum(latencies) / len(latencies), 4) if latencies else 0.0,
+    }
+
+
+UNITS = ["cup", "cups", "slice", "slices", "bowl", "bowls", "glass", "plate", "piece", "pieces"]
+CONNECTORS = [" and ", ", ", " with ", " and some "]
+
+
+def synthetic_meal_text(rng, max_items=4, vocabulary=None, modifier_rate=0.3):
+    """One meal, e.g. '2 cups of milk and a slice of white bread, dal'."""
+    vocabulary = vocabulary or BASE_FOODS
+    parts = []
+    for _ in range(rng.randint(1, max_items)):
+        food = rng.choice(vocabulary)
+        if rng.random() < modifier_rate:
+            food = f"{rng.choice(MODIFIERS)} {food}"
+        kind = rng.random()
+        if kind < 0.4:
+            parts.append(f"{rng.randint(1, 3)} {rng.choice(UNITS)} of {food}")
+        elif kind < 0.7:
+            parts.append(f"{rng.randint(1, 4)} {food}")
+        else:
+            parts.append(food)
+    text = parts[0]
+    for part in parts[1:]:
+        text += rng.choice(CONNECTORS) + part
+    return text
+
+
+def synthetic_days(n, seed=0, max_items=4, vocabulary=None):
+    """n days of {'breakfast', 'lunch', 'snacks', 'dinner'} meal text."""
+    rng = random.Random(seed)
+    return [
+        {meal: synthetic_meal_text(rng, max_items, vocabulary) for meal in ("breakfast", "lunch", "snacks", "dinner")}
+        for _ in range(n)
+    ]
+
+
+class SimpleMealParser:
+    """
+    Regex stand-in for NLPEngine (same parse_meals/parse_meals_batch API) for
+    benchmarking the rest of the pipeline where the spaCy model is unavailable.
+    """
+
+    SPLIT = re.compile(r",|\band\b|\bwith\b")
+    QUANTITY = re.compile(r"^(\d+(?:\.\d+)?)\s+(?:(?:%s)\s+)?(?:of\s+)?(.*)$" % "|".join(UNITS))
+
+    def parse_meals(self, text):
+        items = []
+        for part in self.SPLIT.split((text or "").lower()):
+            part = part.replace("some ", "").strip()
+            if not part:
+                continue
+            match = self.QUANTITY.match(part)
+            items.append((match.group(2).strip(), float(match.group(1))) if match else (part, 1.0))
+        return items
+
+    def parse_meals_batch(self, texts, batch_size=None, n_process=None):
+        return [self.parse_meals(text) for text in texts]
@@ -0,0 +1,56 @@
+"""
+Compare two benchmarks.suite JSON reports, e.g. main vs a branch.
+
+    python -m benchmarks.compare base.json head.json [--metric p50_ms] [--threshold 0.10]
+
+Results are matched on name and params. Prints one line per benchmark with
+the relative change and exits with status 1 if any got slower by more than
+--threshold, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report["meta"], {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p50_ms", help="Result field to compare (p50_ms, p99_ms, mean_ms, seconds)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    base_meta, base = load(args.base)
+    head_meta, head = load(args.head)
+    print(f"base {base_meta.get('revision')} ({base_meta.get('nlp')})  "
+          f"head {head_meta.get('revision')} ({head_meta.get('nlp')})  metric {args.metric}")
+
+    regressions = 0
+    for key in sorted(base.keys() | head.keys()):
+        name, params = key
+        label = f"{name} {params}"
+        if key not in head or key not in base:
+            print(f"  {'only in ' + ('base' if key in base else 'head'):>12}  {label}")
+            continue
+        old = base[key].get(args.metric, base[key].get("seconds"))
+        new = head[key].get(args.metric, head[key].get("seconds"))
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {change:+11.1%}  {label}: {old} -> {new}{flag}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Load generator for the production serving profile: starts the stub
+Edamam/Groq API and gunicorn (gunicorn.conf.py, wsgi:app), replays a mix of
+/analyze and /api/stats/weekly requests from concurrent keep-alive clients,
+and reports throughput, latency percentiles and per-worker memory as JSON.
+
+    python -m benchmarks.loadgen --workers 4 --threads 4 --concurrency 32 --duration 30
+    python -m benchmarks.loadgen --workers 4 --no-preload      # compare memory without preload
+    python -m benchmarks.loadgen --url http://127.0.0.1:5000   # drive a server you started
+
+Memory is read from /proc (Linux): rss counts shared pages once per process,
+pss splits them between the processes sharing them, so the pss sum is the
+real footprint and the rss - pss gap is what preloading saves.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from benchmarks.common import percentile, synthetic_days
+from benchmarks.stub_server import EDAMAM_PATH, start_stub_server
+from benchmarks.suite import git_revision, meal_vocabulary
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def simple_nlp_app():
+    """gunicorn factory (benchmarks.loadgen:simple_nlp_app()) for hosts without the spaCy model."""
+    from app.engines import registry
+    from benchmarks.common import SimpleMealParser
+    registry.register("nlp", SimpleMealParser)
+    import wsgi
+    return wsgi.app
+
+
+def start_gunicorn(port, args, env):
+    app_path = "wsgi:app"
+    if args.nlp == "simple":
+        app_path = "benchmarks.loadgen:simple_nlp_app()"
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+           "--workers", str(args.workers), "--threads", str(args.threads), app_path]
+    env = {**env, "GUNICORN_PRELOAD": "1" if args.preload else "0"}
+    return subprocess.Popen(cmd, cwd=BASE_DIR, env=env)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(host, port, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/readyz")
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def children(pid):
+    """Direct child pids, from /proc (Linux)."""
+    found = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; the command name (field 2) may contain spaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        if ppid == pid:
+            found.append(int(entry))
+    return sorted(found)
+
+
+def memory(pid):
+    """rss, pss and shared MB for a process, or None if /proc doesn't have it."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].rstrip(":") in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty"):
+                    values[parts[0].rstrip(":")] = int(parts[1]) / 1024.0
+    except OSError:
+        return None
+    return {
+        "rss_mb": round(values.get("Rss", 0), 1),
+        "pss_mb": round(values.get("Pss", 0), 1),
+        "shared_mb": round(values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0), 1),
+    }
+
+
+class Client(threading.Thread):
+    def __init__(self, host, port, days, analyze_share, stop, seed):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.days = days
+        self.analyze_share = analyze_share
+        self.stop = stop
+        self.rng = random.Random(seed)
+        self.samples = []  # (endpoint, seconds, status)
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        while not self.stop.is_set():
+            if self.rng.random() < self.analyze_share:
+                endpoint, method = "/analyze", "POST"
+                body, headers = json.dumps(self.rng.choice(self.days)), {"Content-Type": "application/json"}
+            else:
+                endpoint, method, body, headers = "/api/stats/weekly", "GET", None, {}
+            start = time.perf_counter()
+            try:
+                conn.request(method, endpoint, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = 0
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            self.samples.append((endpoint, time.perf_counter() - start, status))
+        conn.close()
+
+
+def run_load(host, port, args):
+    days = synthetic_days(500, seed=1, vocabulary=meal_vocabulary(args.api_share))
+    stop = threading.Event()
+    clients = [Client(host, port, days, args.analyze_share, stop, seed=i) for i in range(args.concurrency)]
+    for c in clients:
+        c.start()
+    time.sleep(args.warmup)
+    for c in clients:
+        c.samples.clear()
+    start = time.perf_counter()
+    time.sleep(args.duration)
+    stop.set()
+    elapsed = time.perf_counter() - start
+    for c in clients:
+        c.join(timeout=60)
+
+    samples = [s for c in clients for s in c.samples]
+    by_endpoint = {}
+    for endpoint, seconds, status in samples:
+        by_endpoint.setdefault(endpoint, []).append((seconds * 1000.0, status))
+    endpoints = {}
+    for endpoint, rows in sorted(by_endpoint.items()):
+        latencies = [ms for ms, _ in rows]
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(1 for _, status in rows if status != 200),
+            "rps": round(len(rows) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+        }
+    return {
+        "seconds": round(elapsed, 2),
+        "requests": len(samples),
+        "errors": sum(1 for _, _, status in samples if status != 200),
+        "rps": round(len(samples) / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Drive an already running server instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before that")
+    parser.add_argument("--analyze-share", type=float, default=0.3, help="Share of requests that are /analyze")
+    parser.add_argument("--api-share", type=float, default=0.1, help="Rough share of items that go to Edamam")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Stub Edamam latency (seconds)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Stub Groq latency (seconds)")
+    parser.add_argument("--nlp", choices=["spacy", "simple"], default="spacy",
+                        help="simple serves a regex parser instead of spaCy (no model needed)")
+    parser.add_argument("--ready-timeout", type=float, default=180.0)
+    parser.add_argument("--out", help="Write the JSON here as well as to stdout")
+    args = parser.parse_args()
+
+    server = process = tmp = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        server = start_stub_server(latency=args.api_latency, llm_latency=args.llm_latency)
+        tmp = tempfile.TemporaryDirectory()
+        env = {
+            **os.environ,
+            "GLUCOVISION_DB": os.path.join(tmp.name, "load.db"),
+            "EDAMAM_CACHE_PATH": os.path.join(tmp.name, "api_cache.db"),
+            "SUGGESTION_CACHE_PATH": os.path.join(tmp.name, "api_cache.db"),
+            "EDAMAM_APP_ID": "load", "EDAMAM_APP_KEY": "load",
+            "EDAMAM_API_URL": server.base_url + EDAMAM_PATH,
+            "GROQ_API_KEY": "load", "GROQ_BASE_URL": server.base_url,
+        }
+        env.pop("GROQ_FAKE", None)
+        host, port = "127.0.0.1", free_port()
+        started = time.perf_counter()
+        process = start_gunicorn(port, args, env)
+        if not wait_ready(host, port, args.ready_timeout):
+            process.terminate()
+            sys.exit("gunicorn did not become ready")
+        boot_s = time.perf_counter() - started
+
+    try:
+        load = run_load(host, port, args)
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split()[0],
+                "args": vars(args),
+            },
+            "load": load,
+        }
+        if process is not None:
+            workers = {pid: memory(pid) for pid in children(process.pid)}
+            report["server"] = {
+                "boot_s": round(boot_s, 2),
+                "master": memory(process.pid),
+                "workers": list(workers.values()),
+                "total_rss_mb": round(sum(m["rss_mb"] for m in workers.values() if m), 1),
+                "total_pss_mb": round(sum(m["pss_mb"] for m in workers.values() if m), 1),
+            }
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=60)
+        if server is not None:
+            server.shutdown()
+        if tmp is not None:
+            tmp.cleanup()
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
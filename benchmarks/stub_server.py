@@ -0,0 +1,127 @@
+"""
+Local stand-in for the Edamam and Groq HTTP APIs, with adjustable latency
+and failure rate, for exercising the resilience layer without the network.
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.05 --fail-rate 0.2
+
+Point the app at it with:
+
+    EDAMAM_API_URL=http://127.0.0.1:8765/api/nutrition-data
+    GROQ_BASE_URL=http://127.0.0.1:8765
+
+In-process use: server = start_stub_server(); server.latency = 2.0; ...; server.shutdown()
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+EDAMAM_PATH = "/api/nutrition-data"
+GROQ_PATH = "/openai/v1/chat/completions"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _delay_or_fail(self, latency):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if latency:
+            time.sleep(latency)
+        if server.fail_rate and random.random() < server.fail_rate:
+            self._send(server.fail_status, {"error": "stub failure"})
+            return True
+        return False
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != EDAMAM_PATH:
+            return self._send(404, {"error": "not found"})
+        if self._delay_or_fail(self.server.latency):
+            return
+        ingr = parse_qs(url.query).get("ingr", [""])[0]
+        # Deterministic per ingredient so repeated runs agree
+        seed = sum(map(ord, ingr))
+        nutrients = {
+            "ENERC_KCAL": {"quantity": 50 + seed % 400},
+            "PROCNT": {"quantity": seed % 30},
+            "FAT": {"quantity": seed % 20},
+            "CHOCDF": {"quantity": seed % 60},
+            "FIBTG": {"quantity": seed % 8},
+            "SUGAR": {"quantity": 1 + seed % 25},
+        }
+        self._send(200, {"calories": nutrients["ENERC_KCAL"]["quantity"], "totalNutrients": nutrients})
+
+    def do_POST(self):
+        if urlparse(self.path).path != GROQ_PATH:
+            return self._send(404, {"error": "not found"})
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        llm_latency = self.server.llm_latency
+        if self._delay_or_fail(self.server.latency if llm_latency is None else llm_latency):
+            return
+        content = json.dumps({
+            "suggestions": ["Walk for 10-15 minutes after meals.", "Drink water with meals.",
+                            "Eat fiber and protein first.", "Swap to low-GI grains.", "Halve simple carbs."],
+            "analysis": ["Stub analysis."],
+        })
+        self._send(200, {
+            "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": "stub",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.0, fail_rate=0.0, fail_status=503, llm_latency=None):
+    """
+    Serve on a daemon thread. Returns the server; latency, llm_latency (Groq
+    only, defaults to latency) and fail_rate can be changed while it runs.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.llm_latency = llm_latency
+    server.fail_rate = fail_rate
+    server.fail_status = fail_status
+    server.requests = 0
+    server.lock = threading.Lock()
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="stub-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--llm-latency", type=float, default=None, help="Groq latency, if different from --latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with --fail-status")
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.host, args.port, args.latency, args.fail_rate, args.fail_status,
+                               args.llm_latency)
+    print(f"Stub Edamam/Groq API on {server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Reproducible benchmark suite for the whole analysis pipeline, with JSON
+output that can be compared between commits (see benchmarks.compare).
+
+    python -m benchmarks.suite --rows 1000 100000 1000000 --out base.json
+    git checkout my-branch
+    python -m benchmarks.suite --rows 1000 100000 1000000 --out head.json
+    python -m benchmarks.compare base.json head.json
+
+Micro benchmarks: parse_meals over synthetic meal-text corpora of varying
+length and vocabulary, fuzzy_match, analyze_meals and calculate_risk per food
+table size, and the storage calls on a seeded history. End to end: /analyze
+(async and ?sync=1), /api/stats/weekly (plain and as a 304 revalidation) and
+/history through the Flask test client. Edamam and Groq are served by
+benchmarks.stub_server with --api-latency/--llm-latency. All data is seeded,
+so runs are repeatable.
+
+Memo caches are emptied before each micro benchmark so it measures the work
+itself; the end-to-end runs keep them, as the app would.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from benchmarks.common import (
+    BASE_FOODS, SimpleMealParser, summarize, synthetic_days, synthetic_food_names,
+    synthetic_food_rows, synthetic_meal_text, synthetic_queries, time_calls,
+)
+from benchmarks.stub_server import EDAMAM_PATH, start_stub_server
+
+MEALS = ("breakfast", "lunch", "snacks", "dinner")
+# name -> (max items per meal, vocabulary size; None for the plain food list)
+CORPORA = {
+    "short_base": (1, None),
+    "medium_base": (4, None),
+    "long_base": (12, None),
+    "medium_wide": (4, 5000),
+    "long_wide": (12, 5000),
+}
+# Not in any synthetic table, so they go to the (stub) Edamam API
+OFF_TABLE_FOODS = ["kombucha", "quinoa", "avocado toast", "falafel", "hummus", "sushi",
+                   "tempeh", "kimchi", "pho", "burrito", "ramen", "miso"]
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, timeout=30)
+        return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "") if out.returncode == 0 else None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def corpus(name, n, seed=0):
+    max_items, vocab_size = CORPORA[name]
+    vocabulary = synthetic_food_names(vocab_size, seed=seed + 7) if vocab_size else BASE_FOODS
+    rng = random.Random(seed)
+    return [synthetic_meal_text(rng, max_items, vocabulary) for _ in range(n)]
+
+
+def make_nlp(choice):
+    """(engine, name). auto uses spaCy only when en_core_web_sm is installed, since NLPEngine would download it."""
+    if choice == "auto":
+        import spacy.util
+        choice = "spacy" if spacy.util.is_package("en_core_web_sm") else "simple"
+    if choice == "spacy":
+        from app.nlp import NLPEngine
+        return NLPEngine(), "spacy"
+    return SimpleMealParser(), "simple"
+
+
+def meal_vocabulary(api_share):
+    """BASE_FOODS plus enough off-table foods that roughly api_share of the picks miss the table."""
+    n_off = round(len(BASE_FOODS) * api_share / (1 - api_share)) if api_share < 1 else len(OFF_TABLE_FOODS)
+    return BASE_FOODS + OFF_TABLE_FOODS[:min(n_off, len(OFF_TABLE_FOODS))]
+
+
+def reset_memos(nlp, nutrition):
+    if hasattr(nlp, "parse_cache"):
+        nlp.parse_cache.clear()
+    nutrition.match_cache.clear()
+
+
+def result(name, params, latencies, **extra):
+    return {"name": name, "params": params, **summarize(latencies), **extra}
+
+
+def bench_parse(nlp, calls):
+    out = []
+    for name in CORPORA:
+        texts = corpus(name, calls)
+        if hasattr(nlp, "parse_cache"):
+            nlp.parse_cache.clear()
+        latencies = time_calls(nlp.parse_meals, texts)
+        out.append(result("parse_meals", {"corpus": name}, latencies,
+                          items_per_text=round(sum(len(nlp.parse_meals(t)) for t in texts[:200]) / min(200, len(texts)), 2)))
+    return out
+
+
+def bench_nutrition(nlp, nutrition, rows, calls, vocabulary):
+    out = []
+    queries = synthetic_queries(nutrition.food_names, calls)
+    reset_memos(nlp, nutrition)
+    out.append(result("fuzzy_match", {"rows": rows}, time_calls(nutrition.fuzzy_match, queries)))
+
+    days = synthetic_days(calls, seed=3, vocabulary=vocabulary)
+    parsed = [[item for m in MEALS for item in nlp.parse_meals(day[m])] for day in days]
+    reset_memos(nlp, nutrition)
+    out.append(result("analyze_meals", {"rows": rows}, time_calls(nutrition.analyze_meals, parsed),
+                      api_cache=nutrition.api_cache.stats()))
+    return out
+
+
+def bench_risk(nutrition, calls):
+    rng = random.Random(5)
+    totals = [{"total_sugar": rng.uniform(0, 90), "total_carbs": rng.uniform(50, 350),
+               "total_fiber": rng.uniform(0, 40), "total_calories": rng.uniform(800, 3500),
+               "total_protein": rng.uniform(10, 120), "total_fat": rng.uniform(10, 120)}
+              for _ in range(calls)]
+    return [result("calculate_risk", {}, time_calls(nutrition.calculate_risk, totals))]
+
+
+def bench_storage(storage, history_days, calls):
+    rng = random.Random(11)
+    first = date(2000, 1, 1)
+
+    def totals():
+        return {k: round(rng.uniform(0, 300), 2) for k in
+                ("total_calories", "total_carbs", "total_sugar", "total_protein", "total_fat", "total_fiber")}
+
+    entries = [((first + timedelta(days=i)).isoformat(), {"lunch": "rice and dal"}, totals(), "Safe", "")
+               for i in range(history_days)]
+    start = time.perf_counter()
+    storage.log_daily_entries(entries)
+    seed_s = time.perf_counter() - start
+
+    params = {"history_days": history_days}
+    dates = [(first + timedelta(days=rng.randrange(history_days))).isoformat() for _ in range(calls)]
+    out = [
+        result("log_daily_entry", params,
+               time_calls(lambda d: storage.log_daily_entry(d, {"lunch": "rice"}, totals(), "Moderate", ""), dates)),
+        result("log_daily_entries", {**params, "batch": 100},
+               time_calls(storage.log_daily_entries, [entries[i:i + 100] for i in range(0, min(len(entries), 100 * 20), 100)])),
+        result("get_history", {**params, "limit": 30}, time_calls(lambda _: storage.get_history(30), range(calls))),
+        # Keyset page near the oldest entry; should cost the same as the first page
+        result("get_history_deep", {**params, "limit": 30},
+               time_calls(lambda _: storage.get_history(30, before=entries[min(60, len(entries) - 1)][0]), range(calls))),
+        result("get_window_summary", {**params, "limit": 7},
+               time_calls(lambda _: storage.get_window_summary(7), range(calls))),
+        result("get_rollups", {**params, "period": "month"},
+               time_calls(lambda _: storage.get_rollups("month", limit=12), range(calls))),
+    ]
+    out[0]["seed_s"] = round(seed_s, 3)
+    return out
+
+
+def drain_jobs(timeout=300):
+    """Wait for background suggestion jobs so they don't overlap the next measurement."""
+    from app.jobs import suggestion_jobs
+    deadline = time.monotonic() + timeout
+    while suggestion_jobs.stats()["active"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def bench_e2e(client, rows, calls, vocabulary):
+    # Fresh days per table size and for the sync run, so suggestions aren't served from cache
+    days = synthetic_days(calls, seed=rows, vocabulary=vocabulary)
+    sync_days = synthetic_days(max(1, calls // 10), seed=rows + 1, vocabulary=vocabulary)
+
+    def post(day, query=""):
+        response = client.post("/analyze" + query, json=day)
+        assert response.status_code == 200, response.status_code
+
+    def get(path, status=200, headers=None):
+        response = client.get(path, headers=headers)
+        assert response.status_code == status, response.status_code
+
+    params = {"rows": rows}
+    out = [result("e2e_analyze", params, time_calls(post, days))]
+    drain_jobs()
+    out.append(result("e2e_analyze_sync", params, time_calls(lambda d: post(d, "?sync=1"), sync_days)))
+    # No writes from here on, so the reads below hit the per-version cache, and revalidation gets a 304
+    revalidate = {"If-None-Match": client.get("/api/stats/weekly").headers["ETag"]}
+    out += [
+        result("e2e_stats_weekly", params, time_calls(lambda _: get("/api/stats/weekly"), range(calls))),
+        result("e2e_stats_weekly_304", params,
+               time_calls(lambda _: get("/api/stats/weekly", 304, revalidate), range(calls))),
+        result("e2e_history", params, time_calls(lambda _: get("/history"), range(calls))),
+    ]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10_000, 100_000],
+                        help="Synthetic food table sizes (up to 1000000)")
+    parser.add_argument("--calls", type=int, default=300, help="Timed calls per benchmark")
+    parser.add_argument("--history-days", type=int, default=3650, help="Days seeded before the storage benchmarks")
+    parser.add_argument("--nlp", choices=["auto", "spacy", "simple"], default="auto")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="Stub Edamam latency (seconds)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub Groq latency (seconds)")
+    parser.add_argument("--api-share", type=float, default=0.1,
+                        help="Rough share of meal items that miss the food table and go to Edamam")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["parse", "nutrition", "storage", "e2e"])
+    parser.add_argument("--out", help="Write the JSON here as well as to stdout")
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.api_latency, llm_latency=args.llm_latency)
+    tmp = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "GLUCOVISION_DB": os.path.join(tmp.name, "bench.db"),
+        "EDAMAM_APP_ID": "bench", "EDAMAM_APP_KEY": "bench",
+        "EDAMAM_API_URL": server.base_url + EDAMAM_PATH,
+        "GROQ_API_KEY": "bench", "GROQ_BASE_URL": server.base_url,
+        "EDAMAM_CACHE_PATH": "", "SUGGESTION_CACHE_PATH": "",
+        "NUTRITION_SNAPSHOT": "0", "ENGINE_WARMUP": "0", "GLUCOVISION_LOG_LEVEL": "WARNING",
+    })
+    os.environ.pop("GROQ_FAKE", None)
+
+    from app import create_app, engines, storage
+
+    nlp, nlp_name = make_nlp(args.nlp)
+    engines.registry.register("nlp", lambda: nlp)
+    vocabulary = meal_vocabulary(args.api_share)
+    results = []
+    started = time.perf_counter()
+
+    if "parse" not in args.skip:
+        results.extend(bench_parse(nlp, args.calls))
+
+    if "storage" not in args.skip:
+        storage.close_connection()
+        storage.init_db()
+        results.extend(bench_storage(storage, args.history_days, args.calls))
+
+    app = create_app()
+    client = app.test_client()
+    for rows in args.rows:
+        from app.nutrition import NutritionEngine
+        csv_path = os.path.join(tmp.name, f"foods_{rows}.csv")
+        pd.DataFrame(synthetic_food_rows(rows)).to_csv(csv_path, index=False)
+        start = time.perf_counter()
+        nutrition = NutritionEngine(csv_path)
+        load_s = time.perf_counter() - start
+        results.append({"name": "load_data", "params": {"rows": rows}, "n": 1, "seconds": round(load_s, 3)})
+        engines.registry.register("nutrition", lambda n=nutrition: n)
+
+        if "nutrition" not in args.skip:
+            results.extend(bench_nutrition(nlp, nutrition, rows, args.calls, vocabulary))
+            if rows == args.rows[0]:
+                results.extend(bench_risk(nutrition, args.calls))
+        if "e2e" not in args.skip:
+            results.extend(bench_e2e(client, rows, args.calls, vocabulary))
+
+    storage.close_connection()
+    server.shutdown()
+    tmp.cleanup()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "nlp": nlp_name,
+            "args": vars(args),
+            "seconds": round(time.perf_counter() - started, 1),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
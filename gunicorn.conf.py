@@ -0,0 +1,26 @@
+"""
+gunicorn settings for wsgi:app. Every value can be overridden with an
+environment variable (and WEB_CONCURRENCY is honoured, as on most hosts).
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WEB_CONCURRENCY", os.environ.get("GUNICORN_WORKERS", min(4, multiprocessing.cpu_count()))))
+# Threads per worker. Requests mostly wait on SQLite, Edamam or the SSE stream, so a few threads go a long way.
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+# Load the app (and every engine) once in the master, then fork
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+# Recycle workers after this many requests (0 = never), with jitter so they don't all restart together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+# RotatingFileHandler can't share a file across processes, so each worker traces to trace.<pid>.log
+os.environ.setdefault("GLUCOVISION_LOG_PER_PROCESS", "1")
@@ -0,0 +1,80 @@
+import re
+
+import pytest
+
+from app import storage
+
+FOODS_CSV = """Food_Name,Calories,Carbs,Sugar,Protein,Fat,Fiber
+rice,130,28,0.1,2.7,0.3,0.4
+dal,116,20,1.8,9,0.4,8
+idli,58,12,0.5,2,0.2,0.8
+jalebi,150,35,30,1,4,0.2
+"""
+
+
+class StubNLP:
+    """Splits a meal on commas and "and", with an optional leading quantity, instead of running spaCy."""
+
+    def parse(self, text):
+        items = []
+        for part in re.split(r",| and ", text):
+            part = part.strip()
+            if part:
+                match = re.match(r"(\d+(?:\.\d+)?)\s+(.*)", part)
+                items.append((match.group(2), float(match.group(1))) if match else (part, 1.0))
+        return items
+
+    def parse_meals(self, text):
+        return self.parse(text)
+
+    def parse_meals_batch(self, texts, batch_size=None, n_process=None):
+        return [self.parse(text) for text in texts]
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A fresh history database for the test; this thread's connection is closed afterwards."""
+    path = tmp_path / "glucovision.db"
+    monkeypatch.setenv("GLUCOVISION_DB", str(path))
+    yield path
+    storage.close_connection()
+
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    monkeypatch.setenv("ENGINE_WARMUP", "0")
+    from app import create_app
+    return create_app().test_client()
+
+
+@pytest.fixture
+def food_csv(tmp_path):
+    path = tmp_path / "foods.csv"
+    path.write_text(FOODS_CSV)
+    return path
+
+
+@pytest.fixture
+def nutrition_engine(food_csv, monkeypatch):
+    """A NutritionEngine over food_csv, offline and with no on-disk API cache."""
+    monkeypatch.delenv("EDAMAM_APP_ID", raising=False)
+    monkeypatch.delenv("EDAMAM_APP_KEY", raising=False)
+    monkeypatch.setenv("EDAMAM_CACHE_PATH", "")
+    monkeypatch.setenv("DATASET_WATCH_INTERVAL", "0")
+    from app.nutrition import NutritionEngine
+    return NutritionEngine(str(food_csv))
+
+
+@pytest.fixture
+def engines(nutrition_engine, monkeypatch):
+    """Registers nutrition_engine, StubNLP and an offline RAG engine in place of the real ones."""
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setenv("SUGGESTION_CACHE_PATH", "")
+    from app.engines import registry
+    from app.fake_groq import FakeGroq
+    from app.rag import RAGEngine
+
+    instances = {"nutrition": nutrition_engine, "nlp": StubNLP(), "rag": RAGEngine(client_factory=FakeGroq)}
+    for name, instance in instances.items():
+        monkeypatch.setitem(registry._instances, name, instance)
+    return instances
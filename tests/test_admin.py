@@ -0,0 +1,16 @@
+def test_admin_routes_are_closed_without_admin_token(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+
+    for method, path in (("get", "/api/admin/dataset"), ("post", "/api/admin/dataset/reload")):
+        response = getattr(client, method)(path, environ_base={"REMOTE_ADDR": "127.0.0.1"})
+        assert response.status_code == 403
+        assert "ADMIN_TOKEN" in response.get_json()["error"]
+
+
+def test_admin_routes_check_the_token(client, monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cret")
+
+    assert client.get("/api/admin/dataset").status_code == 403
+    assert client.get("/api/admin/dataset", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    # Past the check; the nutrition engine hasn't been built in this test
+    assert client.get("/api/admin/dataset", headers={"X-Admin-Token": "s3cret"}).status_code != 403
@@ -0,0 +1,26 @@
+import json
+
+from app import storage
+
+
+def test_analyze_totals_the_day(client, engines):
+    response = client.post("/analyze?sync=1", json={"breakfast": "2 idli", "lunch": "rice and dal"})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["totals"]["total_sugar"] == 2.9
+    assert data["unmatched"] == []
+    assert response.headers["X-Dataset-Version"] == engines["nutrition"].dataset_version
+
+
+def test_non_string_and_null_meals_are_read_as_text(client, engines):
+    response = client.post("/analyze?sync=1", json={"breakfast": 2, "lunch": None, "dinner": "rice"})
+
+    assert response.status_code == 200
+    assert response.get_json()["unmatched"] == ["2"]
+    meals = json.loads(storage.get_history(1)[0]["meals_json"])
+    assert meals == {"breakfast": "2", "lunch": "", "snacks": "", "dinner": "rice"}
+
+
+def test_analyze_rejects_a_non_object_body(client, engines):
+    assert client.post("/analyze", json=["rice"]).status_code == 400
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from app import storage
+from app.batch import import_records, read_ndjson
+
+from conftest import StubNLP
+
+
+def stored_dates(user_id=storage.DEFAULT_USER):
+    return sorted(entry["date"] for entry in storage.get_history(100, user_id=user_id))
+
+
+def ndjson(*records):
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in records)
+
+
+def test_bad_lines_are_reported_and_good_ones_stored(client, engines):
+    body = ndjson(
+        {"date": "2024-06-01", "breakfast": "2 idli"},
+        "{not json",
+        {"date": "06/02/2024", "lunch": "rice"},
+        "",
+        {"date": "2024-06-03", "meals": {"lunch": "rice and dal", "dinner": 2}},
+        ["2024-06-04"],
+    )
+    response = client.post("/api/analyze/batch", data=body, content_type="application/x-ndjson")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [e["line"] for e in data["summary"]["errors"]] == [2, 3, 6]
+    assert data["summary"]["errors"][1]["error"] == "date must be YYYY-MM-DD"
+    assert (data["summary"]["records"], data["summary"]["written"]) == (2, 2)
+    assert stored_dates() == ["2024-06-01", "2024-06-03"]
+
+
+def test_read_ndjson_numbers_lines_from_one():
+    results = list(read_ndjson(["", '{"date": "2024-06-01", "lunch": null}', "[]"]))
+
+    assert results[0] == (2, ("2024-06-01", {"breakfast": "", "lunch": "", "snacks": "", "dinner": ""}), None)
+    assert results[1][0] == 3 and results[1][2] == "record must be a JSON object"
+
+
+def test_last_chunk_may_be_partial(db_path, engines):
+    storage.init_db()
+    records = [(f"2024-07-0{day}", {"breakfast": "idli", "lunch": "", "snacks": "", "dinner": "rice"})
+               for day in range(1, 6)]
+
+    results, summary = import_records(records, chunk_size=2, nlp_engine=engines["nlp"],
+                                      nutrition_engine=engines["nutrition"])
+
+    assert (summary["records"], summary["written"], len(results)) == (5, 5, 5)
+    assert stored_dates() == [date_str for date_str, _ in records]
+    assert storage.get_rollups("month")[0]["days"] == 5
+
+
+class FailingNLP(StubNLP):
+    """Parses the first `calls` batches, then raises."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def parse_meals_batch(self, texts, batch_size=None, n_process=None):
+        if self.calls == 0:
+            raise RuntimeError("parser crashed")
+        self.calls -= 1
+        return super().parse_meals_batch(texts)
+
+
+def test_chunks_before_a_failure_stay_committed(db_path, engines):
+    storage.init_db()
+    records = [(f"2024-07-0{day}", {"breakfast": "idli", "lunch": "", "snacks": "", "dinner": ""})
+               for day in range(1, 6)]
+
+    with pytest.raises(RuntimeError):
+        import_records(records, chunk_size=2, nlp_engine=FailingNLP(calls=2), nutrition_engine=engines["nutrition"])
+
+    assert stored_dates() == ["2024-07-01", "2024-07-02", "2024-07-03", "2024-07-04"]
+
+
+def test_records_go_to_the_requesting_user(client, engines, monkeypatch):
+    monkeypatch.setenv("TRUST_USER_HEADER", "1")
+    body = ndjson({"date": "2024-06-01", "lunch": "rice"}, {"date": "2024-06-02", "lunch": "dal"})
+
+    assert client.post("/api/analyze/batch", data=body, content_type="application/x-ndjson",
+                       headers={"X-User-Id": "asha"}).status_code == 200
+    assert client.post("/api/analyze/batch", json={"records": [{"date": "2024-06-05", "lunch": "idli"}]},
+                       headers={"X-User-Id": "ravi"}).status_code == 200
+
+    assert stored_dates("asha") == ["2024-06-01", "2024-06-02"]
+    assert stored_dates("ravi") == ["2024-06-05"]
+    assert stored_dates() == []
+    assert storage.get_rollups("month", user_id="asha")[0]["days"] == 2
@@ -0,0 +1,41 @@
+"""Runs each benchmark's seeding step on a tiny database, so a schema change that breaks one shows up here."""
+import random
+
+from app import storage
+from app.export import export_history
+from benchmarks import bench_export, bench_stats, bench_storage_writers, bench_users
+
+
+def test_bench_export_seed(db_path):
+    storage.init_db()
+    first, last = bench_export.seed(storage, 20)
+
+    rows = [row for chunk in storage.iter_history() for row in chunk]
+    assert [(row[0], row[1]) for row in rows][::19] == [(storage.DEFAULT_USER, first.isoformat()),
+                                                       (storage.DEFAULT_USER, last.isoformat())]
+    assert len(b"".join(export_history("csv")).splitlines()) == 21
+
+
+def test_bench_stats_seed(db_path):
+    storage.init_db()
+    bench_stats.seed_history(storage, 0.1)
+
+    assert len(storage.get_history(100)) == 36
+    assert bench_stats.legacy_window(storage, 7)[0] == storage.get_window_summary(7)["sugar_high_days"]
+
+
+def test_bench_users_seed(db_path):
+    storage.init_db()
+    bench_users.seed_users(storage, 0, 3, 5, random.Random(0))
+
+    for i in range(3):
+        assert len(storage.get_history(10, user_id=bench_users.user_id(i))) == 5
+    bench_users.per_user_latency(storage, 3, 5, 2, random.Random(1))
+
+
+def test_bench_storage_writers_run(db_path, monkeypatch):
+    # run() points GLUCOVISION_DB at its own temporary database
+    monkeypatch.setenv("GLUCOVISION_DB", str(db_path))
+    for mode in ("legacy", "pooled"):
+        result = bench_storage_writers.run(mode, 1, 4)
+        assert (result["writes"], result["errors"]) == (4, 0)
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.cache import MISSING, SQLiteCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def test_hits_do_not_write(cache_path):
+    cache = SQLiteCache(cache_path, ttl=3600)
+    cache.set("rice", {"sugar": 0.1})
+    changes = cache._conn.total_changes
+
+    assert cache.get("rice") == {"sugar": 0.1}
+    assert cache.get("rice") == {"sugar": 0.1}
+    assert cache._conn.total_changes == changes
+
+
+def test_stale_access_time_is_refreshed(cache_path):
+    cache = SQLiteCache(cache_path, ttl=3600, touch_fraction=0.1)
+    cache.set("rice", 1)
+    cache._conn.execute("UPDATE cache SET accessed_at = accessed_at - 400")
+    cache._conn.commit()
+
+    assert cache.get("rice") == 1
+    accessed_at = cache._conn.execute("SELECT accessed_at FROM cache").fetchone()[0]
+    assert accessed_at > time.time() - 5
+
+
+def test_expired_entries_miss(cache_path):
+    cache = SQLiteCache(cache_path, ttl=3600)
+    cache.set("rice", 1, ttl=-1)
+    assert cache.get("rice") is MISSING
+
+
+def test_eviction_drops_least_recently_used_in_batches(cache_path):
+    cache = SQLiteCache(cache_path, maxsize=10, evict_fraction=0.2)
+    for i in range(10):
+        cache.set(f"k{i}", i)
+        cache._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (1000 + i, f"k{i}"))
+        cache._conn.commit()
+    cache.set("k0", 0)  # an overwrite doesn't grow the table
+    assert len(cache) == 10
+
+    cache.set("new", 10)
+    # 11 rows: the overflow and a batch of 2 go, oldest access first (k0 was just rewritten)
+    assert len(cache) == 8
+    assert cache.evictions == 3
+    assert cache.get("k1") is MISSING and cache.get("k3") is MISSING
+    assert cache.get("k0") == 0 and cache.get("k4") == 4 and cache.get("new") == 10
+
+
+def test_row_count_is_read_on_open(cache_path):
+    SQLiteCache(cache_path, maxsize=5).set("a", 1)
+    reopened = SQLiteCache(cache_path, maxsize=5)
+    assert reopened._rows == 1
+
+
+def test_locked_database_fails_fast_and_reads_continue(cache_path):
+    cache = SQLiteCache(cache_path, busy_timeout=0.1)
+    cache.set("rice", 1)
+    assert cache._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other = sqlite3.connect(cache_path)
+    other.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        with pytest.raises(sqlite3.OperationalError):
+            cache.set("dal", 2)
+        assert time.monotonic() - start < 2
+        # WAL readers don't wait on the writer
+        assert cache.get("rice") == 1
+    finally:
+        other.rollback()
+        other.close()
+    cache.set("dal", 2)
+    assert cache.get("dal") == 2
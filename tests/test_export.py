@@ -0,0 +1,91 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from app import storage
+from app.batch import MEALS
+from app.export import export_history
+
+
+def seed():
+    meals = [
+        {"breakfast": "2 idli, sambar", "lunch": 'rice and "dal"', "snacks": "", "dinner": "roti\nsabzi"},
+        {"breakfast": "poha", "lunch": "curd rice", "snacks": "jalebi – 2", "dinner": ""},
+    ]
+    for i, date_str in enumerate(["2024-06-01", "2024-06-02", "2024-06-03", "2024-06-04", "2024-06-05"]):
+        totals = {column: round(10.5 * (i + 1) + j, 2) for j, column in enumerate(storage.TOTAL_COLUMNS)}
+        risk = ("Safe", "Moderate", "High")[i % 3]
+        storage.log_daily_entry(date_str, meals[i % 2], totals, risk, f"reason {i}, with comma", "asha")
+        storage.log_daily_entry(date_str, meals[(i + 1) % 2], totals, risk, "", "ravi")
+    storage.save_suggestions("2024-06-02", {column: round(21.0 + j, 2) for j, column in
+                                            enumerate(storage.TOTAL_COLUMNS)}, {"suggestions": ["walk"]}, "asha")
+
+
+def stored(user_id):
+    """user_id's rows straight from user_history, oldest first."""
+    return list(reversed(storage.get_history(100, user_id=user_id)))
+
+
+def export(client, fmt, user_id, **params):
+    response = client.get("/api/export/history", query_string={"format": fmt, "gzip": "1", **params},
+                          headers={"X-User-Id": user_id})
+    assert response.status_code == 200
+    assert response.mimetype == "application/gzip"
+    return gzip.decompress(response.data).decode("utf-8")
+
+
+@pytest.fixture
+def seeded(client, monkeypatch):
+    monkeypatch.setenv("TRUST_USER_HEADER", "1")
+    # Several chunks per export
+    monkeypatch.setenv("EXPORT_CHUNK_SIZE", "2")
+    seed()
+    return client
+
+
+@pytest.mark.parametrize("user_id", ["asha", "ravi"])
+def test_gzipped_ndjson_round_trips(seeded, user_id):
+    lines = [json.loads(line) for line in export(seeded, "ndjson", user_id).splitlines()]
+
+    assert lines == [{
+        "user_id": user_id,
+        "date": row["date"],
+        "risk_level": row["risk_level"],
+        "risk_reason": row["risk_reason"],
+        "totals": {column: row[column] for column in storage.TOTAL_COLUMNS},
+        "meals": json.loads(row["meals_json"]),
+        "suggestions": json.loads(row["suggestions_json"]) if row["suggestions_json"] else None,
+    } for row in stored(user_id)]
+    assert lines[1]["suggestions"] == ({"suggestions": ["walk"]} if user_id == "asha" else None)
+
+
+@pytest.mark.parametrize("user_id", ["asha", "ravi"])
+def test_gzipped_csv_round_trips(seeded, user_id):
+    rows = list(csv.DictReader(io.StringIO(export(seeded, "csv", user_id), newline="")))
+
+    assert rows == [{
+        "user_id": user_id,
+        "date": row["date"],
+        "risk_level": row["risk_level"],
+        "risk_reason": row["risk_reason"],
+        **{column: repr(row[column]) for column in storage.TOTAL_COLUMNS},
+        **{meal: json.loads(row["meals_json"]).get(meal, "") for meal in MEALS},
+    } for row in stored(user_id)]
+
+
+def test_filters_apply_within_the_user(seeded):
+    lines = [json.loads(line) for line in
+             export(seeded, "ndjson", "asha", start="2024-06-02", end="2024-06-04", risk="High,Moderate").splitlines()]
+
+    assert [(line["user_id"], line["date"], line["risk_level"]) for line in lines] == [
+        ("asha", "2024-06-02", "Moderate"), ("asha", "2024-06-03", "High")]
+
+
+def test_export_of_every_user_is_ordered_by_user_then_date(seeded):
+    text = gzip.decompress(b"".join(export_history("ndjson", gzip=True, chunk_size=3))).decode("utf-8")
+
+    assert [(line["user_id"], line["date"]) for line in map(json.loads, text.splitlines())] == \
+        [("asha", row["date"]) for row in stored("asha")] + [("ravi", row["date"]) for row in stored("ravi")]
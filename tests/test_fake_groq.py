@@ -0,0 +1,33 @@
+import pytest
+
+from app.fake_groq import FakeGroq
+from app.rag import RAGEngine
+
+TOTALS = {"total_sugar": 55.0, "total_carbs": 240.0, "total_fiber": 12.0,
+          "total_protein": 40.0, "total_fat": 60.0, "total_calories": 2100.0}
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    monkeypatch.setenv("SUGGESTION_CACHE_PATH", "")
+
+
+def test_suggestions_come_from_fake_client():
+    engine = RAGEngine(client_factory=FakeGroq)
+
+    data = engine.generate_suggestions(TOTALS, "High")
+
+    assert data["suggestions"][0].startswith("Since your sugar was 55.0g")
+    assert data["analysis"][0] == "Risk level is High."
+    # The second call is answered from the suggestion cache
+    assert engine.generate_suggestions(TOTALS, "High") == data
+    assert engine._client.calls == 1
+
+
+def test_groq_fake_env_selects_fake_client(monkeypatch):
+    monkeypatch.setenv("GROQ_FAKE", "1")
+    engine = RAGEngine()
+
+    assert engine.client_factory is FakeGroq
+    assert "Risk level is Moderate." in engine.generate_suggestions(TOTALS, "Moderate")["analysis"]
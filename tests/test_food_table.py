@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+
+from app.food_table import FoodTable, NUTRIENT_COLUMNS, api_vector, sum_totals
+
+
+def sequential_totals(days):
+    """The per-item loop sum_totals replaced: each day's rows times quantities, added in order from 0.0."""
+    totals = []
+    for items in days:
+        day = [0.0] * len(NUTRIENT_COLUMNS)
+        for row, qty in items:
+            for j, value in enumerate(row):
+                day[j] += float(value) * qty
+        totals.append(day)
+    return totals
+
+
+def vectorised_totals(days):
+    values, quantities, offsets = [], [], []
+    for items in days:
+        offsets.append(len(values))
+        for row, qty in items:
+            values.append(row)
+            quantities.append(qty)
+    values = np.asarray(values, dtype=np.float64).reshape(-1, len(NUTRIENT_COLUMNS))
+    return sum_totals(values, np.asarray(quantities, dtype=np.float64), np.asarray(offsets, dtype=np.intp))
+
+
+def test_random_days_match_sequential_sum_exactly():
+    rng = random.Random(8)
+    for _ in range(50):
+        days = [
+            [([rng.uniform(0, 500) for _ in NUTRIENT_COLUMNS], rng.choice([0.5, 1.0, 2.0, rng.uniform(0, 5)]))
+             for _ in range(rng.randint(0, 12))]
+            for _ in range(rng.randint(1, 20))
+        ]
+        # Bit-for-bit: the stored totals must not drift from what the loop produced
+        assert vectorised_totals(days).tolist() == sequential_totals(days)
+
+
+def test_no_items():
+    assert sum_totals(np.zeros((0, len(NUTRIENT_COLUMNS))), np.zeros(0), np.zeros(0, dtype=np.intp)).shape == \
+        (0, len(NUTRIENT_COLUMNS))
+    assert vectorised_totals([[], []]).tolist() == [[0.0] * len(NUTRIENT_COLUMNS)] * 2
+
+
+def test_api_vectors_mixed_with_local_rows():
+    rng = random.Random(80)
+    table = FoodTable([f"food {i}" for i in range(30)],
+                      np.array([[rng.uniform(0, 400) for _ in NUTRIENT_COLUMNS] for _ in range(30)]))
+    api = [
+        {"calories": 210.5, "sugar": 12.25, "carbs": 31},
+        {"protein": 7.1, "fat": None, "fiber": 3},
+        {col: rng.uniform(0, 100) for col in NUTRIENT_COLUMNS},
+    ]
+    days = []
+    for _ in range(25):
+        items = []
+        for _ in range(rng.randint(0, 8)):
+            if rng.random() < 0.3:
+                row = api_vector(rng.choice(api))
+            else:
+                row = table.matrix[rng.randrange(len(table))].tolist()
+            items.append((row, rng.uniform(0.25, 3)))
+        days.append(items)
+
+    assert vectorised_totals(days).tolist() == sequential_totals(days)
@@ -0,0 +1,54 @@
+from app import storage
+
+
+def log(date_str, sugar, user_id=storage.DEFAULT_USER):
+    storage.log_daily_entry(date_str, {"lunch": "rice"}, {"total_sugar": sugar, "total_fiber": 20.0}, "Safe", "",
+                            user_id)
+
+
+def test_matching_etag_gets_a_304(client):
+    log("2024-06-01", 12.0)
+    first = client.get("/api/stats/weekly")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert "X-User-Id" in first.headers["Vary"]
+
+    again = client.get("/api/stats/weekly", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    page = client.get("/history")
+    assert page.status_code == 200
+    assert client.get("/history", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+
+
+def test_etag_changes_after_a_write(client):
+    log("2024-06-01", 12.0)
+    before = client.get("/api/stats/weekly")
+
+    log("2024-06-02", 30.0)
+    after = client.get("/api/stats/weekly", headers={"If-None-Match": before.headers["ETag"]})
+
+    assert after.status_code == 200
+    assert after.headers["ETag"] != before.headers["ETag"]
+    assert after.get_json() != before.get_json()
+    assert client.get("/api/stats/weekly", headers={"If-None-Match": after.headers["ETag"]}).status_code == 304
+
+
+def test_etags_differ_between_users(client, monkeypatch):
+    monkeypatch.setenv("TRUST_USER_HEADER", "1")
+    log("2024-06-01", 12.0, "asha")
+    log("2024-06-01", 12.0, "ravi")
+
+    asha = client.get("/api/stats/weekly", headers={"X-User-Id": "asha"})
+    ravi = client.get("/api/stats/weekly", headers={"X-User-Id": "ravi"})
+    assert asha.headers["ETag"] != ravi.headers["ETag"]
+
+    # One user's ETag never validates another user's view
+    response = client.get("/api/stats/weekly", headers={"X-User-Id": "ravi", "If-None-Match": asha.headers["ETag"]})
+    assert response.status_code == 200
+    # A write by asha leaves ravi's ETag alone
+    log("2024-06-02", 50.0, "asha")
+    response = client.get("/api/stats/weekly", headers={"X-User-Id": "ravi", "If-None-Match": ravi.headers["ETag"]})
+    assert response.status_code == 304
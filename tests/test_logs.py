@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from app import logs
+
+
+@pytest.fixture
+def trace_log(tmp_path, monkeypatch):
+    path = tmp_path / "trace.log"
+    monkeypatch.setenv("GLUCOVISION_TRACE_LOG", str(path))
+    monkeypatch.delenv("GLUCOVISION_LOG_PER_PROCESS", raising=False)
+    logs.shutdown_logging()
+    yield path
+    logs.shutdown_logging()
+    monkeypatch.delenv("GLUCOVISION_TRACE_LOG")
+    logs.configure_logging()
+
+
+def test_worker_log_path_keeps_extension():
+    assert logs.worker_log_path("/var/log/trace.log", 1234) == "/var/log/trace.1234.log"
+    assert logs.worker_log_path("trace", 7) == "trace.7"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_worker_writes_its_own_file(trace_log):
+    logs.configure_logging()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            logs.get_logger("test").warning("from the worker")
+            logs.shutdown_logging()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    logs.get_logger("test").warning("from the master")
+    logs.shutdown_logging()
+
+    worker_file = trace_log.with_name(f"trace.{pid}.log")
+    assert "from the worker" in worker_file.read_text()
+    assert "from the worker" not in trace_log.read_text()
+    assert "from the master" in trace_log.read_text()
+
+
+def test_per_process_env_suffixes_with_own_pid(trace_log, monkeypatch):
+    monkeypatch.setenv("GLUCOVISION_LOG_PER_PROCESS", "1")
+    logs.configure_logging()
+    logs.get_logger("test").warning("hello")
+    logs.shutdown_logging()
+
+    assert "hello" in trace_log.with_name(f"trace.{os.getpid()}.log").read_text()
+    assert not trace_log.exists()
@@ -0,0 +1,64 @@
+import random
+
+from rapidfuzz import fuzz, process
+
+from app.matching import FoodMatchIndex
+from benchmarks.common import synthetic_food_names, synthetic_queries
+
+
+def linear_match(names, query, min_score=80):
+    match = process.extractOne(query, names, scorer=fuzz.WRatio)
+    if not match:
+        return None, 0.0
+    if match[1] < min_score:
+        return None, float(match[1])
+    return match[0], float(match[1])
+
+
+def test_lookup_matches_linear_scan():
+    names = synthetic_food_names(5000)
+    rng = random.Random(3)
+    queries = synthetic_queries(names, 300)
+    queries += ["".join(rng.choice("abcdegilnorst ") for _ in range(rng.randint(2, 14))) for _ in range(200)]
+    index = FoodMatchIndex(names)
+    for query in queries:
+        assert index.lookup(query) == linear_match(names, query), query
+
+
+def test_ties_take_the_first_name():
+    # With one candidate the index alone can pick a later name than the scan would
+    names = ["zzz rice", "plain rice", "rice plain"]
+    index = FoodMatchIndex(names, max_candidates=1)
+    for query in ("rice", "plain rice bowl", "Rice Plain"):
+        assert index.lookup(query) == linear_match(names, query), query
+
+
+def test_below_threshold_score_is_reported():
+    names = ["idli", "dosa", "sambar"]
+    index = FoodMatchIndex(names)
+    assert index.lookup("chocolate cake") == linear_match(names, "chocolate cake")
+    assert index.lookup("chocolate cake")[0] is None
+
+
+def test_odd_characters_match_linear_scan():
+    # Case, punctuation, duplicate tokens and Unicode spaces, which rapidfuzz splits inconsistently
+    rng = random.Random(5)
+    alphabet = "aabcdeeilmnorstuAEZ019 -.'\t\xa0\x85 é"
+
+    def phrase():
+        return " ".join("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6)))
+                        for _ in range(rng.randint(1, 4)))
+
+    names = [phrase() for _ in range(1500)] + ["x" * 300 + " rice", "rice rice rice", "Rice"]
+    index = FoodMatchIndex(names, max_candidates=8)
+    for _ in range(300):
+        query = rng.choice([phrase(), rng.choice(names).upper(), phrase() + " " + rng.choice(names)])
+        assert index.lookup(query) == linear_match(names, query), repr(query)
+
+
+def test_index_rebuilt_from_arrays_matches():
+    names = synthetic_food_names(2000)
+    index = FoodMatchIndex(names)
+    rebuilt = FoodMatchIndex.from_arrays(**index.to_arrays())
+    for query in synthetic_queries(names, 100):
+        assert rebuilt.lookup(query) == index.lookup(query)
@@ -0,0 +1,82 @@
+import json
+import sqlite3
+
+from app import storage
+
+# The schema before any migration: init_db as it was, with no user_version
+BASELINE_SCHEMA = '''
+    CREATE TABLE user_settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        api_key TEXT,
+        sugar_limit REAL DEFAULT 25.0,
+        weekly_alert_enabled INTEGER DEFAULT 0,
+        monthly_alert_enabled INTEGER DEFAULT 0
+    );
+    CREATE TABLE user_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        meals_json TEXT,
+        total_nutrition_json TEXT,
+        risk_level TEXT,
+        risk_reason TEXT,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def totals(sugar):
+    return {"total_calories": 1800.0, "total_carbs": 220.0, "total_sugar": sugar,
+            "total_protein": 60.0, "total_fat": 50.0, "total_fiber": 20.0}
+
+
+def make_baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO user_settings (name, sugar_limit, weekly_alert_enabled) VALUES ('Asha', 30.0, 1)")
+    rows = [
+        ("2024-03-01", {"lunch": "rice"}, totals(20.0), "Safe"),
+        ("2024-03-02", {"lunch": "old entry"}, totals(40.0), "Moderate"),
+        # A racing writer left a second row for the same date; the newest wins
+        ("2024-03-02", {"lunch": "new entry"}, totals(55.0), "High"),
+        ("2024-03-09", {"dinner": "2 roti"}, totals(10.0), "Safe"),
+    ]
+    conn.executemany(
+        "INSERT INTO user_history (date, meals_json, total_nutrition_json, risk_level, risk_reason) "
+        "VALUES (?, ?, ?, ?, '')",
+        [(d, json.dumps(m), json.dumps(t), r) for d, m, t, r in rows])
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_upgrades_to_current_schema(db_path):
+    make_baseline_db(db_path)
+
+    storage.init_db()
+    conn = storage.get_connection()
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == storage.SCHEMA_VERSION == 6
+
+    indexes = {row["name"]: row for row in conn.execute("PRAGMA index_list(user_history)")}
+    assert "idx_user_history_date" not in indexes
+    assert indexes["idx_user_history_user_date"]["unique"] == 1
+    columns = [row["name"] for row in conn.execute("PRAGMA index_info(idx_user_history_user_date)")]
+    assert columns == ["user_id", "date"]
+
+    history = storage.get_history(10)
+    assert [e["date"] for e in history] == ["2024-03-09", "2024-03-02", "2024-03-01"]
+    assert json.loads(history[1]["meals_json"]) == {"lunch": "new entry"}
+    assert history[1]["risk_level"] == "High"
+    assert {r["user_id"] for r in conn.execute("SELECT user_id FROM user_history")} == {storage.DEFAULT_USER}
+
+    # Totals were backfilled into real columns and the rollups rebuilt from them
+    assert conn.execute("SELECT total_sugar FROM user_history WHERE date = '2024-03-02'").fetchone()[0] == 55.0
+    month = storage.get_rollups("month")
+    assert month[0]["days"] == 3
+
+    settings = storage.get_user_settings()
+    assert settings["name"] == "Asha" and settings["sugar_limit"] == 30.0
+
+    # Upgrading again is a no-op
+    storage.init_db()
+    assert conn.execute("SELECT COUNT(*) FROM user_history").fetchone()[0] == 3
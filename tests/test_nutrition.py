@@ -0,0 +1,52 @@
+from app.matching import FoodMatchIndex
+from app.nutrition import Dataset, NutritionEngine
+from app.snapshot import build_snapshot
+
+from conftest import FOODS_CSV
+
+
+def test_phrase_memo_is_dropped_when_the_dataset_changes(nutrition_engine, food_csv):
+    engine = nutrition_engine
+    assert engine._lookup("kheer")[0] is None
+    assert engine._lookup("kheer")[0] is None
+    assert engine.match_cache.hits == 1
+
+    food_csv.write_text(FOODS_CSV + "kheer,180,30,22,4,5,0.3\n")
+    assert engine.reload(background=False)
+
+    assert engine.last_reload["outcome"] == "swapped"
+    assert engine._lookup("kheer")[0] == "kheer"
+    assert engine.match_cache.invalidations == 2
+
+
+def test_match_from_the_old_dataset_is_not_memoised_after_a_swap(nutrition_engine):
+    engine = nutrition_engine
+    old = engine.dataset
+    new = Dataset(old.table, FoodMatchIndex(["kheer"] + old.food_names), "next", "test")
+    engine._swap(new)
+
+    # A request that pinned the old dataset finishes after the swap
+    assert engine._lookup("kheer", dataset=old)[0] is None
+    assert engine._lookup("kheer")[0] == "kheer"
+    assert engine._lookup("kheer", dataset=old)[0] is None
+
+
+def test_snapshot_only_deployment_reloads(nutrition_engine, food_csv):
+    build_snapshot(str(food_csv))
+    food_csv.unlink()
+    engine = NutritionEngine(str(food_csv))
+    assert engine.dataset_source == "snapshot"
+    version = engine.dataset_version
+
+    assert engine.reload(background=False)
+    assert (engine.last_reload["outcome"], engine.last_reload["version"]) == ("unchanged", version)
+
+    # A new snapshot is shipped, still without the CSV
+    food_csv.write_text(FOODS_CSV + "kheer,180,30,22,4,5,0.3\n")
+    build_snapshot(str(food_csv))
+    food_csv.unlink()
+    assert engine.reload(background=False)
+
+    assert engine.last_reload["outcome"] == "swapped"
+    assert engine.dataset_version not in (None, version)
+    assert engine._lookup("kheer")[0] == "kheer"
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from app.resilience import CLOSED, OPEN, ServiceGuard, ServiceUnavailable
+
+
+class SlowingService:
+    """Answers in `latency` seconds, or raises TimeoutError once the caller's timeout passes."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("stub timed out")
+        time.sleep(self.latency)
+        return "ok"
+
+
+def test_breaker_recovers_after_service_slows_down():
+    guard = ServiceGuard("stub", max_timeout=5.0, min_timeout=0.05, retries=0,
+                         failure_threshold=2, reset_timeout=0.1)
+    service = SlowingService(0.005)
+    for _ in range(guard.min_samples):
+        assert guard.call(service) == "ok"
+    assert guard.current_timeout() == pytest.approx(0.05)
+
+    service.latency = 0.2
+    while guard.breaker.state != OPEN:
+        with pytest.raises(ServiceUnavailable):
+            guard.call(service)
+    with pytest.raises(ServiceUnavailable) as rejected:
+        guard.call(service)
+    assert rejected.value.reason == "open"
+
+    time.sleep(0.15)
+    # The half-open trial gets the ceiling, not the 50 ms learned from the fast samples
+    assert guard.call(service) == "ok"
+    assert service.timeouts[-1] == 5.0
+    assert guard.breaker.state == CLOSED
+
+    for _ in range(5):
+        assert guard.call(service) == "ok"
+    assert guard.current_timeout() >= 0.2
+
+
+def test_timeouts_widen_the_window_and_retry_with_ceiling():
+    guard = ServiceGuard("stub", max_timeout=5.0, min_timeout=0.05, retries=1, backoff=0.0)
+    service = SlowingService(0.005)
+    for _ in range(guard.min_samples):
+        guard.call(service)
+
+    service.latency = 0.2
+    assert guard.call(service) == "ok"
+    # The first attempt timed out at 50 ms and was kept as a sample; the retry ran under the ceiling
+    assert service.timeouts[-2:] == [pytest.approx(0.05), 5.0]
+    assert guard.breaker.state == CLOSED
+    assert guard.current_timeout() >= 0.4
+
+
+def test_old_latency_samples_expire():
+    guard = ServiceGuard("stub", max_timeout=5.0, min_timeout=0.05, min_samples=5, latency_max_age=0.1)
+    service = SlowingService(0.001)
+    for _ in range(5):
+        guard.call(service)
+    assert guard.current_timeout() == pytest.approx(0.05)
+
+    time.sleep(0.15)
+    assert len(guard.latency) == 0
+    assert guard.current_timeout() == 5.0
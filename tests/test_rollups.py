@@ -0,0 +1,85 @@
+from collections import defaultdict
+
+import pytest
+
+from app import storage
+
+
+def totals(sugar, fiber=30.0):
+    return {"total_calories": 1800.5, "total_carbs": 210.25, "total_sugar": sugar,
+            "total_protein": 61.1, "total_fat": 48.3, "total_fiber": fiber}
+
+
+def log(date_str, sugar, fiber=30.0, risk="Safe", user_id=storage.DEFAULT_USER):
+    storage.log_daily_entry(date_str, {"lunch": "rice"}, totals(sugar, fiber), risk, "", user_id)
+
+
+def recomputed(period, user_id=storage.DEFAULT_USER):
+    """Every bucket of `period` rebuilt from all of user_id's rows, newest first like get_rollups."""
+    rows = storage.get_connection().execute(
+        f'SELECT date, risk_level, {", ".join(storage.TOTAL_COLUMNS)} FROM user_history WHERE user_id = ?',
+        (user_id,)).fetchall()
+    buckets = defaultdict(lambda: dict.fromkeys(storage.ROLLUP_COLUMNS, 0))
+    for row in rows:
+        bucket = buckets[storage.rollup_bucket(period, row["date"])]
+        bucket["days"] += 1
+        for column in storage.TOTAL_COLUMNS:
+            bucket["sum_" + column[len("total_"):]] += row[column] or 0
+        bucket[f"{row['risk_level'].lower()}_days"] += 1
+        bucket["sugar_high_days"] += (row["total_sugar"] or 0) > 40
+        bucket["fiber_low_days"] += (row["total_fiber"] or 0) < 25
+    return [{"bucket": key, **buckets[key]} for key in sorted(buckets, reverse=True)]
+
+
+def assert_rollups_match_recompute(user_id=storage.DEFAULT_USER):
+    for period in storage.ROLLUP_PERIODS:
+        expected = recomputed(period, user_id)
+        assert expected
+        assert storage.get_rollups(period, user_id=user_id) == [pytest.approx(b) for b in expected], period
+
+
+def test_insert(db_path):
+    storage.init_db()
+    log("2024-05-15", 20.0)
+    assert_rollups_match_recompute()
+    log("2024-05-16", 55.0, fiber=10.0, risk="Moderate")
+    assert_rollups_match_recompute()
+
+
+def test_upsert_overwrites_the_date(db_path):
+    storage.init_db()
+    log("2024-05-15", 20.0)
+    log("2024-05-17", 30.0)
+    log("2024-05-15", 80.0, fiber=12.0, risk="High")
+
+    assert_rollups_match_recompute()
+    week = storage.get_rollups("week", "2024-05-15", "2024-05-15")[0]
+    assert (week["days"], week["high_days"], week["safe_days"]) == (2, 1, 1)
+
+
+def test_writes_across_week_month_and_year_boundaries(db_path):
+    storage.init_db()
+    # Sunday 2024-03-31 and Monday 2024-04-01 fall in different weeks and months
+    for date_str, sugar in (("2024-03-31", 41.0), ("2024-04-01", 12.0), ("2023-12-31", 70.0),
+                            ("2024-01-01", 5.0), ("2024-02-29", 39.0)):
+        log(date_str, sugar)
+        assert_rollups_match_recompute()
+
+    storage.log_daily_entries([
+        ("2024-03-30", {"lunch": "dal"}, totals(66.0, 20.0), "High", ""),
+        ("2024-04-02", {"lunch": "dal"}, totals(44.0), "Moderate", ""),
+        ("2024-03-31", {"lunch": "dal"}, totals(1.0), "Safe", ""),
+    ])
+    assert_rollups_match_recompute()
+    assert [b["bucket"] for b in storage.get_rollups("week", "2024-03-25", "2024-04-07")] == \
+        ["2024-04-01", "2024-03-25"]
+
+
+def test_other_users_buckets_are_untouched(db_path):
+    storage.init_db()
+    log("2024-05-15", 20.0, user_id="asha")
+    log("2024-05-15", 60.0, risk="Moderate")
+    log("2024-05-16", 10.0, user_id="asha")
+
+    assert_rollups_match_recompute()
+    assert_rollups_match_recompute("asha")
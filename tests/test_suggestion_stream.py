@@ -0,0 +1,25 @@
+import threading
+
+from app import routes, storage
+
+JOB_ID = "2024-05-01-abc123"
+
+
+def test_streams_over_the_cap_are_sent_to_polling(client, monkeypatch):
+    monkeypatch.setattr(routes, "suggestion_streams", threading.BoundedSemaphore(1))
+    storage.log_daily_entry("2024-05-01", {"lunch": "rice"}, {"total_sugar": 10.0}, "Safe", "")
+
+    first = client.get(f"/api/suggestions/{JOB_ID}/stream", buffered=False)
+    assert first.status_code == 200
+
+    second = client.get(f"/api/suggestions/{JOB_ID}/stream")
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == str(routes.STREAM_RETRY_AFTER)
+    assert second.get_json()["poll"] == f"/api/suggestions/{JOB_ID}"
+    assert client.get(second.get_json()["poll"]).status_code == 202
+
+    # Closing the open stream frees its slot
+    first.close()
+    third = client.get(f"/api/suggestions/{JOB_ID}/stream", buffered=False)
+    assert third.status_code == 200
+    third.close()
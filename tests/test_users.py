@@ -0,0 +1,39 @@
+import json
+
+from app import storage
+
+
+def exported_dates(client, user_id=None):
+    headers = {"X-User-Id": user_id} if user_id else {}
+    response = client.get("/api/export/history", headers=headers)
+    assert response.status_code == 200
+    return [(line["user_id"], line["date"]) for line in map(json.loads, response.data.decode().splitlines())]
+
+
+def seed():
+    storage.log_daily_entry("2024-06-01", {"lunch": "rice"}, {"total_sugar": 12.0}, "Safe", "", "asha")
+    storage.log_daily_entry("2024-06-02", {"lunch": "dosa"}, {"total_sugar": 18.0}, "Safe", "", "ravi")
+    storage.log_daily_entry("2024-06-03", {"lunch": "idli"}, {"total_sugar": 8.0}, "Safe", "")
+
+
+def test_trusted_header_keeps_histories_apart(client, monkeypatch):
+    monkeypatch.setenv("TRUST_USER_HEADER", "1")
+    seed()
+
+    assert exported_dates(client, "asha") == [("asha", "2024-06-01")]
+    assert exported_dates(client, "ravi") == [("ravi", "2024-06-02")]
+    assert exported_dates(client) == [("default", "2024-06-03")]
+
+    client.post("/api/settings", json={"name": "Asha", "sugar_limit": 30}, headers={"X-User-Id": "asha"})
+    assert client.get("/api/settings/status", headers={"X-User-Id": "asha"}).get_json()["setup_complete"]
+    assert not client.get("/api/settings/status", headers={"X-User-Id": "ravi"}).get_json()["setup_complete"]
+
+    assert client.get("/api/export/history", headers={"X-User-Id": "not a user!"}).status_code == 400
+
+
+def test_header_is_ignored_unless_trusted(client, monkeypatch):
+    monkeypatch.delenv("TRUST_USER_HEADER", raising=False)
+    seed()
+
+    assert exported_dates(client, "asha") == [("default", "2024-06-03")]
+    assert exported_dates(client, "not a user!") == [("default", "2024-06-03")]
@@ -0,0 +1,28 @@
+"""
+WSGI entry point for production servers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every engine (CSV/snapshot, match index, spaCy model, Groq client setup) is
+built here, synchronously, before gunicorn forks its workers when
+preload_app is on. The workers then share those pages copy-on-write instead
+of each loading its own copy. `python app.py` still runs the dev server.
+"""
+import gc
+import os
+
+# Build engines here rather than on create_app's background thread, which would not survive the fork
+os.environ.setdefault("ENGINE_WARMUP", "0")
+
+from app import create_app
+from app.engines import registry
+from app.storage import close_connection
+
+app = create_app()
+registry.warm_up(background=False)
+
+# The master never serves requests; workers open their own database connection
+close_connection()
+# Move everything built so far out of the collector's reach, so GC passes in a
+# worker don't write to (and so un-share) the preloaded pages
+gc.freeze()